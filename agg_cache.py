@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+# ==========================================
+# CROSS-FILTER AGGREGATE CACHE
+# Responsibilities: sharing aggregation results between user sessions.
+# Every tab that lands on the same filter combination (e.g. {'State': 'Delhi'})
+# is served the same result instead of re-running the groupby.
+# ==========================================
+
+
+def make_key(filters: Dict[str, object], ignore_col: Optional[str] = None,
+             group_col: Optional[str] = None, value_col: Optional[str] = None,
+             top_n: Optional[int] = None) -> tuple:
+    """
+    Normalised cache key. Unfiltered entries ('All' / None) and the ignored column
+    are dropped, so {'State': 'Delhi'} rendered on the State chart shares the
+    entry of the unfiltered State chart.
+    """
+    active = tuple(sorted(
+        (col, val) for col, val in filters.items()
+        if col != ignore_col and val is not None and val != 'All'
+    ))
+    return (active, group_col, value_col, top_n)
+
+
+class AggregateCache:
+    """Thread-safe, size-bounded LRU cache with hit/miss counters."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], object]):
+        """
+        Returns the cached value for key, computing and storing it on a miss.
+        Cached values are shared by all sessions: callers must not mutate them.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        # Compute outside the lock so one slow aggregation doesn't block other keys
+        value = compute()
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
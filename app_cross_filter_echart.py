@@ -1,17 +1,17 @@
 from nicegui import ui
 import pandas as pd
 
+import metrics
+from chart_data import highlight_colors, top_k_frame
+from chart_patch import ChartPatchBatch, quiet_props
+from filter_index import marginal_masks
+from metrics import phase
+from sales_data import get_sales_data
+
 # --- 1. Data Loading --- 
 # --- 数据加载与处理 ---
 try:
-    df_details = pd.read_csv('Details.csv')
-    df_orders = pd.read_csv('Orders.csv')
-    df_global = pd.merge(df_details, df_orders, on="Order ID", how="inner")
-
-    if "Sub-Category" in df_global.columns:
-        df_global["Sub-Category"] = df_global["Sub-Category"].astype(str).str.strip()
-    if "Category" in df_global.columns:
-        df_global["Category"] = df_global["Category"].astype(str).str.strip()
+    df_global = get_sales_data()
 except Exception as e:
     print(f"Data Error: {e}")
     df_global = pd.DataFrame()
@@ -22,30 +22,27 @@ filters = {}  # 全局字典，记录当前筛选条件, 例如：{'State': 'Tex
 
 # --- 3. Logic: Filter Data --- 
 # --- “筛选数据”函数 --- 
-def get_filtered_df(exclude_col=None):
+def get_filtered_masks():
     """
-    每次用户点击，都要重新计算 KPI 和图表数据。这个函数能根据 filters 动态返回筛选后的 DataFrame。
-    exclude_col 很关键: 比如你点“State”图表时, 不能让 State 自己参与筛选（否则只能看到一个州），所以要排除 
+    每次用户点击，都要重新计算 KPI 和图表数据。这个函数根据 filters 一次返回所有面板的行掩码：
+    {None: KPI 用（所有筛选）, 'State': State 图表用, ...}
+    排除自身很关键: 比如你点“State”图表时, 不能让 State 自己参与筛选（否则只能看到一个州），所以要排除 
+    每个筛选列只比较一次，KPI 与三个图表共用，而不是每个面板各复制、筛选一遍 DataFrame
     """
-    df_temp = df_global.copy()
-    for col, val in filters.items():
-        if col == exclude_col: continue  # 图表自身不参与自己的筛选
-        df_temp = df_temp[df_temp[col] == val]
-    return df_temp
+    with phase('filter'):
+        return marginal_masks(df_global, filters, ['Sub-Category', 'State', 'CustomerName'])
 
 # --- 4. Logic: Build ECharts Options ---
 def build_bar_chart_option(title, x_data, y_data, highlight_val=None, base_color='#3b82f6'):
-    series_data = []
     color_selected = base_color # 选中颜色，比如蓝色 
     color_unselected = '#dbeafe' # 未选中颜色，浅蓝灰色   
     
-    for x, y in zip(x_data, y_data):
-        is_highlighted = (highlight_val is None) or (x == highlight_val)
-        # 高亮当前选中的柱子 
-        # 比如 x_data 是州名，如 'Texas'， 用户点了这个州，那个柱子应该变亮，其他变灰，这样就知道当前筛选状态了 
-        # 在 refresh_dashboard() 函数中的 update_chart() 里调用这个函数时，会传入 highlight_val 参数 
-        current_color = color_selected if is_highlighted else color_unselected
-        series_data.append({'value': y, 'itemStyle': {'color': current_color}})
+    # 高亮当前选中的柱子 
+    # 比如 x_data 是州名，如 'Texas'， 用户点了这个州，那个柱子应该变亮，其他变灰，这样就知道当前筛选状态了 
+    # 在 refresh_dashboard() 函数中的 update_chart() 里调用这个函数时，会传入 highlight_val 参数 
+    # 颜色一次性按掩码计算（np.where），不逐个柱子判断
+    colors = highlight_colors(x_data, highlight_val, color_selected, color_unselected)
+    series_data = [{'value': y, 'itemStyle': {'color': c}} for y, c in zip(y_data, colors)]
 
     option = {
         'title': {'text': title, 'left': 'center', 'top': '5%'},
@@ -109,12 +106,22 @@ def main():
             # 图表初始为空，refresh_dashboard() 里调用 update_chart() 重新生成 option 并更新  
             chart3 = ui.echart({'xAxis': {}, 'yAxis': {}, 'series': []}).classes('w-full h-80')
 
+    # 图表已渲染后只推送变化的部分（setOption 合并），一次刷新的三个图表合并为一条消息
+    client = ui.context.client
+    patches = ChartPatchBatch()
+
     def reset_filters():
+        metrics.EVENTS.inc('reset_filters')
         filters.clear()
         ui.notify('Filters reset')
         refresh_dashboard()
     
-    def refresh_dashboard():
+    def refresh_dashboard(trigger='interaction'):
+        # trigger 只用于 /metrics 中区分首次渲染（full）与点击后的刷新（interaction）
+        with metrics.REFRESH_SECONDS.time(trigger):
+            _refresh_dashboard()
+
+    def _refresh_dashboard():
         # A. UI - 清空并重新渲染筛选标签区域 
         # 每次刷新前清除旧标签，避免重复叠加  
         filter_container.clear() # 先清空之前的内容, 比如 "State: Texas"  
@@ -127,26 +134,46 @@ def main():
                 ui.button(icon='close', on_click=reset_filters).props('flat round dense color=red')
 
         # B. KPI
-        df_kpi = get_filtered_df(exclude_col=None)
-        kpi_refs['amt'].set_text(f"${df_kpi['Amount'].sum():,.0f}")
-        kpi_refs['prf'].set_text(f"${df_kpi['Profit'].sum():,.0f}")
-        kpi_refs['qty'].set_text(f"{df_kpi['Quantity'].sum():,}")
-        kpi_refs['ord'].set_text(f"{df_kpi['Order ID'].nunique():,}")
+        masks = get_filtered_masks()
+        df_kpi = df_global[masks[None]]
+        with phase('aggregate'):
+            kpis = (df_kpi['Amount'].sum(), df_kpi['Profit'].sum(), df_kpi['Quantity'].sum(), df_kpi['Order ID'].nunique())
+        kpi_refs['amt'].set_text(f"${kpis[0]:,.0f}")
+        kpi_refs['prf'].set_text(f"${kpis[1]:,.0f}")
+        kpi_refs['qty'].set_text(f"{kpis[2]:,}")
+        kpi_refs['ord'].set_text(f"{kpis[3]:,}")
 
         # C. Charts
-        def update_chart(chart, df, group_col, val_col, color, title):
-            df_grp = df.groupby(group_col)[val_col].sum().reset_index().sort_values(val_col, ascending=False)
-            if group_col != 'Sub-Category': df_grp = df_grp.head(10)
+        def update_chart(chart, group_col, val_col, color, title):
+            # 基于类别编码的 bincount 汇总 + argpartition 只选出前 10（CustomerName 类别很多，不必整体排序）
+            # 只汇总该图表掩码选中的行（排除了它自己的筛选），不复制 DataFrame
+            with phase('aggregate'):
+                top = top_k_frame(df_global, group_col, val_col, None if group_col == 'Sub-Category' else 10,
+                                  mask=masks[group_col])
             
             # filters.get('categorical data 比如（州、客户、子类）') 不是直接写在 build_bar_chart_option 调用处的字面量，而是通过 group_col 动态决定的，这让代码能复用于不同图表（州、客户、子类） 
-            opt = build_bar_chart_option(title, df_grp[group_col].tolist(), df_grp[val_col].round(0).tolist(), filters.get(group_col), color)
+            with phase('figure'):
+                opt = build_bar_chart_option(title, top.labels, [round(v) for v in top.values], filters.get(group_col), color)
+            if chart.options.get('series'):
+                # 已有柱状图：只发送标题、类别和数据（含颜色），不重发整个 option
+                patches.echart_set_option(chart, {
+                    'title': opt['title'],
+                    'xAxis': [{'data': opt['xAxis'][0]['data']}],
+                    'series': [{'data': opt['series'][0]['data']}],
+                })
+                with quiet_props(chart):  # 服务端 options 与浏览器保持一致，但不触发整体推送
+                    chart.options.update(opt)
+                return
             chart.options.clear()
             chart.options.update(opt)
-            chart.update()
-
-        update_chart(chart1, get_filtered_df('Sub-Category'), 'Sub-Category', 'Profit', '#28738a', 'Profit by Sub-Category')
-        update_chart(chart2, get_filtered_df('State'), 'State', 'Amount', '#3b82f6', 'Top 10 States')
-        update_chart(chart3, get_filtered_df('CustomerName'), 'CustomerName', 'Amount', '#10b981', 'Top 10 Customers')
+            with phase('push'):
+                chart.update()
+
+        update_chart(chart1, 'Sub-Category', 'Profit', '#28738a', 'Profit by Sub-Category')
+        update_chart(chart2, 'State', 'Amount', '#3b82f6', 'Top 10 States')
+        update_chart(chart3, 'CustomerName', 'Amount', '#10b981', 'Top 10 Customers')
+        with phase('push'):
+            patches.send(client)
     
     # --- Event Handler --- 
     def handle_click(e, col_name):
@@ -163,6 +190,7 @@ def main():
         # print(f"Clicked: {col_name} -> {click_val}") 
 
         if not click_val: return
+        metrics.EVENTS.inc('handle_click')
 
         if filters.get(col_name) == click_val:
             filters.pop(col_name)
@@ -180,6 +208,9 @@ def main():
     chart2.on_point_click(lambda e: handle_click(e, 'State'))
     chart3.on_point_click(lambda e: handle_click(e, 'CustomerName'))
 
-    refresh_dashboard() 
+    refresh_dashboard('full') 
+
+# 每个阶段的耗时、点击次数与事件循环延迟，以 Prometheus 文本格式暴露在 /metrics
+metrics.add_metrics_route('/metrics')
 
 ui.run(title='Sales Dashboard', port=8081) 
\ No newline at end of file
@@ -1,57 +1,27 @@
 from nicegui import ui
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 
-# 1. Load Data
-# Details.csv 包含：订单明细（金额、利润、品类、子品类、支付方式等）
-# Orders.csv 包含：订单主信息（订单日期、客户、城市、州等）
-# 这两行会把两个文件读入内存，生成两个 DataFrame 对象 
-# 脚本与 Details.csv、Orders.csv 在同一目录下，否则要写完整路径 
-df_details = pd.read_csv('Details.csv')
-df_orders = pd.read_csv('Orders.csv')
-
-# 2. Merge Data
-# 使用 pd.merge() 将两个表按 "Order ID" 字段内连接（inner join）。
-# 结果 df_global 会包含：
-# 所有 Details.csv 的字段（Amount, Profit, Category...）
-# 所有 Orders.csv 的字段（Order Date, CustomerName, State, City...）
-# 只保留两个表中都存在的 Order ID (inner join 的特性)  
-df_global = pd.merge(df_details, df_orders, on="Order ID", how="inner")
-
-# 3. Data Cleaning
-# 防止因 " Electronics " 和 "Electronics" 被识别为不同类别。
-# .astype(str) 确保即使有空值（NaN）也不会报错（NaN 会变成 "nan" 字符串，但通常数据中不应有）。
-# .str.strip() 去除字符串首尾空格
-if "Sub-Category" in df_global.columns:
-    df_global["Sub-Category"] = df_global["Sub-Category"].astype(str).str.strip()
-if "Category" in df_global.columns:
-    df_global["Category"] = df_global["Category"].astype(str).str.strip()
-
-# 4. Calculate Global KPIs
-# Total Amount 
-total_amount = df_global['Amount'].sum()
-# Total Profit
-total_profit = df_global['Profit'].sum()
-# Total Quantity
-total_quantity = df_global['Quantity'].sum()
-# Total Counts of Orders 
-total_orders = df_global['Order ID'].nunique() 
-
-# 5. Prepare Chart Data 
-# Chart 1: Total Profit by Sub-Category (Sorted)
-df_sub_cat = df_global.groupby('Sub-Category')['Profit'].sum().reset_index()
-df_sub_cat = df_sub_cat.sort_values(by='Profit', ascending=False)
-
-# Chart 2: Total Sales by State (Top 10)
-df_state = df_global.groupby('State')['Amount'].sum().reset_index()
-df_state = df_state.sort_values(by='Amount', ascending=False).head(10) # 只取前10，防止图表太挤
-
-# Chart 3: Total Sales by Customer (Top 10)
-df_customer = df_global.groupby('CustomerName')['Amount'].sum().reset_index()
-df_customer = df_customer.sort_values(by='Amount', ascending=False).head(10) # 只取前10
-
-# 6. Dashboard Layout
+import metrics
+from chart_data import highlight_colors, top_k_frame
+from figure_builder import bar_figure
+from filter_index import marginal_masks
+from metrics import phase
+from sales_data import get_sales_data
+
+# 1-3. Load, Merge & Clean Data
+# Details.csv（订单明细）与 Orders.csv（订单主信息）按 "Order ID" 内连接，
+# 读取、合并、去空格统一在 sales_data 模块中完成，整个进程只加载一次。
+# State / CustomerName / Sub-Category 等维度列为 category 类型，节省内存、加快筛选与分组
+df_global = get_sales_data()
+
+# 4. KPI 所需的列数组（只取一次）：每次点击按掩码直接求和，不复制筛选后的整行数据
+MEASURE_VALUES = {col: df_global[col].to_numpy() for col in ('Amount', 'Profit', 'Quantity')}
+# Order ID 只编码一次，订单数 = 掩码内不同编码的个数（bincount 计数）
+ORDER_CODES, ORDER_IDS = pd.factorize(df_global['Order ID'])
+
+# 5. Dashboard Layout
 @ui.page('/')
 def main():
     # Cross Filter Logic  
@@ -113,35 +83,35 @@ def main():
             chart3 = ui.plotly(go.Figure()).classes('w-full h-80')
 
     # Cross Filter Logic 
-    # 编写 get_filtered_df(exclude_col=None) 函数, 这是 cross-filter 的关键逻辑 
+    # 编写 get_filtered_masks() 函数, 这是 cross-filter 的关键逻辑 
     #     1. 当渲染“子品类”图表时，忽略子品类的筛选条件，这样即使用户点了“Chairs”，图表仍显示所有子品类（但高亮 Chairs）
     #     2. 但 KPI 要应用所有筛选
-    def get_filtered_df(exclude_col=None):
+    def get_filtered_masks():
         """
-        获取过滤后的数据。
-        exclude_col: 为了实现交叉筛选，渲染某个图表时，应该排除它自己的过滤条件，
-        这样它才能显示全局上下文，并高亮选中项。
+        一次求出所有面板的行掩码：{None: KPI（应用所有筛选）, 'Sub-Category': 子品类图表（排除它自己的筛选）, ...}
+        每个筛选列只比较一次，再按“去掉自身那一列”组合掩码，
+        而不是 KPI 和每个图表各自复制、筛选一遍 DataFrame（N 个图表 N+1 次）。
         """
-        df_temp = df_global.copy()
-        for col, val in filters.items():
-            # 如果是当前图表对应的列，跳过过滤（保留该列所有数据以便展示）
-            if col == exclude_col:
-                continue
-            df_temp = df_temp[df_temp[col] == val]
-        return df_temp
+        with phase('filter'):
+            return marginal_masks(df_global, filters, ['Sub-Category', 'State', 'CustomerName'])
 
     # Cross Filter Logic 
     # 编写 refresh_dashboard() 函数 
     # 这个函数负责：
     #   1. 顶部筛选标签（显示当前筛选 + 重置按钮）
-    #   2. 重新计算 KPI（用 get_filtered_df(None)）
-    #   3. 重新生成三个图表（分别调用 get_filtered_df('Sub-Category') 等）
+    #   2. 重新计算 KPI（用 masks[None]）
+    #   3. 重新生成三个图表（分别用 masks['Sub-Category'] 等，只汇总掩码选中的行，不复制 DataFrame）
     #   4. 为图表柱子设置颜色：选中项深色，其他浅色
     #   5. 在 fig.update_layout(...) 中加入 clickmode='event+select' 启用 Plotly 的点击模式, 否则事件不会触发 
-    def refresh_dashboard():
+    def refresh_dashboard(trigger='interaction'):
         """
         根据 filters 字典筛选数据，并更新所有 UI 组件
+        trigger 只用于 /metrics 中区分首次渲染（full）与点击后的刷新（interaction）
         """
+        with metrics.REFRESH_SECONDS.time(trigger):
+            _refresh_dashboard()
+
+    def _refresh_dashboard():
           
         # 1. Filter UI 
         # 增加重置筛选功能, 仅当有筛选时出现重置按钮  
@@ -154,11 +124,13 @@ def main():
                 ui.button('Reset Filters', on_click=reset_filters, icon='close').props('flat dense color=red size=sm')
 
         # 2. Update KPIs (KPI 必须反映所有过滤器的结果)
-        df_kpi = get_filtered_df(exclude_col=None) # 不排除任何条件
-        total_amount = df_kpi['Amount'].sum()
-        total_profit = df_kpi['Profit'].sum()
-        total_quantity = df_kpi['Quantity'].sum()
-        total_orders = df_kpi['Order ID'].nunique()
+        masks = get_filtered_masks()
+        mask = masks[None] # 不排除任何条件
+        with phase('aggregate'):
+            total_amount = MEASURE_VALUES['Amount'][mask].sum()
+            total_profit = MEASURE_VALUES['Profit'][mask].sum()
+            total_quantity = MEASURE_VALUES['Quantity'][mask].sum()
+            total_orders = np.count_nonzero(np.bincount(ORDER_CODES[mask], minlength=len(ORDER_IDS)))
 
         kpi_amount.set_text(f'${total_amount:,.0f}')
         kpi_profit.set_text(f'${total_profit:,.0f}')
@@ -169,46 +141,48 @@ def main():
         
         # --- Chart 1: Profit by Sub-Category ---
         # 排除 Sub-Category 自己的筛选，这样即使用户点了 Chairs，柱状图依然显示所有子类
-        df_c1 = get_filtered_df(exclude_col='Sub-Category')
-        df_sub_cat = df_c1.groupby('Sub-Category')['Profit'].sum().reset_index().sort_values('Profit', ascending=False)
+        # 基于类别编码的 bincount 汇总并排序，返回 TopK(labels, values) 列表
+        with phase('aggregate'):
+            top_sub_cat = top_k_frame(df_global, 'Sub-Category', 'Profit', mask=masks['Sub-Category'])
         
         # 计算颜色: 如果有筛选，选中的显示深色，未选中的显示浅色
         selected_sub = filters.get('Sub-Category')
-        # 如果没有筛选，默认全深色；如果有筛选，选中的深色，其他的浅色
-        colors_c1 = ['#3b82f6' if (not selected_sub or x == selected_sub) else '#dbeafe' for x in df_sub_cat['Sub-Category']]
-        
-        fig1 = px.bar(df_sub_cat, x='Sub-Category', y='Profit', title='Profit by Sub-Category', template='plotly_white')
-        fig1.update_layout(margin=dict(l=20, r=20, t=40, b=20), paper_bgcolor='rgba(0,0,0,0)', clickmode='event+select')
-        fig1.update_traces(marker_color=colors_c1) # 应用颜色
-        chart1.update_figure(fig1)
+        # 如果没有筛选，默认全深色；如果有筛选，选中的深色，其他的浅色（np.where 掩码，一次算完）
+        with phase('figure'):
+            colors_c1 = highlight_colors(top_sub_cat.labels, selected_sub, '#3b82f6', '#dbeafe')
+            
+            # 与 px.bar + update_layout + update_traces 结果相同的 figure dict（颜色直接传入），
+            # 模板与布局只构建一次，每次只替换 x / y / 颜色
+            fig1 = bar_figure(top_sub_cat.labels, top_sub_cat.values, colors_c1, title='Profit by Sub-Category', x_title='Sub-Category', y_title='Profit')
+        with phase('push'):
+            chart1.update_figure(fig1)
 
         # --- Chart 2: Sales by State ---
-        df_c2 = get_filtered_df(exclude_col='State')
-        df_state = df_c2.groupby('State')['Amount'].sum().reset_index().sort_values('Amount', ascending=False).head(10)
+        with phase('aggregate'):
+            top_state = top_k_frame(df_global, 'State', 'Amount', 10, mask=masks['State'])  # argpartition 只选出前 10，不整体排序
         
         selected_state = filters.get('State')
-        colors_c2 = ['#3b82f6' if (not selected_state or x == selected_state) else '#dbeafe' for x in df_state['State']]
-
-        fig2 = px.bar(df_state, x='State', y='Amount', title='Top States by Sales', template='plotly_white')
-        fig2.update_layout(margin=dict(l=20, r=20, t=40, b=20), paper_bgcolor='rgba(0,0,0,0)', clickmode='event+select')
-        fig2.update_traces(marker_color=colors_c2)
-        chart2.update_figure(fig2)
+        with phase('figure'):
+            colors_c2 = highlight_colors(top_state.labels, selected_state, '#3b82f6', '#dbeafe')
+            fig2 = bar_figure(top_state.labels, top_state.values, colors_c2, title='Top States by Sales', x_title='State', y_title='Amount')
+        with phase('push'):
+            chart2.update_figure(fig2)
 
         # --- Chart 3: Sales by Customer ---
-        df_c3 = get_filtered_df(exclude_col='CustomerName')
-        df_customer = df_c3.groupby('CustomerName')['Amount'].sum().reset_index().sort_values('Amount', ascending=False).head(10)
+        with phase('aggregate'):
+            top_customer = top_k_frame(df_global, 'CustomerName', 'Amount', 10, mask=masks['CustomerName'])  # 客户数量很多，部分选择收益最大
         
         selected_cust = filters.get('CustomerName')
-        colors_c3 = ['#10b981' if (not selected_cust or x == selected_cust) else '#d1fae5' for x in df_customer['CustomerName']]
-
-        fig3 = px.bar(df_customer, x='CustomerName', y='Amount', title='Top Customers by Sales', template='plotly_white')
-        fig3.update_layout(margin=dict(l=20, r=20, t=40, b=20), paper_bgcolor='rgba(0,0,0,0)', clickmode='event+select')
-        fig3.update_traces(marker_color=colors_c3)
-        chart3.update_figure(fig3)
+        with phase('figure'):
+            colors_c3 = highlight_colors(top_customer.labels, selected_cust, '#10b981', '#d1fae5')
+            fig3 = bar_figure(top_customer.labels, top_customer.values, colors_c3, title='Top Customers by Sales', x_title='CustomerName', y_title='Amount')
+        with phase('push'):
+            chart3.update_figure(fig3)
 
     # Cross Filter Logic 
     # 清除所有当前激活的筛选条件，恢复仪表板到初始的“无筛选”状态 
     def reset_filters():
+            metrics.EVENTS.inc('reset_filters')
             filters.clear()
             ui.notify('Filters reset', type='positive')
             refresh_dashboard()
@@ -223,6 +197,7 @@ def main():
         if 'points' in event.args and len(event.args['points']) > 0:
             # 注意：event.args['points'][0]['x'] 依赖于你的 X 轴是类别名（如 State 名）。如果 X 是数值，需调整 
             click_val = event.args['points'][0]['x']
+            metrics.EVENTS.inc('handle_click')
             
             # # 这里简单处理：直接更新 
             # filters[column_name] = click_val
@@ -247,6 +222,9 @@ def main():
 
     # Cross Filter Logic 
     # 初始加载调用 refresh_dashboard() 
-    refresh_dashboard() 
+    refresh_dashboard('full') 
+
+# 每个阶段的耗时、点击次数与事件循环延迟，以 Prometheus 文本格式暴露在 /metrics
+metrics.add_metrics_route('/metrics')
 
 ui.run(title='Sales Dashboard', port=8081)
\ No newline at end of file
@@ -1,26 +1,44 @@
 from nicegui import ui
-import pandas as pd
 import altair as alt
-import json
+import os
+
+from sales_data import get_sales_data
+from vega_assets import register_assets, serve_spec, vega_script_tags
 
 
 # ======================
 # 1. Load and clean data
 # ======================
-df_details = pd.read_csv('Details.csv')
-df_orders = pd.read_csv('Orders.csv')
-df = pd.merge(df_details, df_orders, on="Order ID", how="inner")
-
-df.rename(columns={'Sub Category': 'Sub-Category', 'Customer Name': 'CustomerName'}, inplace=True)
-for col in ['Sub-Category', 'Category', 'State', 'CustomerName']:
-    if col in df.columns:
-        df[col] = df[col].astype(str).str.strip()
-        
+# Column aliases ('Sub Category' -> 'Sub-Category', ...) and stripping are handled by sales_data
+df = get_sales_data()
+
 total_amount = df['Amount'].sum()
 total_profit = df['Profit'].sum()
 total_quantity = df['Quantity'].sum()
 total_orders = df['Order ID'].nunique()
 
+# ======================
+# 1b. Pre-aggregated data for the browser
+# ======================
+# 'cube' (default): the charts load a Sub-Category × State × CustomerName table of sums
+#   from a cacheable URL. Its size depends on the number of combinations, not on order lines.
+# 'rows': every merged order line is embedded in the spec (previous behaviour)
+VEGA_DATA_MODE = os.environ.get('VEGA_DATA_MODE', 'cube')
+
+CUBE_DIMENSIONS = ['Sub-Category', 'State', 'CustomerName']
+
+# All charts only sum Amount / Profit, so summing per combination up front gives the same bars
+sales_cube = df.groupby(CUBE_DIMENSIONS, observed=True)[['Amount', 'Profit']].sum().reset_index()
+# Served like the spec (vega_assets.serve_spec): ETag / 304, gzip, and the content hash in the
+# URL, so browsers may cache the response indefinitely
+CUBE_URL = serve_spec('sales_cube', sales_cube.to_dict(orient='records'))
+
+
+if VEGA_DATA_MODE == 'cube':
+    chart_data = alt.UrlData(url=CUBE_URL, format=alt.DataFormat(type='json'))
+else:
+    chart_data = df
+
 # ======================
 # 2. Build Altair Cross-Filter Charts
 # ======================
@@ -33,7 +51,7 @@ customer_selection = alt.selection_point(fields=['CustomerName'], name='customer
 
 
 # Chart 1: Profit by Sub-Category (filtered by customer)
-chart1 = alt.Chart(df).transform_filter(
+chart1 = alt.Chart(chart_data).transform_filter(
     customer_selection  # 新增：响应 customer 筛选
 ).mark_bar().encode(
     x=alt.X('Sub-Category:N', sort='-y', axis=alt.Axis(labelAngle=-45)),
@@ -50,7 +68,7 @@ chart1 = alt.Chart(df).transform_filter(
 
 
 # Chart 2: Top 10 States by Sales (filtered by subcat AND customer)
-chart2 = alt.Chart(df).transform_filter(
+chart2 = alt.Chart(chart_data).transform_filter(
     subcat_selection
 ).transform_filter(
     customer_selection  # 新增
@@ -77,7 +95,7 @@ chart2 = alt.Chart(df).transform_filter(
 
 
 # Chart 3: Top 10 Customers by Sales (filtered by subcat & state, and now selectable)
-chart3 = alt.Chart(df).transform_filter(
+chart3 = alt.Chart(chart_data).transform_filter(
     subcat_selection
 ).transform_filter(
     state_selection
@@ -113,8 +131,11 @@ combined = alt.hconcat(
 )
 
 
-# Convert to JSON spec for embedding
-spec_json = combined.to_json(indent=None)
+# vega / vega-lite / vega-embed routes (local files, or the CDN when not vendored)
+register_assets()
+
+# The spec is served as its own cacheable JSON (vegaEmbed loads it by URL), not inlined per page
+SPEC_URL = serve_spec('dashboard_spec', combined.to_dict())
 
 
 
@@ -124,13 +145,10 @@ spec_json = combined.to_json(indent=None)
 @ui.page('/')
 def main():
     ui.add_head_html(f'''
-        <script src="https://cdn.jsdelivr.net/npm/vega@5    "></script>
-        <script src="https://cdn.jsdelivr.net/npm/vega-lite@5    "></script>
-        <script src="https://cdn.jsdelivr.net/npm/vega-embed@6    "></script>
+        {vega_script_tags()}
         <script>
             document.addEventListener('DOMContentLoaded', () => {{
-                const spec = {spec_json};
-                vegaEmbed('#viz-container', spec, {{ actions: false }})
+                vegaEmbed('#viz-container', '{SPEC_URL}', {{ actions: false }})
                     .catch(console.error);
             }});
         </script>
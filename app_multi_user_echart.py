@@ -1,6 +1,19 @@
-from nicegui import ui
+from fastapi import Request
+from nicegui import app, background_tasks, run, ui
 import pandas as pd
 
+from agg_cache import AggregateCache, make_key
+from chart_data import highlight_colors, range_colors
+from chart_patch import ChartPatchBatch, quiet_props
+from compute_pool import POOL_MODE, LatestRequest, Superseded
+from filter_index import FILTER_COLUMNS, describe_filter, toggle_filter
+from live_data import WATCH_INTERVAL, LiveSalesCube
+import metrics
+from metrics import phase
+from sales_cube import SalesCube
+from session_manager import SessionManager, decode_filters
+from time_index import TIME_COLUMN, bucket_range
+
 # ┌──────────────────────────────────────────────────────────────────────────────┐
 # │ 1. DATA LOADING: 全局只读数据初始化 (只执行一次)                             │
 # │ ──────────────────────────────────────────────────────────────────────────── │
@@ -9,23 +22,20 @@ import pandas as pd
 # │   - 所有 Dashboard 实例共享这份数据，但只能读取，不能修改                    │
 # └──────────────────────────────────────────────────────────────────────────────┘
 
+# 预聚合数据立方体（live_cube）：Sub-Category × State × CustomerName 每个组合一行（带倒排索引），
+# 启动时构建一次，所有 Dashboard 实例共享；点击延迟只取决于组合数量，而非订单行数
+# CSV 追加新行时只把增量并入 cube（live_cube.current 为 (版本号, cube)，整体替换）
 # 模拟数据加载（为了确保代码可运行，这里增加了容错，您保留原有的读取逻辑即可）
 try:
-    df_details = pd.read_csv('Details.csv')
-    df_orders = pd.read_csv('Orders.csv')
-    # 预处理：合并与清洗
-    df_global = pd.merge(df_details, df_orders, on="Order ID", how="inner")
-    
-    # 统一清洗字符串列，避免后续报错
-    for col in ["Sub-Category", "Category", "State", "CustomerName"]:
-        if col in df_global.columns:
-            df_global[col] = df_global[col].astype(str).str.strip()
-            
-    print(f"Data Loaded Successfully: {len(df_global)} rows")
+    # 读取、合并、清洗统一由 sales_data 模块完成（字符串维度列转为 category，内存更小）
+    # 设置 SALES_DATA_STREAMING=1 时分块读取并增量构建 cube，不在内存中保留合并后的明细
+    # 设置 SALES_DATA_COMPACT=1 时改用行级紧凑事实表（fact_table.FactTable：int32 编码 + float32 度量），查询接口相同
+    live_cube = LiveSalesCube()
+    print(f"Data Loaded Successfully: {live_cube.cube.n_cells} cells")
 except Exception as e:
     print(f"Data Load Warning: {e}. Using dummy data for demonstration.")
     # 兜底模拟数据，方便直接运行测试
-    df_global = pd.DataFrame({
+    live_cube = LiveSalesCube(cube=SalesCube(pd.DataFrame({
         'Order ID': [f'Ord-{i}' for i in range(100)],
         'Sub-Category': ['Phones', 'Chairs', 'Tables', 'Storage'] * 25,
         'State': ['Texas', 'California', 'New York', 'Florida'] * 25,
@@ -33,20 +43,110 @@ except Exception as e:
         'Amount': [i * 10 for i in range(100)],
         'Profit': [i * 2 for i in range(100)],
         'Quantity': [i % 5 + 1 for i in range(100)]
-    })
+    })))
+
+# 聚合结果缓存：相同筛选组合在所有 Dashboard 实例之间复用（线程安全，LRU 淘汰）
+cache_global = AggregateCache(maxsize=2048)
+
+# ── 计算层：纯函数（无 UI 依赖，只接收筛选字典），在线程/进程池中执行 ──────────────
+# 每个图表：分组列 -> 数值列
+CHART_VALUES = {'Sub-Category': 'Profit', 'State': 'Amount', 'CustomerName': 'Amount'}
+# 时间趋势面板：按日 / 周 / 月汇总的数值列；'freq' 表示只切换了汇总粒度（不是筛选条件）
+TREND_VALUE = 'Amount'
+TREND_FREQ = 'freq'
+
+def get_marginals(cube, filters):
+    """
+    根据 filters 一次求出所有面板命中的 cube 单元格位置（None 表示全部），通过倒排索引求交集，不复制数据：
+    {None: KPI, 'Sub-Category': ..., 'State': ..., 'CustomerName': ..., TIME_COLUMN: 趋势}
+    每个图表忽略自身的筛选条件 (实现 Cross-Filtering 效果)；只扫描一遍候选单元格，
+    而不是 KPI 与每个图表各求一次交集
+    """
+    # 如果是渲染 'State' 图表，就不要把 'State=Texas' 的筛选加进去，否则只能看到一根柱子
+    # 值的形式：单个值（等值）、frozenset（多选，IN）、(下限, 上限)（日期 / 金额范围）
+    with phase('filter'):
+        return cube.marginal_rows(filters, list(CHART_VALUES) + [TIME_COLUMN])
+
+def compute_kpis(data, filters, get_cells):
+    """KPI 受所有筛选器影响，不需要 ignore；直接在 cube 的数组上求和（空位置数组的和为 0），结果按 (数据版本, 筛选状态) 缓存"""
+    version, cube = data
+    def compute():
+        cells = get_cells(None)
+        with phase('aggregate'):
+            return (
+                cube.total(cells, 'Amount'),
+                cube.total(cells, 'Profit'),
+                cube.total(cells, 'Quantity'),
+                cube.nunique(cells),
+            )
+    return cache_global.get_or_compute((version,) + make_key(filters), compute)
+
+def compute_top_n(data, filters, col_name, val_col, get_cells, top_n=10):
+    """
+    在 cube 上聚合（基于编码的 bincount）并取前 top_n，避免图表太挤；无数据时返回 None。
+    结果按 (数据版本, 筛选状态, 忽略列, 分组列, 数值列, Top N) 缓存，所有用户共享
+    """
+    version, cube = data
+    def compute():
+        cells = get_cells(col_name)
+        if cube.count(cells) == 0:
+            return None
+        # argpartition 部分选择：只对前 top_n 排序，返回 TopK(labels, values) 列表，可直接序列化
+        with phase('aggregate'):
+            return cube.top_k(cells, col_name, val_col, top_n)
+    key = make_key(filters, ignore_col=col_name, group_col=col_name, value_col=val_col, top_n=top_n)
+    return cache_global.get_or_compute((version,) + key, compute)
+
+def compute_trend(data, filters, freq, get_cells):
+    """
+    按日 / 周 / 月汇总 TREND_VALUE（忽略日期范围筛选，显示完整时间轴），无日期数据时返回 None。
+    cube 单元格已按天预聚合，排序好的日期索引 + 预先算好的分桶编号，汇总只需一次 bincount
+    """
+    version, cube = data
+    def compute():
+        cells = get_cells(TIME_COLUMN)
+        with phase('aggregate'):
+            return cube.trend(cells, TREND_VALUE, freq)
+    key = make_key(filters, ignore_col=TIME_COLUMN, group_col=freq, value_col=TREND_VALUE)
+    return cache_global.get_or_compute((version,) + key, compute)
+
+def compute_panels(filters, changed, freq='month'):
+    """
+    一次点击需要的全部计算：KPI 总是重算；图表只依赖“其他”列的筛选，
+    若变化的只有它自己的列，则跳过（结果中不含该图表）。
+    趋势面板同理（自身的列是日期范围），另外在切换汇总粒度时重算。
+    """
+    if POOL_MODE == 'process':
+        live_cube.refresh()  # 进程池中的 worker 各自持有一份 cube，计算前先并入新数据
+    data = live_cube.current  # 整个请求使用同一版本的 cube
+    marginals = {}
+
+    def get_cells(ignore_col):
+        # 第一个未命中缓存的面板触发计算，一次得到所有面板的单元格；全部命中时不做筛选
+        if not marginals:
+            marginals.update(get_marginals(data[1], filters))
+        return marginals[ignore_col]
+
+    results = {'_kpis': compute_kpis(data, filters, get_cells)}
+    for col_name, val_col in CHART_VALUES.items():
+        if changed - {col_name, TREND_FREQ}:
+            results[col_name] = compute_top_n(data, filters, col_name, val_col, get_cells)
+    if changed - {TIME_COLUMN}:
+        results[TIME_COLUMN] = compute_trend(data, filters, freq, get_cells)
+    return results
 
 # ── 辅助函数：ECharts 配置构建器 (纯逻辑，无状态，可放在类外) ────────────────────
-def build_bar_chart_option(title, x_data, y_data, highlight_val=None, base_color='#3b82f6'):
-    """构建 ECharts Option 字典"""
-    series_data = []
-    color_selected = base_color
-    color_unselected = '#cbd5e1'  # 未选中时的浅灰色
-    
-    for x, y in zip(x_data, y_data):
-        # 逻辑：如果没有筛选，或者当前项就是筛选项，则高亮
-        is_highlighted = (highlight_val is None) or (x == highlight_val)
-        current_color = color_selected if is_highlighted else color_unselected
-        series_data.append({'value': y, 'itemStyle': {'color': current_color}})
+COLOR_UNSELECTED = '#cbd5e1'  # 未选中时的浅灰色
+
+def bar_colors(x_data, highlight_val=None, base_color='#3b82f6'):
+    """逻辑：如果没有筛选，或者当前项就是筛选项，则高亮（按掩码一次性计算整列颜色）"""
+    return highlight_colors(x_data, highlight_val, base_color, COLOR_UNSELECTED)
+
+def build_bar_chart_option(title, x_data, y_data, highlight_val=None, base_color='#3b82f6', colors=None):
+    """构建 ECharts Option 字典；colors 为 None 时按 highlight_val 计算每根柱子的颜色"""
+    if colors is None:
+        colors = bar_colors(x_data, highlight_val, base_color)
+    series_data = [{'value': y, 'itemStyle': {'color': c}} for y, c in zip(y_data, colors)]
 
     return {
         'title': {'text': title, 'left': 'center', 'top': '5%', 'textStyle': {'fontSize': 14, 'color': '#333'}},
@@ -69,42 +169,40 @@ def build_bar_chart_option(title, x_data, y_data, highlight_val=None, base_color
 # └──────────────────────────────────────────────────────────────────────────────┘
 
 class Dashboard:
-    def __init__(self):
+    def __init__(self, filters=None):
         # ── 状态管理：每个实例维护独立的筛选字典 ──────────────────────────────────
         # 结构示例: {'State': 'Texas', 'Sub-Category': 'Phones'}
-        self.filters = {} 
+        # filters: 从 URL 恢复的筛选条件（会话被回收后重新打开）
+        self.filters = dict(filters or {})
         
         # ── UI 引用：占位符，build() 时绑定 ──────────────────────────────────────
         self.kpi_labels = {}     # 存储 KPI 的 label 组件引用
         self.chart_sub = None    # 子类别图表引用
         self.chart_state = None  # 州分布图表引用
         self.chart_cust = None   # 客户图表引用
+        self.chart_trend = None  # 时间趋势图表引用
+        self.date_picker = None  # 日期范围选择器
+        self.range_inputs = {}   # 金额 / 利润范围筛选列 -> (下限输入框, 上限输入框)
+        self.multi_select = False  # 多选模式：点击柱子时加入 / 移出所选集合，而不是替换
+        self.trend_freq = 'month'  # 趋势汇总粒度：day / week / month
         self.filter_container = None # 顶部筛选标签容器
 
-    # ── 数据过滤核心 ──────────────────────────────────────────────────────────
-    def get_data(self, ignore_col=None):
-        """
-        根据 self.filters 过滤全局数据 df_global，返回副本。
-        ignore_col: 渲染自身图表时，忽略自身的筛选条件 (实现 Cross-Filtering 效果)
-        """
-        d = df_global.copy()
-        
-        for col, val in self.filters.items():
-            if col == ignore_col: 
-                continue # 如果是渲染 'State' 图表，就不要把 'State=Texas' 的筛选加进去，否则只能看到一根柱子
-            d = d[d[col] == val]
-            
-        return d
+        # ── 增量刷新：记录每个面板上次推送的结果，未变化的面板不再推送 ──────────────
+        self._rendered = {}
+        # ── 异步计算：尚未渲染的筛选变化 + 每个会话只保留最新的计算请求 ──────────────
+        self._pending_changed = set()
+        self._latest = LatestRequest()
+        self.client = None
+        # ── 差量推送：一次刷新中所有图表的 setOption 调用合并为一条 websocket 消息 ──
+        self._patches = ChartPatchBatch()
 
     # ── KPI 渲染 ─────────────────────────────────────────────────────────────
-    def render_kpis(self):
-        d = self.get_data() # KPI 受所有筛选器影响，不需要 ignore
-        
-        # 安全计算，防止空数据报错
-        total_amt = d['Amount'].sum() if not d.empty else 0
-        total_prf = d['Profit'].sum() if not d.empty else 0
-        total_qty = d['Quantity'].sum() if not d.empty else 0
-        total_ord = d['Order ID'].nunique() if not d.empty else 0
+    def render_kpis(self, kpis):
+        # 数值未变化时不推送
+        if self._rendered.get('_kpis') == kpis:
+            return
+        self._rendered['_kpis'] = kpis
+        total_amt, total_prf, total_qty, total_ord = kpis
 
         self.kpi_labels['amt'].set_text(f"${total_amt:,.0f}")
         self.kpi_labels['prf'].set_text(f"${total_prf:,.0f}")
@@ -113,13 +211,17 @@ class Dashboard:
 
     # ── 顶部筛选标签渲染 ──────────────────────────────────────────────────────
     def render_filter_tags(self):
+        # 筛选未变化（趋势粒度切换、数据热更新等）时不重建标签行
+        if self._rendered.get('_filters') == self.filters:
+            return
+        self._rendered['_filters'] = dict(self.filters)
         self.filter_container.clear()
         if self.filters:
             with self.filter_container:
                 ui.label('Active Filters:').classes('text-gray-500 font-bold text-sm my-auto')
                 for k, v in self.filters.items():
                     # 点击标签也可以取消筛选
-                    ui.label(f'{k}: {v}').classes(
+                    ui.label(describe_filter(k, v)).classes(
                         'bg-blue-100 text-blue-800 px-3 py-1 rounded-full text-xs cursor-pointer hover:bg-red-100 hover:text-red-800 transition'
                     ).on('click', lambda _, key=k: self.remove_filter(key)) # 闭包绑定 key
                 
@@ -127,55 +229,149 @@ class Dashboard:
                 ui.button(icon='delete', on_click=self.reset_filters).props('flat dense round color=grey size=sm').tooltip('Clear All')
 
     # ── 通用图表渲染逻辑 ──────────────────────────────────────────────────────
-    def update_chart_component(self, chart_component, col_name, val_col, color, title):
+    def update_chart_component(self, chart_component, results, col_name, val_col, color, title):
         """
         通用的图表刷新逻辑
+        results: compute_panels() 的结果；不含 col_name 说明该图表数据不受本次筛选影响
         """
-        # STEP 1: 获取数据 (ignore_col = col_name)
-        d = self.get_data(ignore_col=col_name)
+        last = self._rendered.get(col_name, False)
+
+        # STEP 0: 依赖判断：图表忽略自身的筛选，数据未重新计算时只需重新着色
+        if col_name not in results:
+            if last:
+                self.recolor_chart_component(chart_component, col_name, color)
+            return
+
+        # STEP 1+2: 聚合结果 (ignore_col = col_name，已在工作线程中计算并缓存)
+        top = results[col_name]
         
-        if d.empty:
+        if top is None:
             # 如果没数据，只更新标题
-            chart_component.options['title'] = {'text': f"{title} (No Data)"}
-            chart_component.update()
+            if last is not None:
+                if last:
+                    with quiet_props(chart_component):
+                        chart_component.options['title'] = {'text': f"{title} (No Data)"}
+                    self._patches.echart_set_option(chart_component, {'title': {'text': f"{title} (No Data)"}})
+                else:
+                    chart_component.options['title'] = {'text': f"{title} (No Data)"}
+                    chart_component.update()
+            self._rendered[col_name] = None
             return
 
-        # STEP 2: 聚合
-        df_grp = d.groupby(col_name)[val_col].sum().reset_index().sort_values(val_col, ascending=False)
-        # 取前10，避免图表太挤
-        df_grp = df_grp.head(10)
-
         # STEP 3: 构建 Option
         current_filter_val = self.filters.get(col_name)
+
+        # 数据和高亮都没变（例如筛选的客户不影响子类的 Top 10）：跳过 websocket 推送
+        if last is not None and last is not False and last[1] == current_filter_val and last[0] == top:
+            return
+        self._rendered[col_name] = (top, current_filter_val)
         
         opt = build_bar_chart_option(
             title=title,
-            x_data=df_grp[col_name].tolist(),
-            y_data=df_grp[val_col].round(0).tolist(),
+            x_data=top.labels,
+            y_data=[round(v) for v in top.values],
             highlight_val=current_filter_val,
             base_color=color
         )
-        
-        # STEP 4: 更新 UI (修正部分)
+
+        # STEP 4a: 柱状图已渲染过：只推送变化的部分（标题、类别、数据与颜色），由 setOption 合并
+        if chart_component.options.get('series'):
+            patch = {
+                'title': opt['title'],
+                'xAxis': [{'data': opt['xAxis'][0]['data']}],
+                'series': [{'data': opt['series'][0]['data']}],
+            }
+            with quiet_props(chart_component):
+                chart_component.options['title'] = opt['title']
+                chart_component.options['xAxis'][0]['data'] = opt['xAxis'][0]['data']
+                chart_component.options['series'][0]['data'] = opt['series'][0]['data']
+            self._patches.echart_set_option(chart_component, patch)
+            return
+
+        # STEP 4b: 首次渲染：发送完整 Option
         # ECharts 的 options 是只读属性，不能直接用 = 赋值
         # 必须先 clear() 内容，再 update() 新内容
         chart_component.options.clear()
         chart_component.options.update(opt)
         chart_component.update()
 
+    def recolor_chart_component(self, chart_component, col_name, color):
+        """只更新柱子颜色（被点击的图表自身数据不变），不重新聚合"""
+        top, last_highlight = self._rendered[col_name]
+        highlight_val = self.filters.get(col_name)
+        if last_highlight == highlight_val:
+            return
+        self._rendered[col_name] = (top, highlight_val)
+        x_data = chart_component.options['xAxis'][0]['data']
+        series_data = chart_component.options['series'][0]['data']
+        with quiet_props(chart_component):
+            for c, item in zip(bar_colors(x_data, highlight_val, color), series_data):
+                item['itemStyle']['color'] = c
+        self._patches.echart_set_option(chart_component, {'series': [{'data': series_data}]})
+
+    def render_trend(self, results):
+        """按日 / 周 / 月的趋势柱状图，所选日期范围内的柱子高亮；已渲染过时只 setOption 差量"""
+        last = self._rendered.get(TIME_COLUMN)
+        series = results.get(TIME_COLUMN, last[0] if last else None)
+        if series is None:
+            return
+        colors = range_colors(series.labels, self.trend_freq, self.filters.get(TIME_COLUMN), '#f59e0b', '#fde68a')
+        if last is not None and last[0] == series and last[1] == colors:
+            return
+        self._rendered[TIME_COLUMN] = (series, colors)
+
+        opt = build_bar_chart_option('Sales Trend', series.labels, [round(v) for v in series.values], colors=colors)
+        opt['xAxis'][0]['axisLabel'] = {'rotate': 45, 'fontSize': 10}  # 按天汇总时柱子很多，标签自动间隔
+        if last is not None:
+            patch = {'xAxis': [{'data': opt['xAxis'][0]['data']}], 'series': [{'data': opt['series'][0]['data']}]}
+            with quiet_props(self.chart_trend):
+                self.chart_trend.options['xAxis'][0]['data'] = opt['xAxis'][0]['data']
+                self.chart_trend.options['series'][0]['data'] = opt['series'][0]['data']
+            self._patches.echart_set_option(self.chart_trend, patch)
+            return
+        self.chart_trend.options.clear()
+        self.chart_trend.options.update(opt)
+        self.chart_trend.update()
+
     # ── 主更新入口 ───────────────────────────────────────────────────────────
-    def update_dashboard(self):
-        """调度所有组件刷新"""
-        self.render_filter_tags()
-        self.render_kpis()
-        
-        # 刷新三个图表
-        self.update_chart_component(self.chart_sub, 'Sub-Category', 'Profit', '#28738a', 'Profit by Sub-Category')
-        self.update_chart_component(self.chart_state, 'State', 'Amount', '#3b82f6', 'Sales by State (Top 10)')
-        self.update_chart_component(self.chart_cust, 'CustomerName', 'Amount', '#10b981', 'Sales by Customer (Top 10)')
+    async def update_dashboard(self, changed=None):
+        """
+        调度所有组件刷新
+        changed: 本次变化的筛选列集合；None 表示全部刷新（首次渲染）。
+        KPI 与筛选标签依赖所有筛选列；每个图表只依赖“其他”筛选列，被点击的图表只需重新着色。
+        筛选 + 聚合在工作线程/进程池中执行，不阻塞事件循环；快速连续点击时旧请求被取消。
+        """
+        if changed is not None:
+            sessions.touch(self)  # 用户操作（首次渲染与数据热更新传入 None）
+        self._pending_changed |= set(FILTER_COLUMNS) | {TIME_COLUMN} if changed is None else set(changed)
+        if not self._pending_changed:
+            return
+        with metrics.REFRESH_SECONDS.time('full' if changed is None else 'interaction'):
+            self.render_filter_tags()
+
+            pending = set(self._pending_changed)
+            try:
+                results = await self._latest.run(compute_panels, dict(self.filters), pending, self.trend_freq)
+            except Superseded:
+                return  # 更新的请求会连同这次的变化一起渲染
+            self._pending_changed -= pending
+
+            # figure：KPI 文本与三个图表的 Option（完整或 setOption 差量）；push：一次性发送差量
+            with phase('figure'):
+                self.render_kpis(results['_kpis'])
+                self.update_chart_component(self.chart_sub, results, 'Sub-Category', 'Profit', '#28738a', 'Profit by Sub-Category')
+                self.update_chart_component(self.chart_state, results, 'State', 'Amount', '#3b82f6', 'Sales by State (Top 10)')
+                self.update_chart_component(self.chart_cust, results, 'CustomerName', 'Amount', '#10b981', 'Sales by Customer (Top 10)')
+                self.render_trend(results)
+            with phase('push'):
+                self._patches.send(self.client)
+
+    def active_filters(self):
+        """当前生效的筛选（紧凑形式，会话回收时只保留这一份）"""
+        return dict(self.filters)
 
     # ── 事件处理器 ───────────────────────────────────────────────────────────
-    def handle_chart_click(self, e, col_name):
+    async def handle_chart_click(self, e, col_name):
         """
         处理 ECharts 点击事件
         e: ECharts 点击事件对象 (NiceGUI 封装)
@@ -183,29 +379,99 @@ class Dashboard:
         """
         if e.name: # e.name 是点击的柱子名称 (例如 'Texas')
             click_val = e.name
+            metrics.EVENTS.inc('handle_chart_click')
             
-            # 逻辑：如果已选中则取消，否则选中
-            if self.filters.get(col_name) == click_val:
+            # 逻辑：如果已选中则取消，否则选中；多选模式下加入 / 移出所选集合
+            value = toggle_filter(self.filters.get(col_name), click_val, self.multi_select)
+            if value is None:
                 self.filters.pop(col_name)
                 ui.notify(f'Removed filter: {col_name}')
             else:
-                self.filters[col_name] = click_val
-                ui.notify(f'Filtered by {col_name}: {click_val}')
+                self.filters[col_name] = value
+                ui.notify(f'Filtered by {describe_filter(col_name, value)}')
             
-            self.update_dashboard()
+            await self.update_dashboard({col_name})
 
-    def remove_filter(self, key):
+    async def remove_filter(self, key):
         if key in self.filters:
+            metrics.EVENTS.inc('remove_filter')
             del self.filters[key]
-            self.update_dashboard()
+            self._sync_date_picker()
+            self._sync_range_inputs()
+            await self.update_dashboard({key})
 
-    def reset_filters(self):
+    async def reset_filters(self):
+        changed = set(self.filters)
         self.filters.clear()
+        metrics.EVENTS.inc('reset_filters')
         ui.notify('All filters reset')
-        self.update_dashboard()
+        self._sync_date_picker()
+        self._sync_range_inputs()
+        await self.update_dashboard(changed)
+
+    async def set_date_range(self, date_range, source):
+        """date_range: (起始, 结束) ISO 日期，含两端；None 表示取消日期筛选。趋势图点击与日期选择器共用"""
+        if self.filters.get(TIME_COLUMN) == date_range:
+            return
+        metrics.EVENTS.inc(source)
+        if date_range is None:
+            self.filters.pop(TIME_COLUMN)
+        else:
+            self.filters[TIME_COLUMN] = date_range
+        self._sync_date_picker()
+        await self.update_dashboard({TIME_COLUMN})
+
+    async def handle_trend_click(self, e):
+        """点击趋势柱子（e.name 是该时间段的标签）：筛选该日 / 周 / 月；再次点击则取消"""
+        if e.name:
+            bucket = bucket_range(e.name, self.trend_freq)
+            await self.set_date_range(None if self.filters.get(TIME_COLUMN) == bucket else bucket, 'handle_trend_click')
+
+    async def handle_date_picker(self, e):
+        # Quasar 的范围选择：{'from': ..., 'to': ...}；只选了一天时是字符串；清空时为 None
+        if isinstance(e.value, dict):
+            date_range = (e.value['from'], e.value['to'])
+        else:
+            date_range = (e.value, e.value) if e.value else None
+        await self.set_date_range(date_range, 'date_picker')
+
+    def _sync_date_picker(self):
+        date_range = self.filters.get(TIME_COLUMN)
+        value = None if date_range is None else {'from': date_range[0] or '', 'to': date_range[1] or ''}
+        if self.date_picker is not None and self.date_picker.value != value:
+            self.date_picker.set_value(value)  # handle_date_picker 发现范围未变化，不会重复刷新
+
+    async def apply_ranges(self):
+        """金额 / 利润范围输入框的“应用”按钮：两端都为空表示取消该列的范围筛选"""
+        changed = set()
+        for col, (lo_input, hi_input) in self.range_inputs.items():
+            lo, hi = lo_input.value, hi_input.value
+            value = None if lo is None and hi is None else (lo, hi)
+            if self.filters.get(col) != value:
+                if value is None:
+                    self.filters.pop(col)
+                else:
+                    self.filters[col] = value
+                changed.add(col)
+        if changed:
+            metrics.EVENTS.inc('apply_ranges')
+            await self.update_dashboard(changed)
+
+    def _sync_range_inputs(self):
+        for col, (lo_input, hi_input) in self.range_inputs.items():
+            lo, hi = self.filters.get(col, (None, None))
+            lo_input.set_value(lo)
+            hi_input.set_value(hi)
+
+    async def set_trend_freq(self, e):
+        if e.value == self.trend_freq:
+            return
+        metrics.EVENTS.inc('set_trend_freq')
+        self.trend_freq = e.value
+        await self.update_dashboard({TREND_FREQ})
 
     # ── UI 构建 ─────────────────────────────────────────────────────────────
-    def build(self):
+    async def build(self):
         # 样式注入
         ui.add_head_html('''
             <style>
@@ -219,6 +485,19 @@ class Dashboard:
             ui.label('📊 Sales Dashboard (Class-Based Architecture)').classes('text-2xl font-bold text-gray-800 px-4 pt-4')
             # 筛选标签容器
             self.filter_container = ui.row().classes('px-4 gap-2 min-h-[32px] items-center')
+            # 多选开关 + 金额 / 利润范围（订单行级筛选，只有行级事实表 SALES_DATA_COMPACT=1 支持）
+            with ui.row().classes('px-4 gap-4 items-center'):
+                ui.switch('Multi-select').bind_value(self, 'multi_select')
+                if live_cube.cube.range_columns:
+                    with ui.button('Amount / Profit range', icon='tune').props('flat dense'):
+                        with ui.menu(), ui.column().classes('p-4 gap-2'):
+                            for col in live_cube.cube.range_columns:
+                                with ui.row().classes('items-center gap-2'):
+                                    ui.label(col).classes('w-16 font-bold')
+                                    self.range_inputs[col] = (ui.number('Min').props('dense clearable'),
+                                                              ui.number('Max').props('dense clearable'))
+                            ui.button('Apply', on_click=self.apply_ranges).props('dense')
+                    self._sync_range_inputs()
 
         # 2. KPI 区域
         kpi_configs = [
@@ -252,8 +531,46 @@ class Dashboard:
                 self.chart_cust = ui.echart({}).classes('w-full h-80')
                 self.chart_cust.on_point_click(lambda e: self.handle_chart_click(e, 'CustomerName'))
 
-        # 4. 初始化首次渲染
-        self.update_dashboard()
+        # 4. 时间趋势区域：汇总粒度切换 + 日期范围选择；点击柱子筛选该时间段
+        with ui.card().classes('chart-card self-stretch mx-4 mt-4'):
+            with ui.row().classes('w-full items-center gap-4 px-2'):
+                ui.toggle(['day', 'week', 'month'], value=self.trend_freq, on_change=self.set_trend_freq).props('dense')
+                with ui.button('Date range', icon='event').props('flat dense'):
+                    with ui.menu():
+                        self.date_picker = ui.date(on_change=self.handle_date_picker).props('range')
+                self._sync_date_picker()
+            self.chart_trend = ui.echart({}).classes('w-full h-72')
+            self.chart_trend.on_point_click(self.handle_trend_click)
+
+        # 注册为在线会话：数据追加后由 refresh_live_data 推送刷新；断开或空闲回收时移除
+        self.client = ui.context.client
+        sessions.register(self, self.client, restored=bool(self.active_filters()))
+
+        # 5. 初始化首次渲染
+        await self.update_dashboard()
+
+# ── 会话管理：跟踪所有常驻的 Dashboard，空闲超时（或超过上限）的会话被回收 ──────────
+# 回收时只把筛选条件写进该标签页的 URL，用户回来时页面重新加载并按 URL 恢复
+sessions = SessionManager()
+sessions.start()
+sessions.add_stats_route('/sessions')  # 会话数、回收/恢复次数；?detail=1 附带每个会话的大小
+
+# ── 监控：/metrics 以 Prometheus 文本格式导出各阶段耗时、点击数、缓存命中率、会话数与事件循环延迟 ──
+# （DASHBOARD_POOL=process 时，filter / aggregate 阶段在 worker 进程中计时，不会出现在这里）
+metrics.register_cache(cache_global)
+metrics.register_sessions(sessions)
+metrics.add_metrics_route('/metrics')
+
+# ── 数据热更新：定时检查 CSV，只把新追加的行并入 cube，再推送给所有在线会话 ────────
+async def refresh_live_data():
+    if not await run.io_bound(live_cube.refresh):
+        return
+    for dashboard in sessions:
+        # 全部面板重算（结果未变化的面板不会推送）
+        background_tasks.create(dashboard.update_dashboard(), name='live refresh')
+
+if WATCH_INTERVAL > 0:
+    app.timer(WATCH_INTERVAL, refresh_live_data)
 
 # ┌──────────────────────────────────────────────────────────────────────────────┐
 # │ 3. ENTRY POINT: 页面入口                                                     │
@@ -262,8 +579,10 @@ class Dashboard:
 # └──────────────────────────────────────────────────────────────────────────────┘
 
 @ui.page('/')
-def index():
-    dashboard = Dashboard()
-    dashboard.build()
+async def index(request: Request):
+    # URL 中带筛选条件（例如被回收的会话重新打开）时直接恢复
+    dashboard = Dashboard(decode_filters(request.query_params, FILTER_COLUMNS,
+                                         range_columns=[TIME_COLUMN] + live_cube.cube.range_columns))
+    await dashboard.build()
 
 ui.run(title='Sales Dashboard Refactored', port=8081)
\ No newline at end of file
@@ -1,24 +1,125 @@
-from nicegui import ui
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+from fastapi import Request
+from nicegui import app, background_tasks, run, ui
+
+from agg_cache import AggregateCache, make_key
+from chart_data import highlight_colors, range_colors
+from chart_patch import ChartPatchBatch
+from figure_builder import bar_figure
+from filter_index import FILTER_COLUMNS, describe_filter, toggle_filter
+from compute_pool import POOL_MODE, LatestRequest, Superseded
+from live_data import WATCH_INTERVAL, LiveSalesCube
+import metrics
+from metrics import phase
+from session_manager import SessionManager, decode_filters
+from time_index import TIME_COLUMN, bucket_range
 
 # ┌──────────────────────────────────────────────────────────────────────────────┐
 # │ 1. DATA LOADING: 全局只读数据初始化                                          │
 # │ ──────────────────────────────────────────────────────────────────────────── │
 # │ - 此处代码在服务器启动时仅运行一次。                                         │
-# │ - 1000个用户共享同一份 df_global 内存，极大节省资源。                        │
+# │ - 1000个用户共享同一份 live_cube 内存，极大节省资源。                        │
 # └──────────────────────────────────────────────────────────────────────────────┘
-df_details = pd.read_csv('Details.csv')
-df_orders = pd.read_csv('Orders.csv')
-df_global = pd.merge(df_details, df_orders, on="Order ID", how="inner")
-
-
-# 数据清洗（全局统一处理）
-if "Sub-Category" in df_global.columns:
-    df_global["Sub-Category"] = df_global["Sub-Category"].astype(str).str.strip()
-if "Category" in df_global.columns:
-    df_global["Category"] = df_global["Category"].astype(str).str.strip()
+# 数据加载、合并、清洗统一由 sales_data 模块负责（分类列为 category 类型，节省内存）
+# 多进程部署时设置 SALES_DATA_SHARED_DIR（如 /dev/shm/sales），各 worker 进程以只读 mmap 共享同一份数据
+# 数据量超过内存时设置 SALES_DATA_STREAMING=1：分块读取 Details.csv 并增量构建 cube，不保留明细行
+# 设置 SALES_DATA_COMPACT=1 时改用行级紧凑事实表（fact_table.FactTable：int32 编码 + float32 度量），查询接口相同
+# 预聚合数据立方体：Sub-Category × State × CustomerName 每个组合一行（带倒排索引），
+# 启动时构建一次，所有用户共享；点击延迟只取决于组合数量，而非订单行数
+# CSV 追加新行时只把增量并入 cube（live_cube.current 为 (版本号, cube)，整体替换）
+live_cube = LiveSalesCube()
+# 聚合结果缓存：相同筛选组合（如 {'State': 'Delhi'}）在所有用户之间复用，LRU 淘汰
+cache_global = AggregateCache(maxsize=2048)
+
+# ── 计算层：纯函数（无 UI 依赖），在线程/进程池中执行 ─────────────────────────
+# 每个图表：分组列 -> 数值列
+CHART_VALUES = {'Sub-Category': 'Profit', 'State': 'Amount', 'CustomerName': 'Amount'}
+# 时间趋势面板：按日 / 周 / 月汇总的数值列；'freq' 表示只切换了汇总粒度（不是筛选条件）
+TREND_VALUE = 'Amount'
+TREND_FREQ = 'freq'
+
+def get_marginals(cube, state):
+    """
+    根据筛选状态一次求出所有面板命中的 cube 单元格位置（None 表示全部），不复制 DataFrame：
+    {None: KPI（应用所有筛选）, 'Sub-Category': ..., 'State': ..., 'CustomerName': ..., TIME_COLUMN: 趋势}
+    每个图表忽略自身的筛选，用于 Cross-Filtering（交叉筛选）：
+    例如：渲染“州”图表时，应该忽略“州”的筛选条件，以便用户能看到其他州的柱子（非选中状态）。
+    只扫描一遍候选单元格，而不是 KPI 与每个图表各求一次交集（4 个图表 5 次）
+    """
+    # 'All' 表示未筛选；其余条件通过倒排索引求交集
+    # 值的形式：单个值（等值）、frozenset（多选，IN）、(下限, 上限)（日期 / 金额范围）
+    active = {col: val for col, val in state.items() if val != 'All'}
+    with phase('filter'):
+        return cube.marginal_rows(active, list(CHART_VALUES) + [TIME_COLUMN])
+
+def compute_kpis(data, state, get_cells):
+    """返回 (Amount, Profit, Quantity, 订单数)，无数据时返回 None；结果按 (数据版本, 筛选状态) 缓存"""
+    version, cube = data
+    def compute():
+        cells = get_cells(None)
+        if cube.count(cells) == 0:
+            return None
+        with phase('aggregate'):
+            return (
+                cube.total(cells, 'Amount'),
+                cube.total(cells, 'Profit'),
+                cube.total(cells, 'Quantity'),
+                cube.nunique(cells),
+            )
+    return cache_global.get_or_compute((version,) + make_key(state), compute)
+
+def compute_top_n(data, state, group_col, value_col, get_cells, top_n=10):
+    """
+    按 group_col 汇总 value_col 并取前 top_n（忽略自身的筛选，以显示完整上下文），无数据时返回 None。
+    结果按 (数据版本, 筛选状态, 忽略列, 分组列, 数值列, Top N) 缓存，命中时不再计算
+    """
+    version, cube = data
+    def compute():
+        cells = get_cells(group_col)
+        if cube.count(cells) == 0:
+            return None
+        # bincount 汇总 + argpartition 部分选择：只对前 top_n 排序（CustomerName 类别很多）
+        with phase('aggregate'):
+            return cube.top_k(cells, group_col, value_col, top_n)
+    key = make_key(state, ignore_col=group_col, group_col=group_col, value_col=value_col, top_n=top_n)
+    return cache_global.get_or_compute((version,) + key, compute)
+
+def compute_trend(data, state, freq, get_cells):
+    """
+    按日 / 周 / 月汇总 TREND_VALUE（忽略日期范围筛选，以显示完整时间轴并高亮所选范围），无日期数据时返回 None。
+    cube 单元格已按天预聚合，排序好的日期索引 + 预先算好的分桶编号，汇总只需一次 bincount
+    """
+    version, cube = data
+    def compute():
+        cells = get_cells(TIME_COLUMN)
+        with phase('aggregate'):
+            return cube.trend(cells, TREND_VALUE, freq)
+    key = make_key(state, ignore_col=TIME_COLUMN, group_col=freq, value_col=TREND_VALUE)
+    return cache_global.get_or_compute((version,) + key, compute)
+
+def compute_panels(state, changed, freq='month'):
+    """
+    一次点击需要的全部计算：KPI 总是重算；图表只依赖“其他”列的筛选，
+    若变化的只有它自己的列，则跳过（结果中不含该图表）。
+    趋势面板同理（自身的列是日期范围），另外在切换汇总粒度时重算。
+    """
+    if POOL_MODE == 'process':
+        live_cube.refresh()  # 进程池中的 worker 各自持有一份 cube，计算前先并入新数据
+    data = live_cube.current  # 整个请求使用同一版本的 cube
+    marginals = {}
+
+    def get_cells(ignore_col):
+        # 第一个未命中缓存的面板触发计算，一次得到所有面板的单元格；全部命中时不做筛选
+        if not marginals:
+            marginals.update(get_marginals(data[1], state))
+        return marginals[ignore_col]
+
+    results = {'_kpis': compute_kpis(data, state, get_cells)}
+    for group_col, value_col in CHART_VALUES.items():
+        if changed - {group_col, TREND_FREQ}:
+            results[group_col] = compute_top_n(data, state, group_col, value_col, get_cells)
+    if changed - {TIME_COLUMN}:
+        results[TIME_COLUMN] = compute_trend(data, state, freq, get_cells)
+    return results
 
 # ┌──────────────────────────────────────────────────────────────────────────────┐
 # │ 2. DASHBOARD CLASS: 核心交互式仪表板类                                       │
@@ -28,14 +129,21 @@ if "Category" in df_global.columns:
 # └──────────────────────────────────────────────────────────────────────────────┘
 
 class Dashboard:
-    def __init__(self):
+    def __init__(self, filters=None):
         # ── 状态管理 ──
-        # 使用 'All' 代表未筛选
+        # 使用 'All' 代表未筛选；filters: 从 URL 恢复的筛选条件（会话被回收后重新打开）
         self.state = {
             'Sub-Category': 'All',
             'State': 'All',
-            'CustomerName': 'All'
+            'CustomerName': 'All',
+            TIME_COLUMN: 'All',  # 日期范围：(起始日期, 结束日期)，ISO 字符串，含两端
         }
+        # 订单行金额 / 利润范围：(下限, 上限)，None 表示不限；只有行级事实表（SALES_DATA_COMPACT=1）支持
+        for col in live_cube.cube.range_columns:
+            self.state[col] = 'All'
+        self.state.update(filters or {})
+        self.trend_freq = 'month'
+        self.multi_select = False  # 多选模式：点击柱子时加入 / 移出所选集合，而不是替换
 
         # ── UI 组件引用 (占位符) ──
         self.filter_container = None
@@ -47,34 +155,27 @@ class Dashboard:
         self.chart_subcat = None
         self.chart_state = None
         self.chart_customer = None
-
-    # ── 数据核心：智能筛选引擎 ──────────────────────────────────────────────────
-    def get_data(self, ignore_subcat=False, ignore_state=False, ignore_customer=False):
-        """
-        根据 self.state 返回筛选后的数据副本。
-        参数 ignore_xxx 用于 Cross-Filtering（交叉筛选）：
-        例如：渲染“州”图表时，应该忽略“州”的筛选条件，以便用户能看到其他州的柱子（非选中状态）。
-        """
-        d = df_global.copy()
-
-        # 1. 应用 Sub-Category 筛选
-        if not ignore_subcat and self.state['Sub-Category'] != 'All':
-            d = d[d['Sub-Category'] == self.state['Sub-Category']]
-        
-        # 2. 应用 State 筛选
-        if not ignore_state and self.state['State'] != 'All':
-            d = d[d['State'] == self.state['State']]
-
-        # 3. 应用 CustomerName 筛选
-        if not ignore_customer and self.state['CustomerName'] != 'All':
-            d = d[d['CustomerName'] == self.state['CustomerName']]
-
-        return d
+        self.chart_trend = None
+        self.date_picker = None
+        self.range_inputs = {}  # 范围筛选列 -> (下限输入框, 上限输入框)
+
+        # ── 增量刷新：记录每个图表上次推送的 (聚合结果, 颜色)，未变化的面板不再推送 ──
+        self._rendered = {}
+        # ── 异步计算：尚未渲染的筛选变化 + 每个会话只保留最新的计算请求 ──────────
+        self._pending_changed = set()
+        self._latest = LatestRequest()
+        self.client = None
+        # ── 差量推送：一次刷新中所有图表的 restyle 调用合并为一条 websocket 消息 ──
+        self._patches = ChartPatchBatch()
 
     # ── 渲染器：顶部状态标签 ────────────────────────────────────────────────────
     def render_filters_label(self):
+        # 筛选未变化（趋势粒度切换、数据热更新等）时不重建标签行
+        if self._rendered.get('_filters') == self.active_filters():
+            return
+        self._rendered['_filters'] = self.active_filters()
         self.filter_container.clear()
-        active_filters = [f"{k}: {v}" for k, v in self.state.items() if v != 'All']
+        active_filters = [describe_filter(k, v) for k, v in self.state.items() if v != 'All']
         
         with self.filter_container:
             if not active_filters:
@@ -87,61 +188,103 @@ class Dashboard:
                 ui.button('Reset', on_click=self.reset_filters, icon='close').props('flat dense color=red size=sm ml-2')
 
     # ── 渲染器：KPI 卡片 ────────────────────────────────────────────────────────
-    def render_kpis(self):
-        # KPI 需要应用所有筛选条件
-        d = self.get_data()
+    def render_kpis(self, kpis):
+        # 数值未变化时不推送
+        if '_kpis' in self._rendered and self._rendered['_kpis'] == kpis:
+            return
+        self._rendered['_kpis'] = kpis
         
-        if d.empty:
+        if kpis is None:
             self.kpi_amount.set_text('$0')
             self.kpi_profit.set_text('$0')
             self.kpi_quantity.set_text('0')
             self.kpi_orders.set_text('0')
             return
 
-        self.kpi_amount.set_text(f"${d['Amount'].sum():,.0f}")
-        self.kpi_profit.set_text(f"${d['Profit'].sum():,.0f}")
-        self.kpi_quantity.set_text(f"{d['Quantity'].sum():,}")
-        self.kpi_orders.set_text(f"{d['Order ID'].nunique():,}")
+        amount, profit, quantity, orders = kpis
+        self.kpi_amount.set_text(f"${amount:,.0f}")
+        self.kpi_profit.set_text(f"${profit:,.0f}")
+        self.kpi_quantity.set_text(f"{quantity:,}")
+        self.kpi_orders.set_text(f"{orders:,}")
 
     # ── 渲染器：通用图表逻辑 ────────────────────────────────────────────────────
-    def _update_bar_chart(self, chart_element, data_func, group_col, value_col, title, color_hex):
+    def _update_bar_chart(self, chart_element, results, group_col, value_col, title, color_hex):
         """
         通用辅助函数，用于绘制带有高亮逻辑的柱状图
+        results: compute_panels() 的结果；不含 group_col 说明该图表数据不受本次筛选影响
         """
-        # 1. 获取数据（忽略自身的筛选，以显示完整上下文）
-        d = data_func() 
-        
-        if d.empty:
-            chart_element.update_figure(go.Figure())
+        last = self._rendered.get(group_col)
+
+        # 0. 依赖判断：图表忽略自身的筛选条件，数据未重新计算时只需重新着色
+        if group_col not in results:
+            if last is not None:
+                self._recolor_bar_chart(chart_element, last[0], group_col, color_hex)
             return
 
-        # 2. 聚合排序
-        df_agg = d.groupby(group_col)[value_col].sum().reset_index().sort_values(value_col, ascending=False).head(10)
+        # 1+2. 聚合排序结果 TopK(labels, values)（已在工作线程中计算，并按筛选状态缓存）
+        top = results[group_col]
+        
+        if top is None:
+            if last is None or last[0] is not None:
+                chart_element.update_figure({'data': [], 'layout': {}})
+            self._rendered[group_col] = (None, None)
+            return
         
         # 3. 计算颜色（高亮选中项）
+        colors = self._bar_colors(top, group_col, color_hex)
+
+        # 数据与颜色都没变（例如筛选的客户不影响 Top 10 子类）：跳过重绘和 websocket 推送
+        if last is not None and last[0] is not None and last[1] == colors and last[0] == top:
+            return
+        self._rendered[group_col] = (top, colors)
+
+        # 4. 已有柱状图：只推送变化的部分（类别顺序 x、数值 y、颜色），不重发模板和布局
+        if last is not None and last[0] is not None:
+            x, y = top.labels, top.values
+            update = {}
+            if last[0].labels != x:
+                update['x'] = [x]
+            if last[0].values != y:
+                update['y'] = [y]
+            if last[1] != colors:
+                update['marker.color'] = [colors]
+            trace = chart_element.figure['data'][0]
+            trace['x'], trace['y'], trace['marker']['color'] = x, y, colors
+            self._patches.plotly_restyle(chart_element, update)
+            return
+
+        # 5. 首次绘图（或之前无数据）：发送完整 figure
+        # 与 px.bar(template='plotly_white') + update_layout/update_traces 结果相同，
+        # 但直接拼 dict（模板与布局已缓存），不经过 plotly 的校验与模板合并
+        # 以 dict 保存：后续差量更新直接修改 data[0]，服务端状态与浏览器保持一致
+        chart_element.update_figure(bar_figure(
+            top.labels, top.values, colors,
+            title=title, x_title=group_col, y_title=value_col,
+        ))
+
+    def _bar_colors(self, top, group_col, color_hex):
         current_selection = self.state[group_col]
-        # 逻辑：如果没有选中，全深色；如果选中了某项，该项深色，其他浅色
-        colors = [
-            color_hex if (current_selection == 'All' or x == current_selection) else '#e2e8f0' 
-            for x in df_agg[group_col]
-        ]
-
-        # 4. 绘图
-        fig = px.bar(df_agg, x=group_col, y=value_col, title=title, template='plotly_white')
-        fig.update_layout(
-            margin=dict(l=20, r=20, t=40, b=20), 
-            paper_bgcolor='rgba(0,0,0,0)', 
-            clickmode='event+select'
-        )
-        fig.update_traces(marker_color=colors)
-        chart_element.update_figure(fig)
+        # 逻辑：如果没有选中，全深色；如果选中了某项，该项深色，其他浅色（向量化掩码）
+        selected = None if current_selection == 'All' else current_selection
+        return highlight_colors(top.labels, selected, color_hex, '#e2e8f0')
+
+    def _recolor_bar_chart(self, chart_element, top, group_col, color_hex):
+        """只更新柱子颜色（点击的图表自身数据不变），不重新聚合、不重建 figure"""
+        if top is None:
+            return
+        colors = self._bar_colors(top, group_col, color_hex)
+        if self._rendered[group_col][1] == colors:
+            return
+        self._rendered[group_col] = (top, colors)
+        chart_element.figure['data'][0]['marker']['color'] = colors
+        self._patches.plotly_restyle(chart_element, {'marker.color': [colors]})
 
     # ── 渲染器：具体图表调用 ────────────────────────────────────────────────────
-    def render_charts(self):
+    def render_charts(self, results):
         # 1. Sub-Category 图表 (忽略 Sub-Category 筛选)
         self._update_bar_chart(
             chart_element=self.chart_subcat,
-            data_func=lambda: self.get_data(ignore_subcat=True),
+            results=results,
             group_col='Sub-Category',
             value_col='Profit',
             title='Profit by Sub-Category',
@@ -151,7 +294,7 @@ class Dashboard:
         # 2. State 图表 (忽略 State 筛选)
         self._update_bar_chart(
             chart_element=self.chart_state,
-            data_func=lambda: self.get_data(ignore_state=True),
+            results=results,
             group_col='State',
             value_col='Amount',
             title='Top 10 States by Sales',
@@ -161,42 +304,164 @@ class Dashboard:
         # 3. Customer 图表 (忽略 CustomerName 筛选)
         self._update_bar_chart(
             chart_element=self.chart_customer,
-            data_func=lambda: self.get_data(ignore_customer=True),
+            results=results,
             group_col='CustomerName',
             value_col='Amount',
             title='Top 10 Customers by Sales',
             color_hex='#10b981' # Green
         )
 
+    # ── 渲染器：时间趋势 ────────────────────────────────────────────────────────
+    def render_trend(self, results):
+        """按日 / 周 / 月的趋势柱状图，所选日期范围内的柱子高亮；与其他图表相同的增量推送逻辑"""
+        last = self._rendered.get(TIME_COLUMN)
+        series = results.get(TIME_COLUMN, last[0] if last else None)
+        if series is None:
+            return
+        date_range = self.state[TIME_COLUMN]
+        colors = range_colors(series.labels, self.trend_freq, None if date_range == 'All' else date_range,
+                              '#f59e0b', '#fde68a')
+        if last is not None and last[0] == series and last[1] == colors:
+            return
+        self._rendered[TIME_COLUMN] = (series, colors)
+
+        if last is not None:
+            update = {'marker.color': [colors]}
+            if last[0] != series:
+                update.update({'x': [series.labels], 'y': [series.values]})
+            trace = self.chart_trend.figure['data'][0]
+            trace['x'], trace['y'], trace['marker']['color'] = series.labels, series.values, colors
+            self._patches.plotly_restyle(self.chart_trend, update)
+            return
+        self.chart_trend.update_figure(bar_figure(
+            series.labels, series.values, colors,
+            title='Sales Trend', x_title=TIME_COLUMN, y_title=TREND_VALUE,
+        ))
+
     # ── 主刷新入口 ──────────────────────────────────────────────────────────────
-    def update_dashboard(self):
-        self.render_filters_label()
-        self.render_kpis()
-        self.render_charts()
+    async def update_dashboard(self, changed=None):
+        """
+        changed: 本次变化的筛选列集合；None 表示全部刷新（首次渲染）。
+        KPI 与筛选标签依赖所有筛选列；每个图表只依赖“其他”筛选列，
+        被点击的图表只需重新着色。
+        筛选 + 聚合在工作线程/进程池中执行，不阻塞事件循环；
+        用户快速连续点击时，旧请求被取消，只渲染最新结果。
+        """
+        if changed is not None:
+            sessions.touch(self)  # 用户操作（首次渲染与数据热更新传入 None）
+        self._pending_changed |= set(self.state) if changed is None else set(changed)
+        if not self._pending_changed:
+            return
+        with metrics.REFRESH_SECONDS.time('full' if changed is None else 'interaction'):
+            self.render_filters_label()
+
+            pending = set(self._pending_changed)
+            try:
+                results = await self._latest.run(compute_panels, dict(self.state), pending, self.trend_freq)
+            except Superseded:
+                return  # 更新的请求会连同这次的变化一起渲染
+            self._pending_changed -= pending
+
+            # figure：构建 KPI 文本与图表（完整 figure 或差量 restyle）；push：一次性发送差量
+            with phase('figure'):
+                self.render_kpis(results['_kpis'])
+                self.render_charts(results)
+                self.render_trend(results)
+            with phase('push'):
+                self._patches.send(self.client)
+
+    def active_filters(self):
+        """当前生效的筛选（紧凑形式，会话回收时只保留这一份）"""
+        return {k: v for k, v in self.state.items() if v != 'All'}
 
     # ── 事件处理 ────────────────────────────────────────────────────────────────
-    def reset_filters(self):
+    async def reset_filters(self):
+        changed = {k for k, v in self.state.items() if v != 'All'}
         self.state = {k: 'All' for k in self.state}
+        metrics.EVENTS.inc('reset_filters')
         ui.notify('Filters reset', type='positive')
-        self.update_dashboard()
+        self._sync_date_picker()
+        self._sync_range_inputs()
+        await self.update_dashboard(changed)
 
-    def handle_click(self, event, col_name):
+    async def handle_click(self, event, col_name):
         """通用点击处理函数"""
         if event.args and 'points' in event.args and len(event.args['points']) > 0:
             clicked_val = event.args['points'][0]['x']
+            metrics.EVENTS.inc('handle_click')
             
-            # 切换逻辑：点击已选中的则取消，否则选中
-            if self.state[col_name] == clicked_val:
+            # 切换逻辑：点击已选中的则取消，否则选中；多选模式下加入 / 移出所选集合
+            current = self.state[col_name]
+            value = toggle_filter(None if current == 'All' else current, clicked_val, self.multi_select)
+            if value is None:
                 self.state[col_name] = 'All'
                 ui.notify(f'Removed filter: {col_name}', type='info')
             else:
-                self.state[col_name] = clicked_val
-                ui.notify(f'Filtered by {col_name}: {clicked_val}', type='info')
+                self.state[col_name] = value
+                ui.notify(f'Filtered by {describe_filter(col_name, value)}', type='info')
             
-            self.update_dashboard()
+            await self.update_dashboard({col_name})
+
+    async def set_date_range(self, date_range, source):
+        """date_range: (起始, 结束) 或 'All'；趋势图点击与日期选择器共用"""
+        if self.state[TIME_COLUMN] == date_range:
+            return
+        metrics.EVENTS.inc(source)
+        self.state[TIME_COLUMN] = date_range
+        self._sync_date_picker()
+        await self.update_dashboard({TIME_COLUMN})
+
+    async def handle_trend_click(self, event):
+        """点击趋势柱子：筛选该日 / 周 / 月；再次点击同一根柱子则取消"""
+        if event.args and event.args.get('points'):
+            bucket = bucket_range(str(event.args['points'][0]['x'])[:10], self.trend_freq)
+            await self.set_date_range('All' if self.state[TIME_COLUMN] == bucket else bucket, 'handle_trend_click')
+
+    async def handle_date_picker(self, event):
+        # Quasar 的范围选择：{'from': ..., 'to': ...}；只选了一天时是字符串；清空时为 None
+        value = event.value
+        if isinstance(value, dict):
+            date_range = (value['from'], value['to'])
+        elif value:
+            date_range = (value, value)
+        else:
+            date_range = 'All'
+        await self.set_date_range(date_range, 'date_picker')
+
+    def _sync_date_picker(self):
+        date_range = self.state[TIME_COLUMN]
+        value = None if date_range == 'All' else {'from': date_range[0] or '', 'to': date_range[1] or ''}
+        if self.date_picker is not None and self.date_picker.value != value:
+            self.date_picker.set_value(value)  # handle_date_picker 发现范围未变化，不会重复刷新
+
+    async def apply_ranges(self):
+        """金额 / 利润范围输入框的“应用”按钮：两端都为空表示取消该列的范围筛选"""
+        changed = set()
+        for col, (lo_input, hi_input) in self.range_inputs.items():
+            lo, hi = lo_input.value, hi_input.value
+            value = 'All' if lo is None and hi is None else (lo, hi)
+            if self.state[col] != value:
+                self.state[col] = value
+                changed.add(col)
+        if changed:
+            metrics.EVENTS.inc('apply_ranges')
+            await self.update_dashboard(changed)
+
+    def _sync_range_inputs(self):
+        for col, (lo_input, hi_input) in self.range_inputs.items():
+            lo, hi = (None, None) if self.state[col] == 'All' else self.state[col]
+            lo_input.set_value(lo)
+            hi_input.set_value(hi)
+
+    async def set_trend_freq(self, event):
+        if event.value == self.trend_freq:
+            return
+        metrics.EVENTS.inc('set_trend_freq')
+        self.trend_freq = event.value
+        await self.update_dashboard({TREND_FREQ})
 
     # ── UI 构建 ────────────────────────────────────────────────────────────────
-    def build(self):
+    async def build(self):
         # 自定义 CSS
         ui.add_head_html('''
             <style>
@@ -212,6 +477,19 @@ class Dashboard:
             ui.label('📊 Sales Overview Dashboard').classes('text-2xl font-bold text-gray-800')
             # 筛选标签容器
             self.filter_container = ui.row().classes('items-center gap-2 min-h-[32px]')
+            # 多选开关 + 金额 / 利润范围（行级事实表才有）
+            with ui.row().classes('items-center gap-4'):
+                ui.switch('Multi-select').bind_value(self, 'multi_select')
+                if live_cube.cube.range_columns:
+                    with ui.button('Amount / Profit range', icon='tune').props('flat dense'):
+                        with ui.menu(), ui.column().classes('p-4 gap-2'):
+                            for col in live_cube.cube.range_columns:
+                                with ui.row().classes('items-center gap-2'):
+                                    ui.label(col).classes('w-16 font-bold')
+                                    self.range_inputs[col] = (ui.number('Min').props('dense clearable'),
+                                                              ui.number('Max').props('dense clearable'))
+                            ui.button('Apply', on_click=self.apply_ranges).props('dense')
+                    self._sync_range_inputs()
 
         # 2. KPI 行
         with ui.row().classes('w-full justify-between gap-4 mb-8'):
@@ -248,8 +526,46 @@ class Dashboard:
                 self.chart_customer = ui.plotly({}).classes('w-full h-80')
                 self.chart_customer.on('plotly_click', lambda e: self.handle_click(e, 'CustomerName'))
 
+        # 4. 时间趋势行：汇总粒度切换 + 日期范围选择；点击柱子筛选该时间段
+        with ui.card().classes('chart-card w-full mt-4'):
+            with ui.row().classes('w-full items-center gap-4 px-2'):
+                ui.toggle(['day', 'week', 'month'], value=self.trend_freq, on_change=self.set_trend_freq).props('dense')
+                with ui.button('Date range', icon='event').props('flat dense'):
+                    with ui.menu():
+                        self.date_picker = ui.date(on_change=self.handle_date_picker).props('range')
+                self._sync_date_picker()
+            self.chart_trend = ui.plotly({}).classes('w-full h-72')
+            self.chart_trend.on('plotly_click', self.handle_trend_click)
+
+        # 注册为在线会话：数据追加后由 refresh_live_data 推送刷新；断开或空闲回收时移除
+        self.client = ui.context.client
+        sessions.register(self, self.client, restored=bool(self.active_filters()))
+
         # 初始化首次渲染
-        self.update_dashboard()
+        await self.update_dashboard()
+
+# ── 会话管理：跟踪所有常驻的 Dashboard，空闲超时（或超过上限）的会话被回收 ──────────
+# 回收时只把筛选条件写进该标签页的 URL，用户回来时页面重新加载并按 URL 恢复
+sessions = SessionManager()
+sessions.start()
+sessions.add_stats_route('/sessions')  # 会话数、回收/恢复次数；?detail=1 附带每个会话的大小
+
+# ── 监控：/metrics 以 Prometheus 文本格式导出各阶段耗时、点击数、缓存命中率、会话数与事件循环延迟 ──
+# （DASHBOARD_POOL=process 时，filter / aggregate 阶段在 worker 进程中计时，不会出现在这里）
+metrics.register_cache(cache_global)
+metrics.register_sessions(sessions)
+metrics.add_metrics_route('/metrics')
+
+# ── 数据热更新：定时检查 CSV，只把新追加的行并入 cube，再推送给所有在线会话 ────────
+async def refresh_live_data():
+    if not await run.io_bound(live_cube.refresh):
+        return
+    for dashboard in sessions:
+        # 全部面板重算（结果未变化的面板不会推送）
+        background_tasks.create(dashboard.update_dashboard(), name='live refresh')
+
+if WATCH_INTERVAL > 0:
+    app.timer(WATCH_INTERVAL, refresh_live_data)
 
 # ┌──────────────────────────────────────────────────────────────────────────────┐
 # │ 3. ENTRY POINT: 页面入口                                                     │
@@ -257,9 +573,10 @@ class Dashboard:
 # └──────────────────────────────────────────────────────────────────────────────┘
 
 @ui.page('/')
-def index():
-    # 为每个新连接创建一个独立的 Dashboard 实例
-    dashboard = Dashboard()
-    dashboard.build()
+async def index(request: Request):
+    # 为每个新连接创建一个独立的 Dashboard 实例（URL 中带筛选条件时直接恢复）
+    dashboard = Dashboard(decode_filters(request.query_params, FILTER_COLUMNS,
+                                         range_columns=[TIME_COLUMN] + live_cube.cube.range_columns))
+    await dashboard.build()
 
 ui.run(title='Sales Dashboard Best Practice', port=8081)
\ No newline at end of file
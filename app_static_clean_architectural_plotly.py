@@ -1,33 +1,56 @@
+import os
+import threading
+
 from nicegui import ui
-import pandas as pd
 import plotly.express as px
 
+from sales_data import DETAILS_PATH, ORDERS_PATH, load_sales_data_cached
+
 # ==========================================
 # 1. DATA LAYER
 # Responsibilities: Loading, Merging, Cleaning
 # ==========================================
-def get_sales_data():
+class SalesDataProvider:
     """
-    Reads CSV files, performs inner join, and cleans string columns.
-    Returns: A tuple of (df_global, df_for_kpis) or just the main dataframe.
+    Process-wide holder of the merged DataFrame (see sales_data).
+    The CSVs are only re-read when their size or modification time changes;
+    every reload bumps `version`, which downstream caches are keyed on.
     """
-    try:
-        # Load Data
-        df_details = pd.read_csv('Details.csv')
-        df_orders = pd.read_csv('Orders.csv')
-        
-        # Merge Data (Inner Join)
-        df = pd.merge(df_details, df_orders, on="Order ID", how="inner")
-        
-        # Cleaning: Handle potential string issues in categories
-        for col in ['Sub-Category', 'Category']:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.strip()
-                
-        return df
-    except FileNotFoundError:
-        ui.notify("Error: CSV files not found. Please ensure Details.csv and Orders.csv exist.", type='negative')
-        return pd.DataFrame() # Return empty DF to prevent crash
+
+    def __init__(self, details_path: str = DETAILS_PATH, orders_path: str = ORDERS_PATH):
+        self.paths = (details_path, orders_path)
+        self.version = 0
+        self._signature = None
+        self._df = None
+        self._lock = threading.Lock()
+
+    def _current_signature(self):
+        # One stat() per file: cheap enough to run on every page load
+        try:
+            return tuple((st.st_size, st.st_mtime_ns) for st in map(os.stat, self.paths))
+        except FileNotFoundError:
+            return None
+
+    def get(self):
+        """
+        Returns (version, df). df is shared by all visitors and must not be modified;
+        it is None when a CSV file is missing (an empty df means the join matched no rows).
+        """
+        signature = self._current_signature()
+        with self._lock:
+            if self.version == 0 or signature != self._signature:
+                try:
+                    # Load, merge (inner join on Order ID) and clean via the shared data layer.
+                    # Dimension columns come back as categoricals.
+                    self._df = load_sales_data_cached(*self.paths)
+                except FileNotFoundError:
+                    self._df = None
+                self._signature = signature
+                self.version += 1
+            return self.version, self._df
+
+
+data_provider = SalesDataProvider()
 
 # ==========================================
 # 2. LOGIC & CHART LAYER
@@ -40,7 +63,7 @@ def create_profit_by_subcategory_chart(df):
     if df.empty: return None
     
     # Aggregation
-    data = df.groupby('Sub-Category')['Profit'].sum().reset_index()
+    data = df.groupby('Sub-Category', observed=True)['Profit'].sum().reset_index()
     data = data.sort_values(by='Profit', ascending=False)
     
     # Plotting
@@ -55,7 +78,7 @@ def create_top_states_chart(df):
     """Generates the Top 10 States by Sales Chart"""
     if df.empty: return None
 
-    data = df.groupby('State')['Amount'].sum().reset_index()
+    data = df.groupby('State', observed=True)['Amount'].sum().reset_index()
     data = data.sort_values(by='Amount', ascending=False).head(10)
     
     fig = px.bar(data, x='State', y='Amount', 
@@ -69,7 +92,7 @@ def create_top_customers_chart(df):
     """Generates the Top 10 Customers by Sales Chart"""
     if df.empty: return None
 
-    data = df.groupby('CustomerName')['Amount'].sum().reset_index()
+    data = df.groupby('CustomerName', observed=True)['Amount'].sum().reset_index()
     data = data.sort_values(by='Amount', ascending=False).head(10)
     
     fig = px.bar(data, x='CustomerName', y='Amount', 
@@ -79,6 +102,55 @@ def create_top_customers_chart(df):
     fig.update_traces(marker_color='#10b981') # Green
     return fig
 
+# ==========================================
+# 2b. VIEW CACHE
+# Responsibilities: building KPIs and figures once per data version.
+# Every visitor is served the same pre-serialized figure dicts, so page loads
+# no longer aggregate or build figures.
+# ==========================================
+class DashboardViewCache:
+    def __init__(self, provider: SalesDataProvider):
+        self.provider = provider
+        self._version = None
+        self._view = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Returns the view dict for the current data version, or None if the CSV files are missing.
+        A view with rows == 0 means the files were read but the join returned nothing.
+        """
+        version, df = self.provider.get()
+        with self._lock:
+            if version != self._version:
+                self._view = self._build(df)
+                self._version = version
+            return self._view
+
+    @staticmethod
+    def _build(df):
+        if df is None:
+            return None
+        if df.empty:
+            return {'rows': 0}
+        figures = [
+            create_profit_by_subcategory_chart(df),
+            create_top_states_chart(df),
+            create_top_customers_chart(df),
+        ]
+        return {
+            'rows': len(df),
+            'total_amount': df['Amount'].sum(),
+            'total_profit': df['Profit'].sum(),
+            'total_quantity': df['Quantity'].sum(),
+            'total_orders': df['Order ID'].nunique(),
+            # ui.plotly sends dicts as-is (no per-visitor go.Figure -> JSON conversion)
+            'figures': [fig.to_plotly_json() for fig in figures],
+        }
+
+
+view_cache = DashboardViewCache(data_provider)
+
 # ==========================================
 # 3. UI COMPONENT LAYER (Reusability)
 # Responsibilities: Creating repetitive UI elements (like KPI cards)
@@ -122,51 +194,45 @@ def main():
     ''')
 
     # --- B. Load Data ---
-    # We call the data function inside main().
-    # This ensures that if the data changes on disk, a page refresh picks it up.
-    df = get_sales_data()
-    
-    if df.empty:
+    # The view cache re-checks the CSV files on every request, so a refresh
+    # still picks up changes on disk, but only rebuilds when they actually changed.
+    view = view_cache.get()
+
+    if view is None:
+        ui.notify("Error: CSV files not found. Please ensure Details.csv and Orders.csv exist.", type='negative')
         ui.label("No Data Found").classes("text-red-500 text-xl")
         return
+    if view['rows'] == 0:
+        ui.notify("No rows: Details.csv and Orders.csv share no Order ID.", type='warning')
+        ui.label("No Rows to Show").classes("text-gray-500 text-xl")
+        return
 
-    # --- C. Calculate KPIs ---
-    # These are simple scalars, so calculating them inline is fine, 
-    # but for complex math, move to a function.
-    total_amount = df['Amount'].sum()
-    total_profit = df['Profit'].sum()
-    total_quantity = df['Quantity'].sum()
-    total_orders = df['Order ID'].nunique()
-
-    # --- D. Build Layout ---
+    # --- C. Build Layout ---
     ui.label('📊 Sales Overview').classes('text-2xl font-bold text-center mb-6 text-gray-800')
 
     # Row 1: KPI Cards
     # Notice how clean this is compared to the original loop/HTML mix
     with ui.row().classes('w-full justify-between gap-4 px-10 mb-8'):
-        kpi_card('Total Amount', f'${total_amount:,.0f}')
-        kpi_card('Total Profit', f'${total_profit:,.0f}')
-        kpi_card('Total Quantity', f'{total_quantity:,}')
-        kpi_card('Order Count', f'{total_orders:,}')
+        kpi_card('Total Amount', f"${view['total_amount']:,.0f}")
+        kpi_card('Total Profit', f"${view['total_profit']:,.0f}")
+        kpi_card('Total Quantity', f"{view['total_quantity']:,}")
+        kpi_card('Order Count', f"{view['total_orders']:,}")
 
     # Row 2: Charts
-    # We simply call our "Logic Layer" functions.
+    # Figures come from the view cache (built by the "Logic Layer" functions).
     # The layout code doesn't care HOW the chart is made, just WHERE it goes.
     with ui.row().classes('w-full justify-between gap-4 px-10'):
         
         # Chart 1
         with ui.card().classes('chart-card flex-1'):
-            fig1 = create_profit_by_subcategory_chart(df)
-            ui.plotly(fig1).classes('w-full h-80')
+            ui.plotly(view['figures'][0]).classes('w-full h-80')
 
         # Chart 2
         with ui.card().classes('chart-card flex-1'):
-            fig2 = create_top_states_chart(df)
-            ui.plotly(fig2).classes('w-full h-80')
+            ui.plotly(view['figures'][1]).classes('w-full h-80')
 
         # Chart 3
         with ui.card().classes('chart-card flex-1'):
-            fig3 = create_top_customers_chart(df)
-            ui.plotly(fig3).classes('w-full h-80')
+            ui.plotly(view['figures'][2]).classes('w-full h-80')
 
 ui.run(title='Sales Dashboard "Pro"', port=8081)
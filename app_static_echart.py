@@ -1,24 +1,20 @@
 from nicegui import ui
 import pandas as pd
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
+
+from sales_data import get_sales_data
+from static_snapshot import SNAPSHOT_MODE, Snapshot
 
 # --- 数据加载与处理（封装为函数，带异常处理）---
 def load_and_merge_data(details_path: str = 'Details.csv', orders_path: str = 'Orders.csv') -> pd.DataFrame:
     try:
-        df_details = pd.read_csv(details_path)
-        df_orders = pd.read_csv(orders_path)
+        # 读取、合并、清洗由共享的 sales_data 模块完成，进程内只加载一次
+        df_global = get_sales_data(details_path, orders_path)
     except FileNotFoundError as e:
         ui.notify(f"数据文件未找到: {e}", type='negative')
         # 可选：生成模拟数据（如你关注的容错机制）
         return pd.DataFrame()
     
-    df_global = pd.merge(df_details, df_orders, on="Order ID", how="inner")
-
-    # 清理字符串字段（如存在）
-    for col in ["Sub-Category", "Category"]:
-        if col in df_global.columns:
-            df_global[col] = df_global[col].astype(str).str.strip()
-    
     return df_global
 
 # --- 指标与聚合计算 ---
@@ -30,13 +26,13 @@ def compute_metrics(df: pd.DataFrame) -> Tuple[float, float, int, int]:
     return total_amount, total_profit, total_quantity, total_orders
 
 def compute_aggregates(df: pd.DataFrame):
-    df_sub_cat = df.groupby('Sub-Category')['Profit'].sum().reset_index()
+    df_sub_cat = df.groupby('Sub-Category', observed=True)['Profit'].sum().reset_index()
     df_sub_cat = df_sub_cat.sort_values(by='Profit', ascending=False)
 
-    df_state = df.groupby('State')['Amount'].sum().reset_index()
+    df_state = df.groupby('State', observed=True)['Amount'].sum().reset_index()
     df_state = df_state.sort_values(by='Amount', ascending=False).head(10)
 
-    df_customer = df.groupby('CustomerName')['Amount'].sum().reset_index()
+    df_customer = df.groupby('CustomerName', observed=True)['Amount'].sum().reset_index()
     df_customer = df_customer.sort_values(by='Amount', ascending=False).head(10)
 
     return df_sub_cat, df_state, df_customer
@@ -78,8 +74,45 @@ def create_bar_option(
         option['series'][0]['itemStyle'] = {'color': color}
     return option
 
+# --- 页面内容：KPI 文本与三个图表的 option（NiceGUI 页面与静态快照共用）---
+def build_dashboard(df: pd.DataFrame) -> Tuple[List[Tuple[str, str]], List[dict]]:
+    total_amount, total_profit, total_quantity, total_orders = compute_metrics(df)
+    df_sub_cat, df_state, df_customer = compute_aggregates(df)
+    kpis = [
+        ('Total Amount', f'${total_amount:,.0f}'),
+        ('Total Profit', f'${total_profit:,.0f}'),
+        ('Total Quantity', f'{total_quantity:,}'),
+        ('Order Count', f'{total_orders:,}'),
+    ]
+    options = [
+        # Profit by Sub-Category
+        create_bar_option(
+            title='Profit by Sub-Category',
+            x_data=df_sub_cat['Sub-Category'].tolist(),
+            y_data=df_sub_cat['Profit'].round(0).tolist(),
+            color='#28738a',
+            rotate_x=True
+        ),
+        # Top 10 States
+        create_bar_option(
+            title='Top 10 States by Sales',
+            x_data=df_state['State'].tolist(),
+            y_data=df_state['Amount'].round(0).tolist(),
+            color='#3b82f6',
+            rotate_x=True
+        ),
+        # Top 10 Customers
+        create_bar_option(
+            title='Top 10 Customers by Sales',
+            x_data=df_customer['CustomerName'].tolist(),
+            y_data=df_customer['Amount'].round(0).tolist(),
+            color='#10b981',
+            rotate_x=True
+        ),
+    ]
+    return kpis, options
+
 # --- 主页面 ---
-@ui.page('/')
 def main():
     # 注入 CSS 样式
     ui.add_head_html('''
@@ -96,57 +129,34 @@ def main():
         ui.label("❌ 无法加载数据，请检查 CSV 文件是否存在。").classes('text-red-500 text-xl')
         return
 
-    total_amount, total_profit, total_quantity, total_orders = compute_metrics(df_global)
-    df_sub_cat, df_state, df_customer = compute_aggregates(df_global)
+    kpis, options = build_dashboard(df_global)
 
     ui.label('📊 Sales Overview').classes('text-2xl font-bold text-center mb-6 text-gray-800')
 
     # KPI 卡片
     with ui.row().classes('w-full justify-between gap-4 px-10 mb-8'):
-        for title, value in [
-            ('Total Amount', f'${total_amount:,.0f}'),
-            ('Total Profit', f'${total_profit:,.0f}'),
-            ('Total Quantity', f'{total_quantity:,}'),
-            ('Order Count', f'{total_orders:,}'),
-        ]:
+        for title, value in kpis:
             with ui.card().classes('kpi-card flex-1'):
                 ui.label(title).classes('kpi-title')
                 ui.label(value).classes('kpi-value')
 
     # 图表行
     with ui.row().classes('w-full justify-between gap-4 px-10'):
-        # Profit by Sub-Category
-        with ui.card().classes('chart-card flex-1'):
-            opt1 = create_bar_option(
-                title='Profit by Sub-Category',
-                x_data=df_sub_cat['Sub-Category'].tolist(),
-                y_data=df_sub_cat['Profit'].round(0).tolist(),
-                color='#28738a',
-                rotate_x=True
-            )
-            ui.echart(opt1).classes('w-full h-80')
-
-        # Top 10 States
-        with ui.card().classes('chart-card flex-1'):
-            opt2 = create_bar_option(
-                title='Top 10 States by Sales',
-                x_data=df_state['State'].tolist(),
-                y_data=df_state['Amount'].round(0).tolist(),
-                color='#3b82f6',
-                rotate_x=True
-            )
-            ui.echart(opt2).classes('w-full h-80')
-
-        # Top 10 Customers
-        with ui.card().classes('chart-card flex-1'):
-            opt3 = create_bar_option(
-                title='Top 10 Customers by Sales',
-                x_data=df_customer['CustomerName'].tolist(),
-                y_data=df_customer['Amount'].round(0).tolist(),
-                color='#10b981',
-                rotate_x=True
-            )
-            ui.echart(opt3).classes('w-full h-80')
+        for option in options:
+            with ui.card().classes('chart-card flex-1'):
+                ui.echart(option).classes('w-full h-80')
+
+# --- 页面注册 ---
+# DASHBOARD_SNAPSHOT=1：数据加载时把整个仪表板预渲染为 HTML 页面 + JSON（/snapshot.json），
+# 带 ETag / Cache-Control 从内存直接返回，不为每个访问者创建 NiceGUI 元素和 websocket 连接
+# （数据文件缺失时启动即失败，而不是渲染一份空快照）
+if SNAPSHOT_MODE:
+    snapshot_kpis, snapshot_options = build_dashboard(get_sales_data())
+    Snapshot('Sales Dashboard', '📊 Sales Overview', snapshot_kpis,
+             {f'chart-{i}': option for i, option in enumerate(snapshot_options, 1)},
+             library='echarts').serve('/')
+else:
+    ui.page('/')(main)
 
 # --- 启动应用 ---
 if __name__ in {"__main__", "__mp_main__"}:
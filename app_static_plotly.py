@@ -1,31 +1,15 @@
 from nicegui import ui
-import pandas as pd
+import json
 import plotly.express as px
 
-# 1. Load Data
-# Details.csv 包含：订单明细（金额、利润、品类、子品类、支付方式等）
-# Orders.csv 包含：订单主信息（订单日期、客户、城市、州等）
-# 这两行会把两个文件读入内存，生成两个 DataFrame 对象 
-# 脚本与 Details.csv、Orders.csv 在同一目录下，否则要写完整路径 
-df_details = pd.read_csv('Details.csv')
-df_orders = pd.read_csv('Orders.csv')
-
-# 2. Merge Data
-# 使用 pd.merge() 将两个表按 "Order ID" 字段内连接（inner join）。
-# 结果 df_global 会包含：
-# 所有 Details.csv 的字段（Amount, Profit, Category...）
-# 所有 Orders.csv 的字段（Order Date, CustomerName, State, City...）
-# 只保留两个表中都存在的 Order ID (inner join 的特性)  
-df_global = pd.merge(df_details, df_orders, on="Order ID", how="inner")
-
-# 3. Data Cleaning
-# 防止因 " Electronics " 和 "Electronics" 被识别为不同类别。
-# .astype(str) 确保即使有空值（NaN）也不会报错（NaN 会变成 "nan" 字符串，但通常数据中不应有）。
-# .str.strip() 去除字符串首尾空格
-if "Sub-Category" in df_global.columns:
-    df_global["Sub-Category"] = df_global["Sub-Category"].astype(str).str.strip()
-if "Category" in df_global.columns:
-    df_global["Category"] = df_global["Category"].astype(str).str.strip()
+from sales_data import get_sales_data
+from static_snapshot import SNAPSHOT_MODE, Snapshot
+
+# 1-3. Load, Merge & Clean Data
+# Details.csv（订单明细）与 Orders.csv（订单主信息）按 "Order ID" 内连接，
+# 读取、合并、去空格统一在 sales_data 模块中完成，整个进程只加载一次。
+# State / CustomerName / Sub-Category 等维度列为 category 类型，节省内存、加快筛选与分组
+df_global = get_sales_data()
 
 # 4. Calculate Global KPIs
 # Total Amount 
@@ -39,19 +23,45 @@ total_orders = df_global['Order ID'].nunique()
 
 # 5. Prepare Chart Data 
 # Chart 1: Total Profit by Sub-Category (Sorted)
-df_sub_cat = df_global.groupby('Sub-Category')['Profit'].sum().reset_index()
+df_sub_cat = df_global.groupby('Sub-Category', observed=True)['Profit'].sum().reset_index()
 df_sub_cat = df_sub_cat.sort_values(by='Profit', ascending=False)
 
 # Chart 2: Total Sales by State (Top 10)
-df_state = df_global.groupby('State')['Amount'].sum().reset_index()
+df_state = df_global.groupby('State', observed=True)['Amount'].sum().reset_index()
 df_state = df_state.sort_values(by='Amount', ascending=False).head(10) # 只取前10，防止图表太挤
 
 # Chart 3: Total Sales by Customer (Top 10)
-df_customer = df_global.groupby('CustomerName')['Amount'].sum().reset_index()
+df_customer = df_global.groupby('CustomerName', observed=True)['Amount'].sum().reset_index()
 df_customer = df_customer.sort_values(by='Amount', ascending=False).head(10) # 只取前10
 
-# 6. Dashboard Layout
-@ui.page('/')
+# 6. Build Figures（所有访问者看到的内容相同，启动时只构建一次，不再每次打开页面都调用 px.bar）
+# Chart 1: Profit by Sub-Category
+fig1 = px.bar(df_sub_cat, x='Sub-Category', y='Profit', 
+              title='Profit by Sub-Category', template='plotly_white')
+# 调整 layout 让图表更紧凑
+fig1.update_layout(margin=dict(l=20, r=20, t=40, b=20), paper_bgcolor='rgba(0,0,0,0)')
+
+# Chart 2: Sales by State
+fig2 = px.bar(df_state, x='State', y='Amount', 
+              title='Top 10 States by Sales', template='plotly_white')
+fig2.update_layout(margin=dict(l=20, r=20, t=40, b=20), paper_bgcolor='rgba(0,0,0,0)')
+# 设置颜色区分
+fig2.update_traces(marker_color='#3b82f6') 
+
+# Chart 3: Sales by Customer
+fig3 = px.bar(df_customer, x='CustomerName', y='Amount', 
+              title='Top 10 Customers by Sales', template='plotly_white')
+fig3.update_layout(margin=dict(l=20, r=20, t=40, b=20), paper_bgcolor='rgba(0,0,0,0)')
+fig3.update_traces(marker_color='#10b981')
+
+KPIS = [
+    ('Total Amount', f'${total_amount:,.0f}'),
+    ('Total Profit', f'${total_profit:,.0f}'),
+    ('Total Quantity', f'{total_quantity:,}'),
+    ('Order Count', f'{total_orders:,}'),
+]
+
+# 7. Dashboard Layout
 def main():
     # --- CSS Styles ---
     ui.add_head_html('''
@@ -69,12 +79,7 @@ def main():
     # --- ROW 1: KPIs ---
     # ui.row() 相同的样式的KPI卡片，这里用循环简化代码
     with ui.row().classes('w-full justify-between gap-4 px-10 mb-8'):
-        for title, value in [
-            ('Total Amount', f'${total_amount:,.0f}'),
-            ('Total Profit', f'${total_profit:,.0f}'),
-            ('Total Quantity', f'{total_quantity:,}'),
-            ('Order Count', f'{total_orders:,}'),
-        ]:
+        for title, value in KPIS:
             with ui.card().classes('kpi-card flex-1'):
                 ui.label(title).classes('kpi-title')
                 ui.label(value).classes('kpi-value')
@@ -104,36 +109,26 @@ def main():
         
         # Chart 1: Profit by Sub-Category
         with ui.card().classes('chart-card flex-1'):
-            # 创建 Plotly Figure
-            fig1 = px.bar(df_sub_cat, x='Sub-Category', y='Profit', 
-                          title='Profit by Sub-Category', template='plotly_white')
-            # 调整 layout 让图表更紧凑
-            fig1.update_layout(margin=dict(l=20, r=20, t=40, b=20), paper_bgcolor='rgba(0,0,0,0)')
-            # 渲染图表
+            # 渲染图表（figure 已在启动时构建）
             ui.plotly(fig1).classes('w-full h-80')
 
         # Chart 2: Sales by State
         with ui.card().classes('chart-card flex-1'):
-            # 创建 Plotly Figur
-            fig2 = px.bar(df_state, x='State', y='Amount', 
-                          title='Top 10 States by Sales', template='plotly_white')
-            # 调整 layout 让图表更紧凑
-            fig2.update_layout(margin=dict(l=20, r=20, t=40, b=20), paper_bgcolor='rgba(0,0,0,0)')
-            # 设置颜色区分
-            fig2.update_traces(marker_color='#3b82f6') 
-            # 渲染图表
             ui.plotly(fig2).classes('w-full h-80')
 
         # Chart 3: Sales by Customer
         with ui.card().classes('chart-card flex-1'):
-            # 创建 Plotly Figur
-            fig3 = px.bar(df_customer, x='CustomerName', y='Amount', 
-                          title='Top 10 Customers by Sales', template='plotly_white')
-            # 调整 layout 让图表更紧凑
-            fig3.update_layout(margin=dict(l=20, r=20, t=40, b=20), paper_bgcolor='rgba(0,0,0,0)')
-            # 设置颜色区分
-            fig3.update_traces(marker_color='#10b981')
-            # 渲染图表
             ui.plotly(fig3).classes('w-full h-80')
 
+# 8. Serving
+# DASHBOARD_SNAPSHOT=1：启动时把整个仪表板预渲染为 HTML 页面 + JSON（/snapshot.json），
+# 带 ETag / Cache-Control 从内存直接返回，不为每个访问者创建 NiceGUI 元素和 websocket 连接；
+# 只读访问者的开销几乎为零。否则照常为每个访问者构建 NiceGUI 页面
+if SNAPSHOT_MODE:
+    Snapshot('Sales Dashboard', '📊 Sales Overview', KPIS,
+             {f'chart-{i}': json.loads(fig.to_json()) for i, fig in enumerate([fig1, fig2, fig3], 1)},
+             library='plotly').serve('/')
+else:
+    ui.page('/')(main)
+
 ui.run(title='Sales Dashboard', port=8081)
@@ -1,24 +1,12 @@
 from nicegui import ui
-import pandas as pd
 import altair as alt
-import json
 
-# 1. Load Data
-df_details = pd.read_csv('Details.csv')
-df_orders = pd.read_csv('Orders.csv')
+from sales_data import get_sales_data
+from static_snapshot import SNAPSHOT_MODE, Snapshot
+from vega_assets import register_assets, serve_spec, vega_script_tags
 
-# 2. Merge Data
-df_global = pd.merge(df_details, df_orders, on="Order ID", how="inner")
-
-# 3. Data Cleaning
-if "Sub-Category" in df_global.columns:
-    df_global["Sub-Category"] = df_global["Sub-Category"].astype(str).str.strip()
-if "Category" in df_global.columns:
-    df_global["Category"] = df_global["Category"].astype(str).str.strip()
-if "State" in df_global.columns:
-    df_global["State"] = df_global["State"].astype(str).str.strip()
-if "CustomerName" in df_global.columns:
-    df_global["CustomerName"] = df_global["CustomerName"].astype(str).str.strip()
+# 1-3. Load, Merge & Clean Data (shared loader, categorical dimensions)
+df_global = get_sales_data()
 
 # 4. Global KPIs
 total_amount = df_global['Amount'].sum()
@@ -28,14 +16,14 @@ total_orders = df_global['Order ID'].nunique()
 
 # 5. Prepare Chart DataFrames
 df_sub_cat = (
-    df_global.groupby('Sub-Category')['Profit']
+    df_global.groupby('Sub-Category', observed=True)['Profit']
     .sum()
     .reset_index()
     .sort_values(by='Profit', ascending=False)
 )
 
 df_state = (
-    df_global.groupby('State')['Amount']
+    df_global.groupby('State', observed=True)['Amount']
     .sum()
     .reset_index()
     .sort_values(by='Amount', ascending=False)
@@ -43,7 +31,7 @@ df_state = (
 )
 
 df_customer = (
-    df_global.groupby('CustomerName')['Amount']
+    df_global.groupby('CustomerName', observed=True)['Amount']
     .sum()
     .reset_index()
     .sort_values(by='Amount', ascending=False)
@@ -75,22 +63,24 @@ spec_subcat = make_bar_chart(df_sub_cat, 'Sub-Category', 'Profit', 'Profit by Su
 spec_state  = make_bar_chart(df_state, 'State', 'Amount', 'Top 10 States by Sales', 'State', 'Sales', '#3b82f6')
 spec_customer = make_bar_chart(df_customer, 'CustomerName', 'Amount', 'Top 10 Customers by Sales', 'Customer Name', 'Sales', '#10b981')
 
-# Convert to JSON strings for embedding in HTML
-spec_subcat_json = json.dumps(spec_subcat)
-spec_state_json = json.dumps(spec_state)
-spec_customer_json = json.dumps(spec_customer)
+# vega / vega-lite / vega-embed routes (local files, or the CDN when not vendored)
+register_assets()
+
+# Specs served as one cacheable JSON document (element id -> spec), fetched by the page
+SPECS_URL = serve_spec('chart_specs', {'chart-subcat': spec_subcat, 'chart-state': spec_state,
+                                       'chart-customer': spec_customer})
+
+KPIS = [
+    ('Total Amount', f'${total_amount:,.0f}'),
+    ('Total Profit', f'${total_profit:,.0f}'),
+    ('Total Quantity', f'{total_quantity:,}'),
+    ('Order Count', f'{total_orders:,}'),
+]
 
-@ui.page('/')
 def main():
     ui.add_head_html(f'''
-        <script src="https://cdn.jsdelivr.net/npm/vega@5"></script>
-        <script src="https://cdn.jsdelivr.net/npm/vega-lite@5"></script>
-        <script src="https://cdn.jsdelivr.net/npm/vega-embed@6"></script>
+        {vega_script_tags()}
         <script>
-            const SPEC_SUBCAT = {spec_subcat_json};
-            const SPEC_STATE = {spec_state_json};
-            const SPEC_CUSTOMER = {spec_customer_json};
-
             function embedChart(id, spec) {{
                 const el = document.getElementById(id);
                 if (el) {{
@@ -98,10 +88,11 @@ def main():
                 }}
             }}
 
-            document.addEventListener('DOMContentLoaded', () => {{
-                embedChart('chart-subcat', SPEC_SUBCAT);
-                embedChart('chart-state', SPEC_STATE);
-                embedChart('chart-customer', SPEC_CUSTOMER);
+            const specs = fetch('{SPECS_URL}').then((response) => response.json());
+            document.addEventListener('DOMContentLoaded', async () => {{
+                for (const [id, spec] of Object.entries(await specs)) {{
+                    embedChart(id, spec);
+                }}
             }});
         </script>
         <style>
@@ -128,12 +119,7 @@ def main():
 
     # --- ROW 1: KPIs ---
     with ui.row().classes('w-full justify-between gap-4 px-10 mb-8'):
-        for title, value in [
-            ('Total Amount', f'${total_amount:,.0f}'),
-            ('Total Profit', f'${total_profit:,.0f}'),
-            ('Total Quantity', f'{total_quantity:,}'),
-            ('Order Count', f'{total_orders:,}'),
-        ]:
+        for title, value in KPIS:
             with ui.card().classes('kpi-card flex-1'):
                 ui.label(title).classes('kpi-title')
                 ui.label(value).classes('kpi-value')
@@ -149,4 +135,14 @@ def main():
         with ui.card().classes('chart-card flex-1'):
             ui.html('<div id="chart-customer" style="width:100%; height:100%;"></div>', sanitize=False).classes('w-full h-80')
 
+# DASHBOARD_SNAPSHOT=1: the whole dashboard is rendered once, here, to an HTML page plus a
+# JSON bundle (/snapshot.json), served from memory with ETag / Cache-Control; no NiceGUI
+# elements or websocket per visitor. Otherwise each visitor gets a NiceGUI page as before.
+if SNAPSHOT_MODE:
+    Snapshot('Sales Dashboard (Vega-Lite Only)', '📊 Sales Overview', KPIS,
+             {'chart-subcat': spec_subcat, 'chart-state': spec_state, 'chart-customer': spec_customer},
+             library='vega').serve('/')
+else:
+    ui.page('/')(main)
+
 ui.run(title='Sales Dashboard (Vega-Lite Only)', port=8081)
\ No newline at end of file
@@ -0,0 +1,348 @@
+"""
+Click-path benchmark: replays a click sequence against one of the dashboard apps,
+headlessly (NiceGUI user simulation, no browser, no server socket), and reports
+latency percentiles per stage of the request path.
+
+    python benchmarks/bench_click_path.py multi_user_plotly --rows 1000000 --clicks 200
+    python benchmarks/bench_click_path.py cross_filter_echart --data-dir /data/sales --memory
+    python benchmarks/bench_click_path.py multi_user_echart --json out.json --baseline before.json
+
+The app script runs unmodified. Its stage functions (whichever of STAGES it defines,
+at module level or on its Dashboard class, plus the shared data-layer entry points)
+are wrapped with timers, so the table shows e.g. compute_panels / render_kpis /
+_update_bar_chart / build_bar_chart_option / send next to the end-to-end `click`.
+Stage times are inclusive (compute_panels contains compute_kpis and compute_top_n).
+
+Data: without --data-dir a synthetic dataset is generated (benchmarks/synth_data.py)
+into the system temp dir, once per parameter set.
+
+--memory traces allocations (tracemalloc): per stage the peak memory allocated above
+the stage's starting point. Tracing slows everything down, so run it separately from
+timing runs. Peak RSS of the whole process is always reported.
+
+--baseline compares p50 / p90 of every stage with an earlier --json output and exits
+with status 1 when one is slower by more than --tolerance (default 20%).
+"""
+import argparse
+import asyncio
+import functools
+import inspect
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import asynccontextmanager, contextmanager
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synth_data import generate  # noqa: E402
+
+APPS = {
+    'multi_user_plotly': 'app_multi_user_plotly.py',
+    'multi_user_echart': 'app_multi_user_echart.py',
+    'cross_filter_plotly': 'app_cross_filter_plotly.py',
+    'cross_filter_echart': 'app_cross_filter_echart.py',
+}
+# Charts in page order, and the column each one filters: the three bar charts, then the
+# trend panel of the multi-user apps (a click there filters its day / week / month bucket)
+CHART_COLUMNS = ['Sub-Category', 'State', 'CustomerName', 'Order Date']
+
+# Functions / methods timed when the app defines them
+STAGES = [
+    'handle_click', 'handle_chart_click', 'handle_trend_click', 'update_dashboard', 'refresh_dashboard',
+    'get_filtered_masks', 'get_marginals', 'compute_panels', 'compute_kpis', 'compute_top_n', 'top_k_frame',
+    'render_kpis', '_update_bar_chart', 'update_chart_component', 'build_bar_chart_option', 'bar_figure',
+    'send',
+]
+# Shared data-layer entry points, timed during startup
+DATA_STAGES = [('sales_data', 'get_sales_data'), ('sales_cube', 'build_sales_cube')]
+CLICK_HANDLERS = ('handle_click', 'handle_chart_click', 'handle_trend_click')
+
+
+class StageRecorder:
+    """Collects durations (and, under tracemalloc, peak allocations) per stage name."""
+
+    def __init__(self):
+        self.times = {}
+        self.peaks = {}
+        self._stack = []  # peak of finished child stages, per open stage (tracemalloc resets the peak)
+        self.completed = {}
+
+    @contextmanager
+    def stage(self, name):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            self._stack.append(0)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times.setdefault(name, []).append(time.perf_counter() - t0)
+            self.completed[name] = self.completed.get(name, 0) + 1
+            if tracing:
+                peak = max(tracemalloc.get_traced_memory()[1], self._stack.pop())
+                self.peaks.setdefault(name, []).append(peak - start)
+                if self._stack:
+                    self._stack[-1] = max(self._stack[-1], peak)
+
+    def wrap(self, name, fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def timed(*args, **kwargs):
+                with self.stage(name):
+                    return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+        if hasattr(fn, 'cache_clear'):  # keep the lru_cache API of get_sales_data etc.
+            timed.cache_clear = fn.cache_clear
+        return timed
+
+
+def instrument_data_layer(recorder):
+    """Wraps DATA_STAGES in every already imported module that holds them."""
+    import importlib
+    for module_name, name in DATA_STAGES:
+        original = getattr(importlib.import_module(module_name), name)
+        timed = recorder.wrap(name, original)
+        for module in list(sys.modules.values()):
+            if getattr(module, name, None) is original:
+                setattr(module, name, timed)
+
+
+def instrument_app(recorder, app_globals):
+    """Wraps STAGES found in the app script's globals, on its Dashboard class, and ChartPatchBatch.send."""
+    found = []
+    for name in STAGES:
+        fn = app_globals.get(name)
+        if inspect.isfunction(fn):
+            app_globals[name] = recorder.wrap(name, fn)
+            found.append(name)
+    for cls_name in ('Dashboard', 'ChartPatchBatch'):
+        cls = app_globals.get(cls_name)
+        if cls is None:
+            continue
+        for name in STAGES:
+            fn = cls.__dict__.get(name)
+            if inspect.isfunction(fn):
+                setattr(cls, name, recorder.wrap(name, fn))
+                found.append(f'{cls_name}.{name}')
+    return found
+
+
+@asynccontextmanager
+async def simulated_app(script, recorder):
+    """Runs the app script under NiceGUI's user simulation and yields (user, instrumented stage names)."""
+    import httpx
+    from nicegui import core, ui
+    from nicegui.testing.general import nicegui_reset_globals, prepare_simulation
+    from nicegui.testing.user import User
+
+    with nicegui_reset_globals():
+        os.environ['NICEGUI_USER_SIMULATION'] = 'true'
+        real_run = ui.run
+        ui.run = lambda *args, **kwargs: None  # the script's own ui.run() must not start a server
+        app_globals = {'__name__': '__main__', '__file__': script}
+        try:
+            instrument_data_layer(recorder)
+            with recorder.stage('startup'):
+                exec(compile(open(script, encoding='utf-8').read(), script, 'exec'), app_globals)  # pylint: disable=exec-used
+        finally:
+            ui.run = real_run
+        found = instrument_app(recorder, app_globals)
+        core.script_mode = False
+        prepare_simulation()
+        ui.run()
+        async with core.app.router.lifespan_context(core.app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(core.app), base_url='http://test') as client:
+                yield User(client), found
+
+
+def chart_labels(chart):
+    """Category labels currently shown by a ui.plotly / ui.echart bar chart."""
+    from nicegui import ui
+    if isinstance(chart, ui.plotly):
+        figure = chart.figure if isinstance(chart.figure, dict) else chart.figure.to_plotly_json()
+        data = figure.get('data') or [{}]
+        labels = data[0].get('x', [])
+        return list(labels) if not isinstance(labels, dict) else []
+    x_axis = chart.options.get('xAxis') or [{}]
+    x_axis = x_axis[0] if isinstance(x_axis, list) else x_axis
+    return list(x_axis.get('data', []))
+
+
+def fire_click(user, chart, value):
+    """Sends the click event the browser would send for a bar with this label."""
+    from nicegui import events, ui
+    for listener in list(chart._event_listeners.values()):  # pylint: disable=protected-access
+        if isinstance(chart, ui.plotly) and listener.type == 'plotly_click':
+            args = {'points': [{'x': value}]}
+        elif not isinstance(chart, ui.plotly) and listener.type == 'componentClick':
+            args = {'componentType': 'series', 'seriesType': 'bar', 'seriesIndex': 0, 'seriesName': '',
+                    'name': value, 'dataIndex': 0, 'data': {}, 'dataType': None, 'value': 0}
+        else:
+            continue
+        with user.client:
+            events.handle_event(listener.handler, events.GenericEventArguments(sender=chart, client=user.client, args=args))
+
+
+async def replay(user, recorder, n_clicks, seed, async_handlers, toggle_rate=0.2):
+    """
+    Random walk over the visible bars: each step clicks a bar of a random chart, trend
+    panel included (with probability toggle_rate the currently selected bar, i.e. unselects it).
+    async_handlers: the click handlers are instrumented coroutines (multi-user apps), so
+    a click is finished when the handler completes; otherwise the handler ran synchronously.
+    """
+    from nicegui import ui
+    rng = random.Random(seed)
+    charts = sorted((e for e in user.client.elements.values() if isinstance(e, (ui.plotly, ui.echart))),
+                    key=lambda e: e.id)
+    if len(charts) > len(CHART_COLUMNS):
+        raise RuntimeError(f'{len(charts)} charts on the page, but CHART_COLUMNS maps only {len(CHART_COLUMNS)}')
+    selected = {}
+    for _ in range(n_clicks):
+        i = rng.randrange(len(charts))
+        col = CHART_COLUMNS[i]
+        labels = chart_labels(charts[i])
+        if col in selected and (rng.random() < toggle_rate or not labels):
+            value = selected.pop(col)
+        elif labels:
+            value = rng.choice(labels)
+            if selected.get(col) == value:
+                selected.pop(col)
+            else:
+                selected[col] = value
+        else:
+            continue
+
+        done_before = sum(recorder.completed.get(name, 0) for name in CLICK_HANDLERS)
+        t0 = time.perf_counter()
+        fire_click(user, charts[i], value)
+        # async handlers run as background tasks: wait until this one finished
+        while async_handlers and sum(recorder.completed.get(name, 0) for name in CLICK_HANDLERS) == done_before:
+            await asyncio.sleep(0.0005)
+        recorder.times.setdefault('click', []).append(time.perf_counter() - t0)
+
+
+def summarize(recorder):
+    rows = {}
+    for name, values in recorder.times.items():
+        ms = np.array(values) * 1000
+        row = {'calls': len(ms), 'p50_ms': float(np.percentile(ms, 50)), 'p90_ms': float(np.percentile(ms, 90)),
+               'p99_ms': float(np.percentile(ms, 99)), 'max_ms': float(ms.max())}
+        if name in recorder.peaks:
+            kb = np.array(recorder.peaks[name]) / 1024
+            row['alloc_peak_kb_mean'] = float(kb.mean())
+            row['alloc_peak_kb_max'] = float(kb.max())
+        rows[name] = row
+    return rows
+
+
+def print_table(rows, order):
+    memory = any('alloc_peak_kb_mean' in r for r in rows.values())
+    header = f"{'stage':<24}{'calls':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    if memory:
+        header += f"{'alloc KB':>11}{'max KB':>10}"
+    print(header)
+    for name in order:
+        if name not in rows:
+            continue
+        r = rows[name]
+        line = f"{name:<24}{r['calls']:>7}{r['p50_ms']:>10.3f}{r['p90_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['max_ms']:>10.3f}"
+        if memory and 'alloc_peak_kb_mean' in r:
+            line += f"{r['alloc_peak_kb_mean']:>11.1f}{r['alloc_peak_kb_max']:>10.1f}"
+        print(line)
+
+
+def compare(rows, baseline, tolerance):
+    """Returns the stages whose p50 or p90 regressed by more than tolerance against baseline."""
+    regressions = []
+    for name, base in baseline.get('stages', {}).items():
+        if name not in rows:
+            continue
+        for metric in ('p50_ms', 'p90_ms'):
+            if base[metric] > 0 and rows[name][metric] > base[metric] * (1 + tolerance):
+                regressions.append(f'{name} {metric}: {base[metric]:.3f} -> {rows[name][metric]:.3f} ms')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('app', choices=sorted(APPS))
+    parser.add_argument('--data-dir', help='directory with Details.csv / Orders.csv (default: generate)')
+    parser.add_argument('--rows', type=int, default=100_000, help='synthetic Details lines (10k .. 50M)')
+    parser.add_argument('--states', type=int, default=36)
+    parser.add_argument('--customers', type=int, default=50_000)
+    parser.add_argument('--sub-categories', type=int, default=17)
+    parser.add_argument('--clicks', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--memory', action='store_true', help='trace allocations per stage (slower)')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', help='earlier --json output to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    data_dir = args.data_dir
+    if data_dir is None:
+        data_dir = os.path.join(tempfile.gettempdir(), 'sales-bench',
+                                f'r{args.rows}-s{args.states}-c{args.customers}-sc{args.sub_categories}-seed{args.seed}')
+        if not os.path.exists(os.path.join(data_dir, 'Orders.csv')):
+            print(f'generating {args.rows:,} rows into {data_dir} ...')
+            generate(data_dir, args.rows, args.states, args.customers, args.sub_categories, seed=args.seed)
+    data_dir = os.path.abspath(data_dir)
+    script = os.path.abspath(os.path.join(ROOT, APPS[args.app]))
+
+    # The apps read Details.csv / Orders.csv from the working directory; no file watcher during the run
+    os.chdir(data_dir)
+    os.environ.setdefault('SALES_DATA_WATCH_INTERVAL', '0')
+
+    recorder = StageRecorder()
+    if args.memory:
+        tracemalloc.start()
+
+    async def run():
+        async with simulated_app(script, recorder) as (user, found):
+            with recorder.stage('page_load'):
+                await user.open('/')  # the page function (including the first render) has finished
+            async_handlers = any(name.split('.')[-1] in CLICK_HANDLERS for name in found)
+            await replay(user, recorder, args.clicks, args.seed, async_handlers)
+            return found
+
+    found = asyncio.run(run())
+    rows = summarize(recorder)
+    order = ['get_sales_data', 'build_sales_cube', 'startup', 'page_load', 'click'] + STAGES
+    print(f'\n{args.app} on {data_dir} ({args.clicks} clicks; instrumented: {", ".join(found)})\n')
+    print_table(rows, order)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+    print(f'\npeak RSS: {peak_rss_mb:.0f} MB')
+    if args.memory:
+        print(f'tracemalloc peak: {tracemalloc.get_traced_memory()[1] / 2**20:.1f} MB')
+
+    result = {'app': args.app, 'data_dir': data_dir, 'clicks': args.clicks, 'seed': args.seed,
+              'peak_rss_mb': peak_rss_mb, 'stages': rows}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(rows, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+"""
+Load generator for the multi-user dashboards: many simulated browser sessions
+against a running app, with concurrency ramped up step by step.
+
+    pip install -r benchmarks/requirements.txt  # aiohttp and python-socketio on top of the app's
+    python app_multi_user_plotly.py &          # or let the tool start it:
+    python benchmarks/load_test.py --launch app_multi_user_echart.py --ramp 10,50,100,250 --duration 20
+
+Each session does what a browser tab does on the wire: GET the page, open the
+NiceGUI socket.io connection (implicit handshake), acknowledge messages, and send
+bar clicks as `plotly_click` / echarts `componentClick` events with a random think
+time between them. Clicks go to a bar currently shown by that chart (the labels are
+followed through full element updates and the apps' batched restyle / setOption patches).
+
+Per ramp step it reports:
+  - click latency: from sending the event to the last message it caused
+    (the response is considered complete after --quiet ms without further messages),
+    and to the first message (usually the notification)
+  - websocket bytes received per click
+  - probe latency: a cheap HTTP GET (--probe-path) issued every 0.5 s; it queues
+    behind everything else on the server's event loop, so it tracks event-loop lag
+  - server RSS (Linux /proc; needs --launch or --server-pid)
+The saturation point is the first step whose p90 click latency exceeds --slo-ms.
+"""
+import argparse
+import asyncio
+import ast
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import uuid
+from urllib.parse import urlencode
+
+import aiohttp
+import numpy as np
+import socketio
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CHART_TAGS = {'nicegui-plotly': 'plotly_click', 'nicegui-echart': 'componentClick'}
+ACK_INTERVAL = 3.0  # same as nicegui.js
+
+_ELEMENTS_RE = re.compile(r'parseElements\(String\.raw`(.*?)`\)', re.S)
+_QUERY_RE = re.compile(r'query: (\{.*?\}),')
+_PATCH_RE = re.compile(r' of (\[.*\]) runMethod', re.S)
+
+
+def _parse_elements(raw: str) -> dict:
+    # same unescaping as parseElements() in nicegui.js
+    for entity, char in (('&#36;', '$'), ('&#96;', '`'), ('&gt;', '>'), ('&lt;', '<'), ('&amp;', '&')):
+        raw = raw.replace(entity, char)
+    return json.loads(raw)
+
+
+def _chart_labels(tag: str, props: dict):
+    """Bar labels of a plotly figure / echarts option, or None when they are not plain lists."""
+    options = props.get('options') or {}
+    if tag == 'nicegui-plotly':
+        data = options.get('data') or [{}]
+        labels = data[0].get('x')
+    else:
+        x_axis = options.get('xAxis') or {}
+        labels = (x_axis[0] if isinstance(x_axis, list) and x_axis else x_axis).get('data') if x_axis else None
+    return list(labels) if isinstance(labels, list) else None
+
+
+class SimulatedSession:
+    """One browser tab: page load, socket connection, clicks."""
+
+    def __init__(self, base_url: str, http: aiohttp.ClientSession, rng: random.Random):
+        self.base_url = base_url
+        self.http = http
+        self.rng = rng
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.client_id = None
+        self.charts = {}  # element id -> {'listener': ..., 'event': ..., 'tag': ..., 'labels': [...]}
+        self.arrivals = []  # (time, bytes) per received message
+        self.next_message_id = 0
+        self._ack_task = None
+        self.selected = {}
+
+    async def open(self):
+        async with self.http.get(f'{self.base_url}/') as response:
+            html = await response.text()
+        query = ast.literal_eval(_QUERY_RE.search(html).group(1))
+        self.client_id = query['client_id']
+        for element_id, element in _parse_elements(_ELEMENTS_RE.search(html).group(1)).items():
+            event_type = CHART_TAGS.get(element['tag'])
+            for event in element.get('events', []):
+                if event['type'] == event_type:
+                    self.charts[int(element_id)] = {'listener': event['listener_id'], 'event': event_type,
+                                                    'tag': element['tag'],
+                                                    'labels': _chart_labels(element['tag'], element['props']) or []}
+
+        self.sio.on('*', self._on_message)
+        params = {'client_id': self.client_id, 'next_message_id': query.get('next_message_id', 0),
+                  'implicit_handshake': 'true', 'document_id': str(uuid.uuid4()), 'tab_id': str(uuid.uuid4())}
+        await self.sio.connect(f'{self.base_url}?{urlencode(params)}', socketio_path='/_nicegui_ws/socket.io',
+                               transports=['websocket'])
+        self._ack_task = asyncio.create_task(self._ack_loop())
+
+    async def close(self):
+        if self._ack_task:
+            self._ack_task.cancel()
+        await self.sio.disconnect()
+
+    async def _on_message(self, message_type, data):
+        self.arrivals.append((time.perf_counter(), len(json.dumps(data, separators=(',', ':')))))
+        if isinstance(data, dict) and isinstance(data.get('_id'), int):
+            self.next_message_id = max(self.next_message_id, data['_id'] + 1)
+        if message_type == 'update':
+            for element_id, element in data.items():
+                chart = self.charts.get(int(element_id)) if element_id.isdigit() else None
+                if chart and element and (labels := _chart_labels(chart['tag'], element.get('props', {}))) is not None:
+                    chart['labels'] = labels
+        elif message_type == 'run_javascript' and (match := _PATCH_RE.search(data.get('code', ''))):
+            for element_id, method, args in json.loads(match.group(1)):
+                chart = self.charts.get(element_id)
+                if chart is None:
+                    continue
+                if method == 'run_plot_method' and args[0] == 'restyle' and 'x' in args[1]:
+                    chart['labels'] = list(args[1]['x'][0])
+                elif method == 'run_chart_method' and args[0] == 'setOption' and args[1].get('xAxis'):
+                    chart['labels'] = list(args[1]['xAxis'][0].get('data', chart['labels']))
+
+    async def _ack_loop(self):
+        acked = -1
+        while True:
+            await asyncio.sleep(ACK_INTERVAL)
+            if self.next_message_id > acked:
+                await self.sio.emit('ack', {'client_id': self.client_id, 'next_message_id': self.next_message_id})
+                acked = self.next_message_id
+
+    def _next_click(self):
+        element_id = self.rng.choice(list(self.charts))
+        chart = self.charts[element_id]
+        if element_id in self.selected and (self.rng.random() < 0.2 or not chart['labels']):
+            return element_id, self.selected.pop(element_id)
+        if not chart['labels']:
+            return None
+        value = self.rng.choice(chart['labels'])
+        if self.selected.get(element_id) == value:
+            self.selected.pop(element_id)
+        else:
+            self.selected[element_id] = value
+        return element_id, value
+
+    async def click(self, quiet: float, timeout: float = 30.0):
+        """Sends one click; returns (latency to last message, latency to first message, bytes) or None."""
+        target = self._next_click()
+        if target is None:
+            return None
+        element_id, value = target
+        chart = self.charts[element_id]
+        if chart['event'] == 'plotly_click':
+            args = {'points': [{'x': value}]}
+        else:
+            args = {'componentType': 'series', 'seriesType': 'bar', 'seriesIndex': 0, 'seriesName': '',
+                    'name': value, 'dataIndex': 0, 'data': {}, 'dataType': None, 'value': 0}
+
+        start = len(self.arrivals)
+        t0 = time.perf_counter()
+        await self.sio.emit('event', {'id': element_id, 'client_id': self.client_id,
+                                      'listener_id': chart['listener'], 'args': [json.dumps(args)]})
+        while len(self.arrivals) == start:
+            if time.perf_counter() - t0 > timeout:
+                raise TimeoutError
+            await asyncio.sleep(0.001)
+        while time.perf_counter() - self.arrivals[-1][0] < quiet:
+            await asyncio.sleep(quiet / 4)
+        received = self.arrivals[start:]
+        return received[-1][0] - t0, received[0][0] - t0, sum(size for _, size in received)
+
+
+def server_rss_mb(pid):
+    if pid is None:
+        return None
+    try:
+        with open(f'/proc/{pid}/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+async def probe_loop(http, url, samples, stop):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            async with http.get(url) as response:
+                await response.read()
+            samples.append(time.perf_counter() - t0)
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.5)
+
+
+async def session_loop(session, think, quiet, results, stop):
+    while not stop.is_set():
+        await asyncio.sleep(session.rng.expovariate(1.0 / think))
+        if stop.is_set():
+            break
+        try:
+            result = await session.click(quiet)
+        except (TimeoutError, socketio.exceptions.SocketIOError):
+            results['errors'] += 1
+            continue
+        if result is not None:
+            results['clicks'].append(result)
+
+
+def _pct(values, q):
+    return float(np.percentile(values, q)) * 1000 if len(values) else float('nan')
+
+
+async def run(args, server_pid):
+    rng = random.Random(args.seed)
+    connector = aiohttp.TCPConnector(limit=0)
+    steps = []
+    async with aiohttp.ClientSession(connector=connector) as http:
+        sessions = []
+        open_limit = asyncio.Semaphore(args.open_concurrency)
+
+        async def open_session():
+            async with open_limit:
+                session = SimulatedSession(args.url, http, random.Random(rng.random()))
+                await session.open()
+                sessions.append(session)
+
+        print(f"{'sessions':>9}{'clicks':>8}{'clk/s':>7}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'first p50':>10}"
+              f"{'KB/click':>9}{'lag p50':>9}{'lag p99':>9}{'RSS MB':>8}{'errors':>7}")
+        saturated = None
+        for target in args.ramp:
+            await asyncio.gather(*(open_session() for _ in range(target - len(sessions))))
+            results = {'clicks': [], 'errors': 0}
+            probes = []
+            stop = asyncio.Event()
+            tasks = [asyncio.create_task(session_loop(s, args.think_time, args.quiet / 1000, results, stop))
+                     for s in sessions]
+            tasks.append(asyncio.create_task(probe_loop(http, args.url + args.probe_path, probes, stop)))
+            await asyncio.sleep(args.duration)
+            stop.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            last = [c[0] for c in results['clicks']]
+            first = [c[1] for c in results['clicks']]
+            kb = np.mean([c[2] for c in results['clicks']]) / 1024 if results['clicks'] else float('nan')
+            rss = server_rss_mb(server_pid)
+            step = {'sessions': len(sessions), 'clicks': len(last), 'clicks_per_s': len(last) / args.duration,
+                    'p50_ms': _pct(last, 50), 'p90_ms': _pct(last, 90), 'p99_ms': _pct(last, 99),
+                    'first_p50_ms': _pct(first, 50), 'kb_per_click': float(kb),
+                    'probe_p50_ms': _pct(probes, 50), 'probe_p99_ms': _pct(probes, 99),
+                    'server_rss_mb': rss, 'errors': results['errors']}
+            steps.append(step)
+            rss_text = f'{rss:.0f}' if rss is not None else '-'
+            print(f"{step['sessions']:>9}{step['clicks']:>8}{step['clicks_per_s']:>7.1f}{step['p50_ms']:>9.1f}"
+                  f"{step['p90_ms']:>9.1f}{step['p99_ms']:>9.1f}{step['first_p50_ms']:>10.1f}{kb:>9.1f}"
+                  f"{step['probe_p50_ms']:>9.1f}{step['probe_p99_ms']:>9.1f}{rss_text:>8}{step['errors']:>7}")
+            if saturated is None and (step['p90_ms'] > args.slo_ms or step['errors']):
+                saturated = step['sessions']
+
+        await asyncio.gather(*(s.close() for s in sessions), return_exceptions=True)
+
+    if saturated is None:
+        print(f'\nno saturation up to {args.ramp[-1]} sessions (p90 <= {args.slo_ms:.0f} ms)')
+    else:
+        print(f'\nsaturation at {saturated} sessions (p90 > {args.slo_ms:.0f} ms or errors)')
+    return {'url': args.url, 'think_time': args.think_time, 'slo_ms': args.slo_ms,
+            'saturated_at': saturated, 'steps': steps}
+
+
+async def wait_for_server(url, timeout=120):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as http:
+        while time.monotonic() < deadline:
+            try:
+                async with http.get(url) as response:
+                    if response.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f'{url} did not come up within {timeout} s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8081')
+    parser.add_argument('--launch', help='app script to start (from the repo root) and stop afterwards')
+    parser.add_argument('--server-pid', type=int, help='pid of an already running app, for RSS')
+    parser.add_argument('--ramp', default='10,50,100', help='comma-separated session counts')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per ramp step')
+    parser.add_argument('--think-time', type=float, default=2.0, help='mean seconds between clicks per session')
+    parser.add_argument('--quiet', type=float, default=100, help='ms without messages that ends a click response')
+    parser.add_argument('--slo-ms', type=float, default=500)
+    parser.add_argument('--probe-path', default='/sessions')
+    parser.add_argument('--open-concurrency', type=int, default=20, help='page loads in flight while ramping up')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+    args.url = args.url.rstrip('/')
+    args.ramp = [int(n) for n in args.ramp.split(',')]
+
+    server, server_pid = None, args.server_pid
+    if args.launch:
+        env = dict(os.environ, SALES_DATA_WATCH_INTERVAL=os.environ.get('SALES_DATA_WATCH_INTERVAL', '0'))
+        server = subprocess.Popen([sys.executable, args.launch], cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        server_pid = server.pid
+    try:
+        if server is not None:
+            asyncio.run(wait_for_server(args.url + args.probe_path))
+        result = asyncio.run(run(args, server_pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
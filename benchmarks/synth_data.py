@@ -0,0 +1,114 @@
+"""
+Synthetic Details.csv / Orders.csv in the layout of the sample data, at any scale.
+
+    python benchmarks/synth_data.py OUT_DIR --rows 1000000 [--states 36 --customers 50000 ...]
+
+--rows counts Details lines (order lines); every order gets --lines-per-order lines
+on average, so Orders.csv has about rows / lines-per-order rows. Customers and
+sub-categories follow a power law (--skew), like real sales: a few big customers,
+a long tail of small ones. Output is deterministic for a given --seed, and is
+written in chunks so 50M-row files do not need 50M rows in memory.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+DATE_FORMAT = '%d-%m-%Y'  # same as sales_data.DATE_FORMAT
+CATEGORIES = ['Furniture', 'Electronics', 'Clothing']
+PAYMENT_MODES = ['COD', 'UPI', 'EMI', 'Credit Card', 'Debit Card']
+CHUNK_ORDERS = 500_000
+
+
+def _power_law(n: int, skew: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+
+def _labels(prefix: str, n: int) -> np.ndarray:
+    width = len(str(n))
+    return np.array([f'{prefix} {i:0{width}d}' for i in range(1, n + 1)], dtype=object)
+
+
+def generate(out_dir: str, rows: int, states: int = 36, customers: int = 50_000, sub_categories: int = 17,
+             cities_per_state: int = 5, lines_per_order: float = 3.0, skew: float = 1.0, seed: int = 0):
+    """Writes OUT_DIR/Details.csv and OUT_DIR/Orders.csv; returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    details_path, orders_path = os.path.join(out_dir, 'Details.csv'), os.path.join(out_dir, 'Orders.csv')
+
+    state_names = _labels('State', states)
+    customer_names = _labels('Customer', customers)
+    sub_names = _labels('Sub', sub_categories)
+    sub_category = np.arange(sub_categories) % len(CATEGORIES)  # each sub-category belongs to one category
+    customer_p, sub_p = _power_law(customers, skew), _power_law(sub_categories, skew)
+    days = pd.date_range('2018-01-01', '2019-12-31', freq='D').strftime(DATE_FORMAT).to_numpy()
+
+    n_orders = max(1, int(round(rows / lines_per_order)))
+    written_lines, first = 0, True
+    for start in range(0, n_orders, CHUNK_ORDERS):
+        n = min(CHUNK_ORDERS, n_orders - start)
+        order_ids = np.char.add('B-', (np.arange(start, start + n) + 10_000).astype(str)).astype(object)
+
+        state = rng.integers(0, states, n)
+        orders = pd.DataFrame({
+            'Order ID': order_ids,
+            'Order Date': days[rng.integers(0, len(days), n)],
+            'CustomerName': customer_names[rng.choice(customers, n, p=customer_p)],
+            'State': state_names[state],
+            'City': np.char.add(np.char.add('City ', (state + 1).astype(str)),
+                                np.char.add('-', rng.integers(1, cities_per_state + 1, n).astype(str))).astype(object),
+        })
+
+        # Spread this chunk's share of the lines over its orders (at least one line each)
+        share = rows - written_lines if start + n >= n_orders else int(round(n * rows / n_orders))
+        share = max(share, n)
+        counts = 1 + rng.multinomial(share - n, np.full(n, 1.0 / n))
+        line_order = np.repeat(np.arange(n), counts)
+        m = len(line_order)
+
+        sub = rng.choice(sub_categories, m, p=sub_p)
+        quantity = rng.integers(1, 15, m)
+        amount = np.round(quantity * rng.lognormal(5.0, 0.8, m))
+        details = pd.DataFrame({
+            'Order ID': order_ids[line_order],
+            'Amount': amount,
+            'Profit': np.round(amount * rng.normal(0.08, 0.25, m)),
+            'Quantity': quantity,
+            'Category': np.array(CATEGORIES, dtype=object)[sub_category[sub]],
+            'Sub-Category': sub_names[sub],
+            'PaymentMode': np.array(PAYMENT_MODES, dtype=object)[rng.integers(0, len(PAYMENT_MODES), m)],
+        })
+
+        mode = 'w' if first else 'a'
+        orders.to_csv(orders_path, mode=mode, header=first, index=False)
+        details.to_csv(details_path, mode=mode, header=first, index=False, float_format='%.0f')
+        written_lines += m
+        first = False
+    return details_path, orders_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('out_dir')
+    parser.add_argument('--rows', type=int, default=100_000, help='Details lines (default 100000)')
+    parser.add_argument('--states', type=int, default=36)
+    parser.add_argument('--customers', type=int, default=50_000)
+    parser.add_argument('--sub-categories', type=int, default=17)
+    parser.add_argument('--lines-per-order', type=float, default=3.0)
+    parser.add_argument('--skew', type=float, default=1.0, help='power-law exponent for customers / sub-categories')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    paths = generate(args.out_dir, args.rows, args.states, args.customers, args.sub_categories,
+                     lines_per_order=args.lines_per_order, skew=args.skew, seed=args.seed)
+    for path in paths:
+        print(f'{path}: {os.path.getsize(path) / 1e6:.1f} MB')
+    print(f'generated in {time.perf_counter() - t0:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+from collections import namedtuple
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from time_index import bucket_mask
+
+# ==========================================
+# CHART DATA: TOP-K + HIGHLIGHT COLOURS
+# Responsibilities: turning per-group sums into the arrays a bar chart needs
+# (labels, values, colours) with partial selection and vectorized masking,
+# returned as plain lists that serialize as-is.
+# ==========================================
+
+# labels / values: plain lists, largest value first
+TopK = namedtuple('TopK', ['labels', 'values'])
+
+
+def top_k_order(sums: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """
+    Positions of the k largest sums, largest first; ties keep position order, also at the
+    cut-off (of the sums equal to the k-th largest, the lowest positions are kept), so the
+    result equals np.argsort(-sums, kind='stable')[:k].
+    Uses a partition, so only the k winners are sorted (k=None sorts everything).
+    """
+    if k is not None and k < len(sums):
+        kth = -np.partition(-sums, k - 1)[k - 1]  # the k-th largest sum
+        if np.isnan(kth):
+            return np.argsort(-sums, kind='stable')[:k]  # fewer than k non-NaN sums
+        above = np.flatnonzero(sums > kth)
+        part = np.concatenate((above, np.flatnonzero(sums == kth)[:k - len(above)]))
+        return part[np.lexsort((part, -sums[part]))]
+    return np.argsort(-sums, kind='stable')
+
+
+def top_k_codes(codes: np.ndarray, labels: np.ndarray, values: np.ndarray,
+                k: Optional[int] = None, dtype=None) -> TopK:
+    """
+    Sums values per code (codes index labels; code == len(labels) is a "missing" bucket
+    that is never returned) and keeps the k largest groups that have at least one row.
+    """
+    n = len(labels)
+    sums = np.bincount(codes, weights=values, minlength=n + 1)[:n]
+    present = np.flatnonzero(np.bincount(codes, minlength=n + 1)[:n])
+    sums = sums[present]
+    order = top_k_order(sums, k)
+    out = sums[order]
+    if dtype is not None:
+        out = out.astype(dtype)
+    return TopK(labels[present[order]].tolist(), out.tolist())
+
+
+def top_k_frame(df: pd.DataFrame, group_col: str, value_col: str, k: Optional[int] = None,
+                mask: Optional[np.ndarray] = None) -> TopK:
+    """
+    Same groups and order as
+    df.groupby(group_col, observed=True)[value_col].sum().sort_values(ascending=False, kind='stable').head(k),
+    i.e. equal sums in groupby's key order, computed on the categorical codes (no groupby,
+    no full sort).
+    mask: boolean row selection, so a filtered view is aggregated without copying df[mask].
+    """
+    col = df[group_col]
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        codes = col.array.codes
+        labels = np.asarray(col.cat.categories, dtype=object)
+    else:
+        codes, uniques = pd.factorize(col, sort=True)  # codes in groupby's (sorted) key order
+        labels = np.asarray(uniques, dtype=object)
+    codes = np.where(codes < 0, len(labels), codes)  # NaN -> extra bucket, never returned
+    values = df[value_col].to_numpy()
+    if mask is not None:
+        codes, values = codes[mask], values[mask]
+    return top_k_codes(codes, labels, values, k, dtype=values.dtype)
+
+
+def range_colors(labels, freq: str, date_range, color: str, dim_color: str) -> list:
+    """color for the trend buckets overlapping date_range (start, end); every bucket when it is None."""
+    if date_range is None:
+        return [color] * len(labels)
+    return np.where(bucket_mask(labels, freq, *date_range), color, dim_color).tolist()
+
+
+def highlight_colors(labels, selected, color: str, dim_color: str) -> list:
+    """
+    color for every bar when nothing is selected, otherwise only for the selected label
+    (or labels, when selected is a set from a multi-select filter).
+    """
+    if selected is None:
+        return [color] * len(labels)
+    labels = np.asarray(labels, dtype=object)
+    if isinstance(selected, (set, frozenset)):
+        mask = np.isin(labels, np.asarray(list(selected), dtype=object))
+    else:
+        mask = labels == selected
+    return np.where(mask, color, dim_color).tolist()
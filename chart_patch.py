@@ -0,0 +1,46 @@
+import json
+
+from nicegui import ui
+
+# ==========================================
+# DIFF-BASED CHART UPDATES
+# Responsibilities: sending only the changed parts of a chart (x / y values,
+# bar colours, title) instead of re-serializing the whole figure, and sending the
+# patches of all panels touched by one refresh in a single websocket message.
+# ==========================================
+
+
+def quiet_props(element: ui.element):
+    """
+    Context manager for editing an element's props (e.g. ui.echart options) in place
+    without NiceGUI sending the whole element to the browser.
+    """
+    return element._props.suspend_updates()  # pylint: disable=protected-access
+
+
+class ChartPatchBatch:
+    """
+    Collects chart method calls (Plotly.restyle, echarts setOption) during one dashboard
+    refresh; send() delivers them together as one run_javascript message.
+    The callers also apply each patch to the element's figure / options dict in place
+    (ui.plotly: its plain figure dict; ui.echart: options inside quiet_props), so the
+    server-side state matches the browser and a later full render starts from the current chart.
+    """
+
+    def __init__(self):
+        self._calls = []
+
+    def plotly_restyle(self, element: ui.plotly, update: dict, traces=(0,)):
+        """update uses plotly.js restyle syntax, e.g. {'y': [[1, 2]], 'marker.color': [['#fff', '#000']]}."""
+        self._calls.append((element.id, 'run_plot_method', ['restyle', update, list(traces)]))
+
+    def echart_set_option(self, element: ui.echart, option: dict):
+        """option is merged into the current chart (ECharts' default merge mode)."""
+        self._calls.append((element.id, 'run_chart_method', ['setOption', option]))
+
+    def send(self, client):
+        if not self._calls:
+            return
+        calls = json.dumps(self._calls, separators=(',', ':'))
+        self._calls = []
+        client.run_javascript(f'for (const [id, name, args] of {calls}) runMethod(id, name, args);')
@@ -0,0 +1,72 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from nicegui import app
+
+# ==========================================
+# WORKER POOL FOR DASHBOARD COMPUTATION
+# Responsibilities: keeping filter + aggregation work off the NiceGUI event loop,
+# so one heavy drill-down does not stall every other connected browser.
+# ==========================================
+
+# 'thread' (default): workers share the in-memory cube and aggregate cache.
+# 'process': a process pool of its own (not run.cpu_bound, whose pool always has one worker
+# per CPU); each worker process loads its own data (set SALES_DATA_SHARED_DIR so they all
+# memory-map one copy instead).
+POOL_MODE = os.environ.get('DASHBOARD_POOL', 'thread')
+# Worker threads, or worker processes in 'process' mode
+POOL_WORKERS = int(os.environ.get('DASHBOARD_POOL_WORKERS', '4'))
+
+_thread_pool = None
+_process_pool = None
+
+
+class Superseded(Exception):
+    """Raised to a caller whose request was replaced by a newer one from the same session."""
+
+
+async def run_compute(fn, *args):
+    """Runs fn(*args) in the configured pool (POOL_WORKERS workers) and awaits the result."""
+    global _thread_pool, _process_pool
+    if POOL_MODE == 'process':
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=POOL_WORKERS)
+            app.on_shutdown(partial(_process_pool.shutdown, cancel_futures=True))
+        pool = _process_pool
+    else:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=POOL_WORKERS, thread_name_prefix='dashboard-compute')
+        pool = _thread_pool
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, partial(fn, *args))
+
+
+class LatestRequest:
+    """
+    One per session. Starting a request cancels the previous one if it has not
+    finished yet (a queued job is dropped before it runs), and only the most
+    recent request is allowed to deliver its result.
+    """
+
+    def __init__(self):
+        self._generation = 0
+        self._task = None
+
+    async def run(self, fn, *args):
+        self._generation += 1
+        generation = self._generation
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+        self._task = asyncio.ensure_future(run_compute(fn, *args))
+        try:
+            result = await self._task
+        except asyncio.CancelledError:
+            if generation != self._generation:
+                raise Superseded() from None
+            raise
+        if generation != self._generation:
+            raise Superseded()
+        return result
@@ -0,0 +1,194 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from filter_index import FILTER_COLUMNS, RANGE_COLUMNS, FilterIndex
+from time_index import NO_DATE, TIME_COLUMN, from_days, to_days
+
+# ==========================================
+# COMPACT INTEGER-CODED FACT TABLE
+# Responsibilities: holding the merged order lines as flat NumPy arrays
+# (int32 dictionary codes per dimension, int32 / float32 measures, int32 days)
+# and answering the dashboard queries on them with np.bincount.
+# ==========================================
+
+DIMENSION_COLUMNS = ['Order ID', 'CustomerName', 'State', 'City', 'Category', 'Sub-Category', 'PaymentMode']
+# Per-row storage width; sums are still accumulated in 64 bits (filter_index.sum_dtype)
+MEASURE_DTYPES = {'Amount': np.float32, 'Profit': np.float32, 'Quantity': np.int32}
+DATE_COLUMN = TIME_COLUMN
+
+
+def _encode(values: pd.Series, labels: pd.Index):
+    """
+    int32 codes of values against the dictionary labels, extended with unseen values.
+    Returns (codes, labels); missing values get code -1 (see FactTable._missing_bucket).
+    """
+    codes, uniques = pd.factorize(values)
+    mapping = labels.get_indexer(uniques)
+    unseen = mapping < 0
+    if unseen.any():
+        mapping[unseen] = np.arange(len(labels), len(labels) + unseen.sum())
+        labels = labels.append(pd.Index(uniques[unseen], dtype=object))
+    # factorize codes are -1 for missing values; mapping[-1] must not be picked for them
+    out = np.where(codes < 0, -1, mapping[np.maximum(codes, 0)] if len(mapping) else -1)
+    return out.astype(np.int32), labels
+
+
+class FactTable:
+    """
+    One entry per order line, ~44 bytes per row at any scale:
+      - codes:    int32 dictionary code per dimension (labels[col][code]; len(labels[col]) = missing)
+      - measures: Amount / Profit as float32, Quantity as int32
+      - days:     Order Date as int32 days since 1970-01-01 (NO_DATE if missing)
+    Exposes the same query API as SalesCube / FilterIndex (rows / count / total / nunique /
+    group_sum / top_k), evaluated per row on the int32 codes, so it can stand in for the cube.
+    Unlike the cube it keeps every row, which is what filters on non-cube columns and
+    per-line measure ranges (range_columns, e.g. Amount between 500 and 2000) need.
+    With SALES_DATA_SHARED_DIR the table is built once and stored with sales_data.save_mapped,
+    so worker processes map its arrays (and the index's) read-only instead of each encoding
+    a private copy; appended() then returns an ordinary in-memory table.
+    """
+
+    def __init__(self, df: pd.DataFrame, dimensions: Iterable[str] = DIMENSION_COLUMNS,
+                 measures: Optional[Dict[str, type]] = None, filter_columns: Iterable[str] = FILTER_COLUMNS,
+                 distinct_col: str = 'Order ID', range_columns: Iterable[str] = RANGE_COLUMNS):
+        measures = MEASURE_DTYPES if measures is None else measures
+        self.dimensions = [col for col in dimensions if col in df.columns]
+        self.filter_columns = [col for col in filter_columns if col in self.dimensions]
+        self.measure_dtypes = {col: np.dtype(dtype) for col, dtype in measures.items()}
+        self.range_columns = [col for col in range_columns if col in self.measure_dtypes]
+        self.distinct_col = distinct_col
+        self._labels = {col: pd.Index([], dtype=object) for col in self.dimensions}
+        self._set_data(*self._encode_frame(df))
+
+    def _encode_frame(self, df: pd.DataFrame):
+        """Encodes df against this table's dictionaries: (codes, labels, measures, days) for df's rows only."""
+        codes, labels = {}, {}
+        for col in self.dimensions:
+            codes[col], labels[col] = _encode(df[col], self._labels[col])
+        measures = {col: df[col].to_numpy(dtype=dtype, na_value=0) for col, dtype in self.measure_dtypes.items()}
+        days = to_days(df[DATE_COLUMN]) if DATE_COLUMN in df.columns else np.full(len(df), NO_DATE, np.int32)
+        return codes, labels, measures, days
+
+    def _set_data(self, codes: Dict[str, np.ndarray], labels: Dict[str, pd.Index],
+                  measures: Dict[str, np.ndarray], days: np.ndarray):
+        self._labels = labels
+        self.labels = {col: np.asarray(idx, dtype=object) for col, idx in labels.items()}
+        # Missing values live in the extra bucket len(labels), as in FilterIndex
+        self.codes = {col: self._missing_bucket(c, len(labels[col])) for col, c in codes.items()}
+        self.measures = measures
+        self.days = days
+        self.index = FilterIndex.from_codes({col: self.codes[col] for col in self.filter_columns},
+                                            {col: self.labels[col] for col in self.filter_columns},
+                                            measures, distinct_codes=self.codes.get(self.distinct_col), days=days,
+                                            range_columns=self.range_columns)
+
+    @staticmethod
+    def _missing_bucket(codes: np.ndarray, n_labels: int) -> np.ndarray:
+        missing = codes < 0
+        if missing.any():
+            codes = np.where(missing, n_labels, codes).astype(np.int32)
+        return codes
+
+    def _encoded_codes(self, col: str) -> np.ndarray:
+        """codes[col] with missing values back at -1, so they survive a growing dictionary."""
+        codes = self.codes[col]
+        missing = codes == len(self.labels[col])
+        return np.where(missing, -1, codes).astype(np.int32) if missing.any() else codes
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[pd.DataFrame], **kwargs) -> 'FactTable':
+        """
+        Builds the table from merged frames arriving in pieces (see sales_data.iter_sales_chunks).
+        Each chunk is encoded on arrival, so only the compact arrays are kept, never the frames.
+        """
+        table = None
+        parts: List[tuple] = []
+        for chunk in chunks:
+            if table is None:
+                table = cls(chunk.iloc[:0], **kwargs)
+            parts.append(table._encode_frame(chunk))
+            table._labels = parts[-1][1]
+        if table is None:
+            raise ValueError('no chunks to build a FactTable from')
+        return table._concat(parts)
+
+    def appended(self, df: pd.DataFrame) -> 'FactTable':
+        """
+        Returns a new table with the merged rows of df added; labels unseen so far extend the
+        dictionaries, existing codes keep their meaning. The table itself is not modified.
+        """
+        own = {col: self._encoded_codes(col) for col in self.dimensions}
+        return self._concat([(own, self._labels, self.measures, self.days), self._encode_frame(df)])
+
+    def _concat(self, parts: List[tuple]) -> 'FactTable':
+        labels = parts[-1][1]  # every part's dictionary is a prefix of the last one
+        table = self.__class__.__new__(self.__class__)
+        table.dimensions, table.filter_columns = self.dimensions, self.filter_columns
+        table.measure_dtypes, table.distinct_col = self.measure_dtypes, self.distinct_col
+        table.range_columns = self.range_columns
+        table._set_data({col: np.concatenate([p[0][col] for p in parts]) for col in self.dimensions},
+                        labels,
+                        {col: np.concatenate([p[2][col] for p in parts]) for col in self.measure_dtypes},
+                        np.concatenate([p[3] for p in parts]))
+        return table
+
+    def to_frame(self) -> pd.DataFrame:
+        """The rows decoded back to a DataFrame (dimensions as categoricals)."""
+        data = {}
+        for col in self.dimensions:
+            codes = np.where(self.codes[col] == len(self.labels[col]), -1, self.codes[col])
+            data[col] = pd.Categorical.from_codes(codes, categories=self._labels[col])
+        for col, values in self.measures.items():
+            data[col] = values
+        data[DATE_COLUMN] = from_days(self.days).astype('datetime64[s]')
+        return pd.DataFrame(data)
+
+    # ── Size ──────────────────────────────────────────────────────────────────
+    @property
+    def n_rows(self) -> int:
+        return len(self.days)
+
+    n_cells = n_rows  # one cell per row, for code written against SalesCube
+
+    def memory_usage(self) -> pd.Series:
+        """Bytes per column (row arrays only); the dictionaries are reported as 'labels'."""
+        usage = {col: self.codes[col].nbytes for col in self.dimensions}
+        usage.update({col: values.nbytes for col, values in self.measures.items()})
+        usage[DATE_COLUMN] = self.days.nbytes
+        usage['labels'] = sum(idx.memory_usage(deep=True) for idx in self._labels.values())
+        return pd.Series(usage)
+
+    # ── Same query API as SalesCube, evaluated per row ────────────────────────
+    def rows(self, filters: Dict[str, object], ignore_col: Optional[str] = None) -> Optional[np.ndarray]:
+        """Row positions matching the filters (None means all rows)."""
+        return self.index.rows(filters, ignore_col=ignore_col)
+
+    def marginal_rows(self, filters: Dict[str, object], columns: Iterable[str]):
+        """rows() for the KPIs (key None) and for every column with its own filter ignored."""
+        return self.index.marginal_rows(filters, columns)
+
+    def count(self, rows: Optional[np.ndarray]) -> int:
+        return self.index.count(rows)
+
+    def total(self, rows: Optional[np.ndarray], value_col: str):
+        return self.index.total(rows, value_col)
+
+    def nunique(self, rows: Optional[np.ndarray]) -> int:
+        return self.index.nunique(rows)
+
+    def group_sum(self, rows: Optional[np.ndarray], group_col: str, value_col: str) -> pd.Series:
+        return self.index.group_sum(rows, group_col, value_col)
+
+    def top_k(self, rows: Optional[np.ndarray], group_col: str, value_col: str, k: Optional[int] = None):
+        return self.index.top_k(rows, group_col, value_col, k)
+
+    def trend(self, rows: Optional[np.ndarray], value_col: str, freq: str = 'month'):
+        return self.index.trend(rows, value_col, freq)
+
+    def date_extent(self):
+        return self.index.date_extent()
+
+    def range_extent(self, col: str):
+        return self.index.range_extent(col)
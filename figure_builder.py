@@ -0,0 +1,68 @@
+import functools
+from typing import Sequence
+
+import plotly.io as pio
+
+# ==========================================
+# LIGHTWEIGHT PLOTLY FIGURE BUILDER
+# Responsibilities: producing the same bar-chart figure as
+#   px.bar(..., template=...) + update_layout(...) + update_traces(marker_color=...)
+# as a plain dict, without plotly.express / graph_objects validation and template
+# merging on every render. ui.plotly accepts the dict as-is.
+# ==========================================
+
+# Layout shared by the dashboard bar charts (what the apps pass to update_layout)
+BAR_LAYOUT = {
+    'margin': {'l': 20, 'r': 20, 't': 40, 'b': 20},
+    'paper_bgcolor': 'rgba(0,0,0,0)',
+    'clickmode': 'event+select',
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_template(name: str = 'plotly_white') -> dict:
+    """The template as a plain dict, converted once per process. Shared: do not modify."""
+    return pio.templates[name].to_plotly_json()
+
+
+@functools.lru_cache(maxsize=None)
+def _bar_layout(title: str, x_title: str, y_title: str, template: str) -> dict:
+    layout = {
+        'template': get_template(template),
+        'xaxis': {'anchor': 'y', 'domain': [0.0, 1.0], 'title': {'text': x_title}},
+        'yaxis': {'anchor': 'x', 'domain': [0.0, 1.0], 'title': {'text': y_title}},
+        'legend': {'tracegroupgap': 0},
+        'title': {'text': title},
+        'barmode': 'relative',
+    }
+    layout.update(BAR_LAYOUT)
+    return layout
+
+
+def _to_list(values) -> list:
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def bar_figure(x: Sequence, y: Sequence, colors, title: str, x_title: str, y_title: str,
+               template: str = 'plotly_white') -> dict:
+    """
+    Vertical bar chart as a figure dict. Only the trace is built per call; the layout
+    (including the template) is cached per (title, axis titles, template) and shared
+    between figures, so callers must treat it as read-only and only patch data[0].
+    colors: one colour per bar, or a single colour string.
+    """
+    trace = {
+        'type': 'bar',
+        'x': _to_list(x),
+        'y': _to_list(y),
+        'marker': {'color': colors, 'pattern': {'shape': ''}},
+        'hovertemplate': f'{x_title}=%{{x}}<br>{y_title}=%{{y}}<extra></extra>',
+        'legendgroup': '',
+        'name': '',
+        'orientation': 'v',
+        'showlegend': False,
+        'textposition': 'auto',
+        'xaxis': 'x',
+        'yaxis': 'y',
+    }
+    return {'data': [trace], 'layout': _bar_layout(title, x_title, y_title, template)}
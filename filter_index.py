@@ -0,0 +1,301 @@
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from chart_data import TopK, top_k_codes
+from sorted_index import SortedIndex
+from time_index import TIME_COLUMN, TimeIndex, TimeSeries, to_days
+
+# ==========================================
+# INVERTED-INDEX FILTER ENGINE
+# Responsibilities: resolving a filter state to row positions and aggregating
+# those rows, without copying or boolean-masking the shared DataFrame.
+# ==========================================
+
+FILTER_COLUMNS = ['Sub-Category', 'State', 'CustomerName']
+MEASURE_COLUMNS = ['Amount', 'Profit', 'Quantity']
+# Measures that can be range-filtered per order line (row-level engines only)
+RANGE_COLUMNS = ['Amount', 'Profit']
+
+
+def sum_dtype(dtype) -> np.dtype:
+    """Accumulator for a measure: 64-bit, so float32 / int32 columns are summed without overflow or drift."""
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'f':
+        return np.result_type(dtype, np.float64)
+    if dtype.kind in 'iu':
+        return np.result_type(dtype, np.int64)
+    return dtype
+
+
+def describe_filter(col: str, value) -> str:
+    """Filter tag text, e.g. 'State: Delhi', 'State: Delhi, Goa' or 'Order Date: 2018-06-01 – 2018-08-31'."""
+    if isinstance(value, tuple):
+        start, end = ('…' if v is None else f'{v:,.0f}' if isinstance(v, (int, float)) else v for v in value)
+        return f'{col}: {start} – {end}'
+    if isinstance(value, frozenset):
+        return f'{col}: ' + ', '.join(sorted(map(str, value)))
+    return f'{col}: {value}'
+
+
+def marginal_masks(df: pd.DataFrame, filters: Dict[str, object],
+                   columns: Iterable[str]) -> Dict[Optional[str], np.ndarray]:
+    """
+    Frame counterpart of FilterIndex.marginal_rows, as boolean masks over df's rows: key None
+    applies every filter (KPIs), key col every filter except col's own (that chart).
+    Each filtered column is compared once, however many charts there are.
+    """
+    matches = {col: (df[col].isin(value) if isinstance(value, frozenset) else df[col] == value).to_numpy()
+               for col, value in filters.items()}
+
+    def combine(ignore_col=None):
+        mask = np.ones(len(df), dtype=bool)
+        for col, match in matches.items():
+            if col != ignore_col:
+                mask &= match
+        return mask
+
+    masks = {None: combine()}
+    for col in columns:
+        masks[col] = combine(col) if col in matches else masks[None]
+    return masks
+
+
+def toggle_filter(current, value, multi: bool = False):
+    """
+    Filter value after clicking value, given the current one (None = unfiltered).
+    Single select: value, or None when it was already selected. Multi select: value is
+    added to / removed from the set; a set of one is kept as a plain value.
+    """
+    if not multi:
+        return None if current == value else value
+    selected = set(current) if isinstance(current, frozenset) else set() if current is None else {current}
+    selected ^= {value}
+    if len(selected) > 1:
+        return frozenset(selected)
+    return next(iter(selected), None)
+
+
+class FilterIndex:
+    """
+    Built once per shared frame. For every filterable dimension it keeps
+      - codes:    one integer code per row
+      - postings: the row positions of each value (CSR layout: order[offsets[c]:offsets[c+1]])
+    and a sorted_index.SortedIndex per range column: the date column (time_col, a
+    time_index.TimeIndex) and the measures listed in range_columns.
+    A filter state then resolves to an int array of row positions. Filter values:
+      - a plain value:       equality (one posting list)
+      - a frozenset:         IN-list (the union of its values' posting lists)
+      - a (lo, hi) tuple:    inclusive range on a range column (None = open; ISO dates for time_col)
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: Iterable[str] = FILTER_COLUMNS,
+                 measures: Iterable[str] = MEASURE_COLUMNS, distinct_col: Optional[str] = 'Order ID',
+                 time_col: Optional[str] = TIME_COLUMN, range_columns: Iterable[str] = ()):
+        self._init(len(df))
+        for col in columns:
+            codes, uniques = pd.factorize(df[col])
+            labels = np.asarray(uniques, dtype=object)
+            self._add_column(col, np.where(codes < 0, len(labels), codes), labels)  # NaN -> extra bucket, never matched
+
+        self.measures = {col: df[col].to_numpy() for col in measures}
+        self.distinct_codes = pd.factorize(df[distinct_col])[0] if distinct_col else None
+        self.time_col = time_col
+        if time_col in df.columns:
+            days = df[time_col]
+            # int columns already hold day numbers (e.g. SalesCube cells); dates are converted
+            self.time = TimeIndex(days.to_numpy() if pd.api.types.is_integer_dtype(days.dtype) else to_days(days))
+        self.ranges = {col: SortedIndex(self.measures[col]) for col in range_columns}
+
+    @classmethod
+    def from_codes(cls, codes: Dict[str, np.ndarray], labels: Dict[str, np.ndarray],
+                   measures: Dict[str, np.ndarray], distinct_codes: Optional[np.ndarray] = None,
+                   days: Optional[np.ndarray] = None, time_col: str = TIME_COLUMN,
+                   range_columns: Iterable[str] = ()) -> 'FilterIndex':
+        """
+        Index over already dictionary-encoded columns (codes index labels; len(labels) = missing).
+        The code and measure arrays are used as given, not copied (see fact_table.FactTable).
+        """
+        index = cls.__new__(cls)
+        index._init(len(distinct_codes) if distinct_codes is not None else len(next(iter(codes.values()))))
+        for col, col_codes in codes.items():
+            index._add_column(col, col_codes, labels[col])
+        index.measures = dict(measures)
+        index.distinct_codes = distinct_codes
+        index.time_col = time_col
+        if days is not None:
+            index.time = TimeIndex(days)
+        index.ranges = {col: SortedIndex(index.measures[col]) for col in range_columns}
+        return index
+
+    def _init(self, n_rows: int):
+        self.n_rows = n_rows
+        self.codes: Dict[str, np.ndarray] = {}
+        self.labels: Dict[str, np.ndarray] = {}
+        self.lookup: Dict[str, Dict[object, int]] = {}
+        self._order: Dict[str, np.ndarray] = {}
+        self._offsets: Dict[str, np.ndarray] = {}
+        self.time_col: Optional[str] = None
+        self.time: Optional[TimeIndex] = None
+        self.ranges: Dict[str, SortedIndex] = {}
+
+    def _add_column(self, col: str, codes: np.ndarray, labels: np.ndarray):
+        self.codes[col] = codes
+        self.labels[col] = labels
+        self.lookup[col] = {v: i for i, v in enumerate(labels)}
+        self._order[col] = np.argsort(codes, kind='stable')
+        self._offsets[col] = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(labels) + 1))))
+
+    # ── Filtering ─────────────────────────────────────────────────────────────
+    def positions(self, col: str, value) -> np.ndarray:
+        """Row positions where df[col] == value (sorted, read-only view)."""
+        code = self.lookup[col].get(value)
+        if code is None:
+            return np.empty(0, dtype=np.intp)
+        return self._order[col][self._offsets[col][code]:self._offsets[col][code + 1]]
+
+    def rows(self, filters: Dict[str, object], ignore_col: Optional[str] = None) -> Optional[np.ndarray]:
+        """
+        Intersects the postings of every active filter (except ignore_col).
+        Returns None when nothing is filtered, meaning "all rows".
+        For the KPIs plus one row set per chart, marginal_rows() does the work once.
+        """
+        active = {c: v for c, v in filters.items() if c != ignore_col and v is not None}
+        if not active:
+            return None
+
+        # Start from the shortest posting list (sizes come from the offsets / binary searches,
+        # nothing is materialised yet), then narrow it with the other columns' codes or values
+        first = min(active, key=lambda c: self._size(c, active[c]))
+        rows = self._postings(first, active[first])
+        for col, value in active.items():
+            if col == first or len(rows) == 0:
+                continue
+            rows = self._narrow(rows, col, value)
+        return rows
+
+    def range_extent(self, col: str):
+        """(min, max) of a range-filterable column, or None if it has no range index."""
+        index = self._range_index(col)
+        return index.extent() if index is not None else None
+
+    def _range_index(self, col: str) -> Optional[SortedIndex]:
+        return self.time if col == self.time_col else self.ranges.get(col)
+
+    def _is_range(self, col: str, value) -> bool:
+        if col == self.time_col:
+            return True
+        if isinstance(value, tuple):
+            if col not in self.ranges:
+                raise ValueError(f'{col} has no range index (range filters on measures need row-level data)')
+            return True
+        return False
+
+    def _codes_of(self, col: str, value) -> list:
+        lookup = self.lookup[col]
+        return [lookup[v] for v in (value if isinstance(value, frozenset) else (value,)) if v in lookup]
+
+    def _size(self, col: str, value) -> int:
+        if self._is_range(col, value):
+            index = self._range_index(col)
+            return index.count(*value) if index is not None else 0  # a date range on data without dates
+        offsets = self._offsets[col]
+        return int(sum(offsets[c + 1] - offsets[c] for c in self._codes_of(col, value)))
+
+    def _postings(self, col: str, value) -> np.ndarray:
+        if self._is_range(col, value):
+            # Range: two binary searches on the sorted index
+            index = self._range_index(col)
+            return index.positions(*value) if index is not None else np.empty(0, dtype=np.intp)
+        order, offsets = self._order[col], self._offsets[col]
+        slices = [order[offsets[c]:offsets[c + 1]] for c in self._codes_of(col, value)]
+        if len(slices) == 1:
+            return slices[0]  # equality: a read-only view, as positions()
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.intp)
+
+    def _matches(self, rows: np.ndarray, col: str, value) -> np.ndarray:
+        """Boolean mask over rows: which of them pass the filter on col."""
+        if self._is_range(col, value):
+            index = self._range_index(col)
+            return index.contains(rows, *value) if index is not None else np.zeros(len(rows), dtype=bool)
+        codes = self._codes_of(col, value)
+        if len(codes) == 1:
+            return self.codes[col][rows] == codes[0]
+        # IN-list: one lookup into a per-code membership table instead of a comparison per value
+        member = np.zeros(len(self.labels[col]) + 1, dtype=bool)
+        member[codes] = True
+        return member[self.codes[col][rows]]
+
+    def _narrow(self, rows: np.ndarray, col: str, value) -> np.ndarray:
+        return rows[self._matches(rows, col, value)]
+
+    def marginal_rows(self, filters: Dict[str, object],
+                      columns: Iterable[str]) -> Dict[Optional[str], Optional[np.ndarray]]:
+        """
+        Every cross-filter row set of a dashboard at once: key None is rows(filters) (the
+        KPIs), key col is rows(filters, ignore_col=col) for each chart column (None = all rows).
+        Each filter is tested once over the shortest posting list and the charts combine those
+        masks, instead of intersecting again per chart; only the chart of the shortest
+        filter's own column starts from the second shortest list.
+        """
+        columns = list(columns)
+        active = {c: v for c, v in filters.items() if v is not None}
+        if len(active) < 2:
+            rows = self.rows(active)
+            return {None: rows, **{col: None if col in active else rows for col in columns}}
+
+        first, *others = sorted(active, key=lambda c: self._size(c, active[c]))
+        candidates = self._postings(first, active[first])
+        matches = {col: self._matches(candidates, col, active[col]) for col in others}
+
+        def narrowed(ignore_col=None):
+            masks = [match for col, match in matches.items() if col != ignore_col]
+            return candidates[np.logical_and.reduce(masks)] if masks else candidates
+
+        marginals = {None: narrowed()}
+        for col in columns:
+            if col == first:
+                marginals[col] = self.rows(active, ignore_col=first)
+            else:
+                marginals[col] = narrowed(col) if col in active else marginals[None]
+        return marginals
+
+    # ── Aggregation over row positions ────────────────────────────────────────
+    def _take(self, arr: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        return arr if rows is None else arr[rows]
+
+    def count(self, rows: Optional[np.ndarray]) -> int:
+        return self.n_rows if rows is None else len(rows)
+
+    def total(self, rows: Optional[np.ndarray], value_col: str):
+        values = self._take(self.measures[value_col], rows)
+        return values.sum(dtype=sum_dtype(values.dtype))
+
+    def nunique(self, rows: Optional[np.ndarray]) -> int:
+        return len(np.unique(self._take(self.distinct_codes, rows)))
+
+    def group_sum(self, rows: Optional[np.ndarray], group_col: str, value_col: str) -> pd.Series:
+        """Equivalent of df.iloc[rows].groupby(group_col)[value_col].sum() (observed groups only)."""
+        labels = self.labels[group_col]
+        codes = self._take(self.codes[group_col], rows)
+        values = self._take(self.measures[value_col], rows)
+        sums = np.bincount(codes, weights=values, minlength=len(labels) + 1)[:len(labels)]
+        present = np.bincount(codes, minlength=len(labels) + 1)[:len(labels)] > 0
+        out = pd.Series(sums[present], index=pd.Index(labels[present], name=group_col), name=value_col)
+        return out.astype(sum_dtype(self.measures[value_col].dtype))
+
+    def trend(self, rows: Optional[np.ndarray], value_col: str, freq: str = 'month') -> Optional[TimeSeries]:
+        """value_col summed per day / week / month bucket (None when the data has no dates)."""
+        if self.time is None:
+            return None
+        return self.time.rollup(rows, self.measures[value_col], freq)
+
+    def date_extent(self):
+        """(first, last) ISO date with data, or None."""
+        return self.time.extent() if self.time is not None else None
+
+    def top_k(self, rows: Optional[np.ndarray], group_col: str, value_col: str, k: Optional[int] = None) -> TopK:
+        """group_sum sorted descending and cut to k groups, via partial selection (chart_data.top_k_codes)."""
+        return top_k_codes(self._take(self.codes[group_col], rows), self.labels[group_col],
+                           self._take(self.measures[value_col], rows), k, dtype=sum_dtype(self.measures[value_col].dtype))
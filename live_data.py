@@ -0,0 +1,109 @@
+import os
+import threading
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from sales_cube import SalesCube, build_sales_cube
+from sales_data import (DETAILS_DTYPES, DETAILS_PATH, ORDERS_PATH, get_sales_data, join_orders,
+                        read_appended_orders, read_appended_rows, read_orders)
+
+# ==========================================
+# LIVE APPEND / HOT RELOAD
+# Responsibilities: following rows appended to Details.csv / Orders.csv and
+# folding only those rows into the shared cube, without restarting ui.run.
+# ==========================================
+
+# Seconds between checks of the CSV files; 0 disables the watcher
+WATCH_INTERVAL = float(os.environ.get('SALES_DATA_WATCH_INTERVAL', '2'))
+
+
+class LiveSalesCube:
+    """
+    Holds the current SalesCube together with the byte offsets of both CSVs it covers.
+    refresh() parses only the lines appended since then, joins new Details lines against
+    the Orders index and swaps in cube.appended(delta). Details lines whose order is not
+    in Orders.csv yet are kept and retried on the next refresh.
+    A file that shrinks or is replaced (new inode) triggers one full rebuild instead.
+
+    `current` is a (version, cube) tuple replaced in one assignment, so readers on other
+    threads always see a matching pair.
+    """
+
+    def __init__(self, details_path: Optional[str] = DETAILS_PATH, orders_path: Optional[str] = ORDERS_PATH,
+                 cube: Optional[SalesCube] = None):
+        self.paths = (details_path, orders_path)
+        self._lock = threading.Lock()
+        self._version = 0
+        if cube is not None:
+            # Fixed data (e.g. demo rows): nothing to watch
+            self.paths = None
+            self.current: Tuple[int, SalesCube] = (0, cube)
+        else:
+            self._rebuild()
+
+    @property
+    def cube(self) -> SalesCube:
+        return self.current[1]
+
+    def _stat(self):
+        return [os.stat(path) for path in self.paths]
+
+    def _rebuild(self):
+        details_path, orders_path = self.paths
+        while True:
+            before = self._stat()
+            get_sales_data.cache_clear()
+            # Lines the inner join dropped because their order is not in Orders.csv yet,
+            # collected by the same load (or binary cache read) that builds the cube
+            unmatched = []
+            cube = build_sales_cube(details_path, orders_path, unmatched=unmatched)
+            orders = read_orders(orders_path).set_index('Order ID')
+            after = self._stat()
+            # Retry if a writer appended while we were loading, so no line is counted twice or lost
+            if [(st.st_ino, st.st_size) for st in before] == [(st.st_ino, st.st_size) for st in after]:
+                break
+
+        self._inodes = [st.st_ino for st in after]
+        self._offsets = [st.st_size for st in after]
+        self._orders = orders
+        unmatched = pd.concat(unmatched, ignore_index=True) if unmatched else None
+        self._pending = unmatched if unmatched is not None and len(unmatched) else None
+        self._version += 1
+        self.current = (self._version, cube)
+
+    def refresh(self) -> bool:
+        """Picks up appended rows; returns True if the cube changed. Blocking, run it off the event loop."""
+        if self.paths is None:
+            return False
+        with self._lock:
+            try:
+                stats = self._stat()
+            except FileNotFoundError:
+                return False  # mid-replace; try again next time
+            if any(st.st_ino != ino or st.st_size < offset
+                   for st, ino, offset in zip(stats, self._inodes, self._offsets)):
+                self._rebuild()
+                return True
+            if [st.st_size for st in stats] == self._offsets:
+                return False  # pending lines can only match once Orders.csv grows
+
+            details_path, orders_path = self.paths
+            # Orders first, so details lines appended together with their order join immediately
+            new_orders, self._offsets[1] = read_appended_orders(orders_path, self._offsets[1])
+            if new_orders is not None:
+                self._orders = pd.concat([self._orders, new_orders.set_index('Order ID')])
+
+            new_details, self._offsets[0] = read_appended_rows(details_path, DETAILS_DTYPES, self._offsets[0])
+            details = [df for df in (self._pending, new_details) if df is not None]
+            if not details:
+                return False
+
+            merged, unmatched = join_orders(pd.concat(details, ignore_index=True), self._orders)
+            self._pending = unmatched if len(unmatched) else None
+            if merged.empty:
+                return False
+
+            self._version += 1
+            self.current = (self._version, self.cube.appended(merged))
+            return True
@@ -0,0 +1,175 @@
+import asyncio
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Tuple
+
+from fastapi.responses import PlainTextResponse
+from nicegui import Client, app, background_tasks
+
+# ==========================================
+# HOT-PATH INSTRUMENTATION + /metrics
+# Responsibilities: timing the phases of a dashboard refresh (filter, aggregate,
+# figure build, push), counting clicks, sampling event-loop lag, and serving all of
+# it in the Prometheus text format. No client library needed.
+# ==========================================
+
+# Seconds between event-loop lag samples; 0 disables the sampler
+LOOP_LAG_INTERVAL = float(os.environ.get('DASHBOARD_LOOP_LAG_INTERVAL', '0.5'))
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape_label_value(value) -> str:
+    # Text format: backslash, double quote and line feed are escaped inside label values
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape_label_value(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            for values, total in self._values.items():
+                yield f'{self.name}{_format_labels(self.labels, values)} {total}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram, safe to observe from worker threads."""
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, *label_values: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, *label_values)
+
+    def render(self) -> Iterable[str]:
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for values, counts in series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f'{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}'
+            le = 'le="+Inf"'
+            yield f'{self.name}_bucket{_format_labels(self.labels, values, le)} {counts[-1]}'
+            yield f'{self.name}_sum{_format_labels(self.labels, values)} {counts[-2]}'
+            yield f'{self.name}_count{_format_labels(self.labels, values)} {counts[-1]}'
+
+
+class Gauge:
+    """Value read from a callback at scrape time; the callback returns {label values tuple: value}."""
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], Dict[Tuple[str, ...], float]],
+                 labels: Iterable[str] = (), kind: str = 'gauge'):
+        self.name, self.help, self.labels, self.read, self.kind = name, help_text, tuple(labels), read, kind
+
+    def render(self) -> Iterable[str]:
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} {self.kind}'
+        for values, value in self.read().items():
+            yield f'{self.name}{_format_labels(self.labels, values)} {value}'
+
+
+PHASE_SECONDS = Histogram('dashboard_phase_seconds', 'Time spent per refresh phase (filter, aggregate, figure, push).',
+                          labels=('phase',))
+REFRESH_SECONDS = Histogram('dashboard_refresh_seconds', 'End-to-end time of one dashboard refresh.',
+                            labels=('trigger',))
+EVENTS = Counter('dashboard_events_total', 'User interactions handled, by handler.', labels=('handler',))
+LOOP_LAG = Histogram('event_loop_lag_seconds', 'Delay of a scheduled event-loop wakeup beyond its due time.',
+                     buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+
+_registry = [PHASE_SECONDS, REFRESH_SECONDS, EVENTS, LOOP_LAG,
+             Gauge('nicegui_clients', 'NiceGUI clients (page instances) held by the server.',
+                   lambda: {(): len(Client.instances)})]
+
+
+def phase(name: str):
+    """with phase('filter'): ... — times one refresh phase."""
+    return PHASE_SECONDS.time(name)
+
+
+def register(metric):
+    """Adds a metric (e.g. a Gauge over app state) to /metrics."""
+    _registry.append(metric)
+    return metric
+
+
+def register_cache(cache, name: str = 'aggregate'):
+    """Exports an agg_cache.AggregateCache's hits, misses and size."""
+    register(Gauge('dashboard_cache_hits_total', 'Aggregate cache hits.',
+                   lambda: {(name,): cache.stats()['hits']}, labels=('cache',), kind='counter'))
+    register(Gauge('dashboard_cache_misses_total', 'Aggregate cache misses.',
+                   lambda: {(name,): cache.stats()['misses']}, labels=('cache',), kind='counter'))
+    register(Gauge('dashboard_cache_entries', 'Aggregate cache entries.',
+                   lambda: {(name,): cache.stats()['size']}, labels=('cache',)))
+
+
+def register_sessions(sessions):
+    """Exports a session_manager.SessionManager's resident / connected / evicted session counts."""
+    register(Gauge('dashboard_sessions', 'Resident dashboard sessions.', lambda: {(): len(sessions)}))
+    register(Gauge('dashboard_sessions_connected', 'Resident sessions with a live websocket.',
+                   lambda: {(): sessions.stats()['connected']}))
+    register(Gauge('dashboard_sessions_evicted_total', 'Sessions evicted for idleness or over the cap.',
+                   lambda: {(): sessions.evicted}, kind='counter'))
+
+
+def render_metrics() -> str:
+    return '\n'.join(line for metric in _registry for line in metric.render()) + '\n'
+
+
+async def _sample_loop_lag(interval: float):
+    loop = asyncio.get_running_loop()
+    while True:
+        due = loop.time() + interval
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - due))
+
+
+def add_metrics_route(path: str = '/metrics', loop_lag_interval: float = LOOP_LAG_INTERVAL):
+    """Serves render_metrics() at path and starts the event-loop lag sampler with the app."""
+    @app.get(path, response_class=PlainTextResponse)
+    async def metrics():  # async: reads the client / element registry on the event loop that mutates it
+        return PlainTextResponse(render_metrics(), media_type='text/plain; version=0.0.4')
+
+    if loop_lag_interval > 0:
+        app.on_startup(lambda: background_tasks.create(_sample_loop_lag(loop_lag_interval), name='loop lag'))
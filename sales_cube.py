@@ -0,0 +1,237 @@
+import functools
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from fact_table import FactTable
+from filter_index import FILTER_COLUMNS, MEASURE_COLUMNS, FilterIndex
+from sales_data import (COMPACT, DETAILS_PATH, ORDERS_PATH, SHARED_DIR, STREAMING, get_sales_data,
+                        get_shared_derived, iter_sales_chunks, read_sales_tables)
+from time_index import TIME_COLUMN, to_days
+
+# ==========================================
+# PRE-AGGREGATED DATA CUBE
+# Responsibilities: answering the dashboard queries from one row per
+# Sub-Category x State x CustomerName x day combination instead of one row per order line.
+# ==========================================
+
+
+def _with_days(df: pd.DataFrame, time_col: Optional[str]) -> pd.DataFrame:
+    """df with the date column replaced by int32 day numbers (a shallow copy; the frame is not modified)."""
+    if time_col is None or pd.api.types.is_integer_dtype(df[time_col].dtype):
+        return df
+    return df.assign(**{time_col: to_days(df[time_col])})
+
+
+class SalesCube:
+    """
+    Built once at startup from the merged frame:
+      - cells:  sum(Amount), sum(Profit), sum(Quantity) per dimension combination and day
+                (the day, as an int day number, only when the frame has time_col)
+      - pairs:  the distinct (cell, Order ID) pairs, so the order count stays exact
+    Exposes the same query API as FilterIndex (rows / count / total / nunique / group_sum /
+    top_k / trend), so the dashboards can swap one for the other. Click latency then depends
+    on the number of combinations, not on the number of order lines; the cells are already
+    bucketed by day, so the date-range filter and the trend rollups never touch order lines.
+    """
+
+    def __init__(self, df: pd.DataFrame, dimensions: Iterable[str] = FILTER_COLUMNS,
+                 measures: Iterable[str] = MEASURE_COLUMNS, distinct_col: str = 'Order ID',
+                 time_col: Optional[str] = TIME_COLUMN):
+        dimensions, measures = list(dimensions), list(measures)
+        time_col = time_col if time_col in df.columns else None
+        df = _with_days(df, time_col)
+        # dropna=False: lines with a missing dimension get cells of their own, so they still count
+        # in the KPIs (FilterIndex puts the missing value in a bucket no filter or chart returns)
+        grouped = df.groupby(dimensions + ([time_col] if time_col else []), observed=True, dropna=False)
+        cells = grouped[measures].sum().reset_index()
+
+        # Order IDs per cell: an order with several lines in one cell is stored once
+        cell_id = grouped.ngroup().to_numpy()
+        order_codes, order_ids = pd.factorize(df[distinct_col])
+        pairs = pd.DataFrame({'cell': cell_id, 'order': order_codes})
+        pairs = pairs[(pairs['cell'] >= 0) & (pairs['order'] >= 0)].drop_duplicates()
+        self._set_data(cells, pairs['cell'].to_numpy(), pairs['order'].to_numpy(), pd.Index(order_ids),
+                       dimensions, measures, distinct_col, time_col)
+
+    def _set_data(self, cells: pd.DataFrame, pair_cell: np.ndarray, pair_order: np.ndarray,
+                  order_ids: pd.Index, dimensions: List[str], measures: List[str], distinct_col: str,
+                  time_col: Optional[str] = None):
+        self.dimensions, self.measures, self.distinct_col = dimensions, measures, distinct_col
+        self.time_col = time_col
+        self.range_columns: List[str] = []  # cells hold sums, so per-line measure ranges need FactTable
+        self._keys = dimensions + ([time_col] if time_col else [])
+        self.cells = cells
+        self.index = FilterIndex(cells, dimensions, measures, distinct_col=None, time_col=time_col)
+        self._cell_keys = pd.MultiIndex.from_frame(cells[self._keys].astype(str))
+        self._pair_cell = pair_cell
+        self._pair_order = pair_order
+        self._order_ids = order_ids
+
+    def _cell_positions(self, frame: pd.DataFrame) -> np.ndarray:
+        """Position of each row's dimension combination (and day) in cells (-1 if unknown)."""
+        return self._cell_keys.get_indexer(pd.MultiIndex.from_frame(frame[self._keys].astype(str)))
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[pd.DataFrame], dimensions: Iterable[str] = FILTER_COLUMNS,
+                    measures: Iterable[str] = MEASURE_COLUMNS, distinct_col: str = 'Order ID',
+                    fold_every: int = 8, time_col: Optional[str] = TIME_COLUMN) -> 'SalesCube':
+        """
+        Builds the same cube from merged frames arriving in pieces (see sales_data.iter_sales_chunks).
+        Each chunk is reduced to partial cell sums and distinct (dimensions, order) pairs, and the
+        partials are folded together every fold_every chunks. Memory is bounded by the chunk size
+        plus the number of cells and pairs, never by the number of order lines.
+        """
+        dimensions, measures = list(dimensions), list(measures)
+        cell_keys = dimensions
+
+        def fold_cells(parts):
+            return (pd.concat(parts, ignore_index=True).groupby(cell_keys, observed=True, dropna=False)[measures]
+                    .sum().reset_index())
+
+        def fold_pairs(parts):
+            return pd.concat(parts, ignore_index=True).drop_duplicates()
+
+        cell_parts, pair_parts = [], []
+        for chunk in chunks:
+            if not cell_parts:
+                time_col = time_col if time_col in chunk.columns else None
+                cell_keys = dimensions + ([time_col] if time_col else [])
+            chunk = _with_days(chunk, time_col)
+            cell_parts.append(chunk.groupby(cell_keys, observed=True, dropna=False)[measures].sum().reset_index())
+            pair_parts.append(chunk[cell_keys + [distinct_col]].dropna(subset=[distinct_col]).drop_duplicates())
+            if len(cell_parts) >= fold_every:
+                cell_parts, pair_parts = [fold_cells(cell_parts)], [fold_pairs(pair_parts)]
+
+        if not cell_parts:
+            return cls(pd.DataFrame(columns=dimensions + [distinct_col] + measures), dimensions, measures, distinct_col)
+
+        # Chunks may carry different category sets; the folded frame is re-encoded once at the end
+        cells = fold_cells(cell_parts)
+        pairs = fold_pairs(pair_parts)
+        for col in dimensions:
+            cells[col] = cells[col].astype(object).astype('category')  # missing values stay missing
+
+        cube = cls.__new__(cls)
+        cube._set_data(cells, np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), pd.Index([]),
+                       dimensions, measures, distinct_col, time_col)
+        order_codes, order_ids = pd.factorize(pairs[distinct_col])
+        cube._pair_cell = cube._cell_positions(pairs)
+        cube._pair_order = order_codes
+        cube._order_ids = pd.Index(order_ids)
+        return cube
+
+    def appended(self, df: pd.DataFrame) -> 'SalesCube':
+        """
+        Returns a new cube with the merged rows of df added. Only df is aggregated:
+        known combinations get their sums increased, new ones are added at the end, so
+        existing cell positions stay valid. The cube itself is not modified, which lets
+        running queries finish on the old version while the new one is swapped in.
+        """
+        dims, measures = self.dimensions, self.measures
+        df = _with_days(df, self.time_col)
+        delta = df.groupby(self._keys, observed=True, dropna=False)[measures].sum().reset_index()
+        pos = self._cell_positions(delta)
+        known = pos >= 0
+
+        cells = self.cells.copy()
+        for col in measures:
+            values = cells[col].to_numpy().copy()
+            values[pos[known]] += delta.loc[known, col].to_numpy()
+            cells[col] = values
+        if not known.all():
+            cells = pd.concat([cells, delta[~known]], ignore_index=True)
+            for col in dims:
+                cells[col] = cells[col].astype(object).astype('category')
+
+        cube = SalesCube.__new__(SalesCube)
+        cube._set_data(cells, self._pair_cell, self._pair_order, self._order_ids,
+                       dims, measures, self.distinct_col, self.time_col)
+
+        # New (cell, order) pairs; duplicates of existing pairs are harmless for nunique()
+        pairs = df[self._keys + [self.distinct_col]].dropna(subset=[self.distinct_col]).drop_duplicates()
+        order_ids = self._order_ids.append(pd.Index(pairs[self.distinct_col]).difference(self._order_ids))
+        cube._order_ids = order_ids
+        cube._pair_cell = np.concatenate([self._pair_cell, cube._cell_positions(pairs)])
+        cube._pair_order = np.concatenate([self._pair_order, order_ids.get_indexer(pairs[self.distinct_col])])
+        return cube
+
+    @property
+    def n_cells(self) -> int:
+        return len(self.cells)
+
+    # ── Same query API as FilterIndex, evaluated over cells ────────────────────
+    def rows(self, filters: Dict[str, object], ignore_col: Optional[str] = None) -> Optional[np.ndarray]:
+        """Cell positions matching the filters (None means all cells)."""
+        return self.index.rows(filters, ignore_col=ignore_col)
+
+    def marginal_rows(self, filters: Dict[str, object], columns: Iterable[str]):
+        """rows() for the KPIs (key None) and for every column with its own filter ignored."""
+        return self.index.marginal_rows(filters, columns)
+
+    def count(self, rows: Optional[np.ndarray]) -> int:
+        return self.index.count(rows)
+
+    def total(self, rows: Optional[np.ndarray], value_col: str):
+        return self.index.total(rows, value_col)
+
+    def group_sum(self, rows: Optional[np.ndarray], group_col: str, value_col: str) -> pd.Series:
+        return self.index.group_sum(rows, group_col, value_col)
+
+    def top_k(self, rows: Optional[np.ndarray], group_col: str, value_col: str, k: Optional[int] = None):
+        return self.index.top_k(rows, group_col, value_col, k)
+
+    def trend(self, rows: Optional[np.ndarray], value_col: str, freq: str = 'month'):
+        """value_col per day / week / month over the selected cells (None without dates)."""
+        return self.index.trend(rows, value_col, freq)
+
+    def date_extent(self):
+        return self.index.date_extent()
+
+    def range_extent(self, col: str):
+        return self.index.range_extent(col)
+
+    def nunique(self, rows: Optional[np.ndarray]) -> int:
+        """Distinct Order IDs over the selected cells."""
+        if rows is None:
+            orders = self._pair_order
+        else:
+            selected = np.zeros(self.n_cells, dtype=bool)
+            selected[rows] = True
+            orders = self._pair_order[selected[self._pair_cell]]
+        return len(np.unique(orders))
+
+
+def build_sales_cube(details_path: str = DETAILS_PATH, orders_path: str = ORDERS_PATH,
+                     unmatched: Optional[list] = None) -> SalesCube:
+    """
+    A new cube from the CSVs. With SALES_DATA_STREAMING=1 it is built chunk by chunk and
+    the merged frame is never materialised; otherwise it is built from get_sales_data().
+    With SALES_DATA_COMPACT=1 a FactTable (same query API, one entry per row) is returned
+    instead, and the merged frame is dropped once it has been encoded; with SALES_DATA_SHARED_DIR
+    as well, the table's arrays are built once and memory-mapped by every worker process.
+    unmatched: if given, the Details lines without an order in Orders.csv are appended to it,
+    from the same load (binary cache / shared files included), so nobody reads Details.csv twice.
+    """
+    if STREAMING:
+        chunks = iter_sales_chunks(details_path, orders_path, unmatched=unmatched)
+        return (FactTable if COMPACT else SalesCube).from_chunks(chunks)
+    if COMPACT and SHARED_DIR:
+        # Encoded once into the shared directory; every worker maps the same int32 / float32 arrays
+        table, dropped = get_shared_derived('fact_table', FactTable, details_path, orders_path)
+        if unmatched is not None and len(dropped):
+            unmatched.append(dropped)
+        return table
+    if COMPACT or unmatched is not None:
+        df, dropped = read_sales_tables(details_path, orders_path)  # not kept in the lru_cache
+        if unmatched is not None and len(dropped):
+            unmatched.append(dropped)
+        return FactTable(df) if COMPACT else SalesCube(df)
+    return SalesCube(get_sales_data(details_path, orders_path))
+
+
+@functools.lru_cache(maxsize=None)
+def get_sales_cube(details_path: str = DETAILS_PATH, orders_path: str = ORDERS_PATH) -> SalesCube:
+    """Process-wide cube, built on first call (see build_sales_cube)."""
+    return build_sales_cube(details_path, orders_path)
@@ -0,0 +1,472 @@
+import functools
+import hashlib
+import io
+import json
+import os
+import pickle
+import shutil
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  # optional: enables the Feather cache format
+except ImportError:
+    pyarrow = None
+
+# ==========================================
+# SHARED DATA LAYER
+# Responsibilities: Loading, Merging, Cleaning (once per process)
+# Every dashboard imports the merged frame from here instead of
+# repeating read_csv + merge + strip at import time.
+# ==========================================
+
+DETAILS_PATH = 'Details.csv'
+ORDERS_PATH = 'Orders.csv'
+
+# Explicit dtypes: pandas no longer has to infer column types, and the
+# measure columns get a fixed numeric width.
+DETAILS_DTYPES = {
+    'Order ID': 'str',
+    'Amount': 'float64',
+    'Profit': 'float64',
+    'Quantity': 'int64',
+    'Category': 'category',
+    'Sub-Category': 'category',
+    'PaymentMode': 'category',
+}
+ORDERS_DTYPES = {
+    'Order ID': 'str',
+    'Order Date': 'str',
+    'CustomerName': 'category',
+    'State': 'category',
+    'City': 'str',
+}
+
+# Low-cardinality dimensions stored as pandas categoricals
+CATEGORICAL_COLUMNS = ['Category', 'Sub-Category', 'PaymentMode', 'CustomerName', 'State']
+
+# Some exports use spaced headers; normalise them to the names the dashboards use
+COLUMN_ALIASES = {'Sub Category': 'Sub-Category', 'Customer Name': 'CustomerName'}
+
+DATE_FORMAT = '%d-%m-%Y'
+
+# Binary cache of the cleaned, merged frame. Reused on the next start while the
+# source CSVs are unchanged; set SALES_DATA_CACHE=0 to disable.
+CACHE_DIR = os.environ.get('SALES_DATA_CACHE_DIR', '.cache')
+CACHE_ENABLED = os.environ.get('SALES_DATA_CACHE', '1') != '0'
+CACHE_VERSION = 3  # bump when the cleaning logic or the cached files change
+
+# Streaming ingestion (SALES_DATA_STREAMING=1): Details.csv is read SALES_DATA_CHUNK_ROWS
+# lines at a time and only the aggregates are kept (see SalesCube.from_chunks).
+STREAMING = os.environ.get('SALES_DATA_STREAMING', '0') == '1'
+CHUNK_ROWS = int(os.environ.get('SALES_DATA_CHUNK_ROWS', '200000'))
+
+# Compact mode (SALES_DATA_COMPACT=1): the multi-user dashboards query a row-level
+# fact_table.FactTable (int32 codes, float32 measures, int32 days) instead of the cube.
+COMPACT = os.environ.get('SALES_DATA_COMPACT', '0') == '1'
+
+# Multi-process mode: when set (e.g. /dev/shm/sales), the merged frame is written once
+# as .npy files under this directory and every worker process memory-maps it read-only.
+SHARED_DIR = os.environ.get('SALES_DATA_SHARED_DIR')
+
+
+def _strip_categories(s: pd.Series) -> pd.Series:
+    """Strips whitespace on the (few) categories instead of on every row."""
+    stripped = s.cat.categories.str.strip()
+    if stripped.is_unique:
+        return s.cat.rename_categories(stripped)
+    # " Chairs" and "Chairs" collapse into one category
+    return s.astype(str).str.strip().astype('category')
+
+
+def _raw_dtypes(path: str, dtypes: dict) -> dict:
+    # dtypes are keyed by the normalised names; map them back onto the raw headers
+    raw_names = pd.read_csv(path, nrows=0).columns
+    return {raw: dtypes[COLUMN_ALIASES.get(raw, raw)] for raw in raw_names
+            if COLUMN_ALIASES.get(raw, raw) in dtypes}
+
+
+def _clean_table(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.rename(columns=COLUMN_ALIASES)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = _strip_categories(df[col])
+        elif col in CATEGORICAL_COLUMNS:
+            df[col] = df[col].astype(str).str.strip().astype('category')
+    return df
+
+
+def _read_table(path: str, dtypes: dict) -> pd.DataFrame:
+    return _clean_table(pd.read_csv(path, dtype=_raw_dtypes(path, dtypes)))
+
+
+def _parse_order_dates(df_orders: pd.DataFrame) -> pd.DataFrame:
+    if 'Order Date' in df_orders.columns:
+        df_orders['Order Date'] = pd.to_datetime(df_orders['Order Date'], format=DATE_FORMAT)
+    return df_orders
+
+
+def read_orders(orders_path: str = ORDERS_PATH) -> pd.DataFrame:
+    """The cleaned Orders table (one row per order), with Order Date parsed."""
+    return _parse_order_dates(_read_table(orders_path, ORDERS_DTYPES))
+
+
+def read_appended_rows(path: str, dtypes: dict, offset: int):
+    """
+    Parses the complete lines written to path after byte offset (a previous end of file).
+    Returns (rows or None, new_offset); a trailing partial line is left for the next call.
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    if end == 0:
+        return None, offset
+    names = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+    df = pd.read_csv(io.BytesIO(data[:end]), header=None, names=names, dtype=_raw_dtypes(path, dtypes))
+    return _clean_table(df), offset + end
+
+
+def read_appended_orders(orders_path: str, offset: int):
+    rows, offset = read_appended_rows(orders_path, ORDERS_DTYPES, offset)
+    return (None if rows is None else _parse_order_dates(rows)), offset
+
+
+def join_orders(details: pd.DataFrame, orders: pd.DataFrame):
+    """
+    Inner-joins Details rows against the Orders table indexed by Order ID.
+    Returns (merged, unmatched details rows); merged has the columns of load_sales_data().
+    """
+    if not orders.index.is_unique:
+        # Repeated Order IDs in Orders.csv: fall back to merge to keep its row multiplication
+        merged = pd.merge(details, orders.reset_index(), on='Order ID', how='inner')
+        return merged, details[~details['Order ID'].isin(orders.index)]
+    pos = orders.index.get_indexer(details['Order ID'])
+    hit = pos >= 0
+    merged = pd.concat([details[hit].reset_index(drop=True),
+                        orders.iloc[pos[hit]].reset_index(drop=True)], axis=1)
+    return merged, details[~hit]
+
+
+def load_sales_tables(details_path: str = DETAILS_PATH, orders_path: str = ORDERS_PATH):
+    """
+    Reads both CSV files, inner-joins them on Order ID and cleans the dimensions.
+    Returns (merged, unmatched): unmatched holds the Details lines the join dropped
+    because their order is not in Orders.csv (yet), as cleaned Details rows.
+    """
+    df_details = _read_table(details_path, DETAILS_DTYPES)
+    df_orders = read_orders(orders_path)
+    merged = pd.merge(df_details, df_orders, on="Order ID", how="inner")
+    unmatched = df_details[~df_details['Order ID'].isin(df_orders['Order ID'])].reset_index(drop=True)
+    return merged, unmatched
+
+
+def load_sales_data(details_path: str = DETAILS_PATH, orders_path: str = ORDERS_PATH) -> pd.DataFrame:
+    """
+    The merged frame of load_sales_tables().
+    Returns a new DataFrame on every call; dashboards should use get_sales_data().
+    """
+    return load_sales_tables(details_path, orders_path)[0]
+
+
+def iter_sales_chunks(details_path: str = DETAILS_PATH, orders_path: str = ORDERS_PATH,
+                      chunk_rows: int = CHUNK_ROWS, unmatched: Optional[list] = None):
+    """
+    Yields the rows of load_sales_data() in Details order, chunk_rows order lines at a time.
+    Only Orders (one row per order) is held in full, as an index keyed by Order ID;
+    each Details chunk is joined by looking its keys up in that index, so peak memory
+    is bounded by the chunk size rather than by the size of Details.csv.
+    unmatched: if given, each chunk's Details lines without an order are appended to it.
+    """
+    orders = read_orders(orders_path).set_index('Order ID')
+    for chunk in iter_details_chunks(details_path, chunk_rows):
+        merged, dropped = join_orders(chunk, orders)
+        if unmatched is not None and len(dropped):
+            unmatched.append(dropped)
+        yield merged
+
+
+def iter_details_chunks(details_path: str = DETAILS_PATH, chunk_rows: int = CHUNK_ROWS):
+    """Yields the cleaned Details table, chunk_rows lines at a time."""
+    reader = pd.read_csv(details_path, dtype=_raw_dtypes(details_path, DETAILS_DTYPES), chunksize=chunk_rows)
+    for chunk in reader:
+        yield _clean_table(chunk)
+
+
+# ==========================================
+# BINARY CACHE
+# Feather (columnar, keeps categoricals) when pyarrow is installed, pickle otherwise.
+# The (usually few) unmatched Details lines are always pickled: Feather drops the
+# categories of an empty categorical column.
+# A JSON manifest records the size and mtime of both CSVs the cache was built from.
+# ==========================================
+
+def _source_signature(paths) -> list:
+    signature = []
+    for path in paths:
+        st = os.stat(path)
+        signature.append({'path': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns})
+    return signature
+
+
+def _cache_paths(cache_dir: str):
+    ext = 'feather' if pyarrow is not None else 'pkl'
+    return (os.path.join(cache_dir, f'sales.{ext}'), os.path.join(cache_dir, 'sales_unmatched.pkl'),
+            os.path.join(cache_dir, 'sales.json'))
+
+
+def _write_frame(path: str, df: pd.DataFrame):
+    if pyarrow is not None:
+        _write_atomic(path, df.to_feather)
+    else:
+        _write_atomic(path, df.to_pickle)
+
+
+def _read_frame(path: str) -> pd.DataFrame:
+    if pyarrow is not None:
+        return pd.read_feather(path)
+    return pd.read_pickle(path)
+
+
+def _write_atomic(path: str, write):
+    # write to a temp file and rename, so a concurrent reader never sees half a file
+    tmp = f'{path}.{os.getpid()}.tmp'
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _write_json(path: str, obj):
+    with open(path, 'w') as f:
+        json.dump(obj, f)
+
+
+def load_sales_tables_cached(details_path: str = DETAILS_PATH, orders_path: str = ORDERS_PATH,
+                             cache_dir: str = CACHE_DIR):
+    """
+    Same result as load_sales_tables(), but reads the binary cache (merged frame and the
+    unmatched Details lines) when the CSVs have not changed since it was written,
+    and (re)builds it otherwise.
+    """
+    data_path, unmatched_path, manifest_path = _cache_paths(cache_dir)
+    manifest = {'version': CACHE_VERSION, 'sources': _source_signature([details_path, orders_path])}
+
+    try:
+        with open(manifest_path) as f:
+            if json.load(f) == manifest:
+                return _read_frame(data_path), pd.read_pickle(unmatched_path)
+    except (OSError, ValueError):
+        pass  # missing / stale / unreadable cache: rebuild below
+
+    df, unmatched = load_sales_tables(details_path, orders_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_frame(data_path, df)
+        _write_atomic(unmatched_path, unmatched.to_pickle)
+        _write_atomic(manifest_path, lambda tmp: _write_json(tmp, manifest))
+    except OSError as e:
+        print(f"Sales data cache not written: {e}")
+    return df, unmatched
+
+
+def load_sales_data_cached(details_path: str = DETAILS_PATH, orders_path: str = ORDERS_PATH,
+                           cache_dir: str = CACHE_DIR) -> pd.DataFrame:
+    """The merged frame of load_sales_tables_cached()."""
+    return load_sales_tables_cached(details_path, orders_path, cache_dir)[0]
+
+
+# ==========================================
+# MEMORY-MAPPED SHARED DATASET
+# One directory per source version: one .npy file per column + meta.json.
+#   - numeric / datetime columns: the values array
+#   - categorical and string columns: dictionary codes (.npy) + categories (meta.json)
+# Worker processes map the same pages through the OS page cache (zero-copy),
+# so adding workers does not add copies of the fact table. String columns such
+# as Order ID come back as categoricals in this mode.
+# The (usually few) unmatched Details lines are stored next to them as a pickle.
+# Objects derived from the frame (e.g. the compact FactTable) can be stored in a
+# subdirectory the same way: pickled, with their large arrays as mapped .npy files.
+# ==========================================
+
+def _column_file(path: str, i: int) -> str:
+    return os.path.join(path, f'col{i}.npy')
+
+
+def materialize_shared(df: pd.DataFrame, path: str):
+    """Writes df as memory-mappable column files into the (new) directory path."""
+    os.makedirs(path)
+    columns = []
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            np.save(_column_file(path, i), s.array.codes)
+            columns.append({'name': col, 'kind': 'category', 'categories': s.cat.categories.tolist()})
+        elif pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_datetime64_dtype(s.dtype):
+            np.save(_column_file(path, i), s.to_numpy())
+            columns.append({'name': col, 'kind': 'values'})
+        else:
+            cat = pd.Categorical(s)
+            np.save(_column_file(path, i), cat.codes)
+            columns.append({'name': col, 'kind': 'category', 'categories': cat.categories.tolist()})
+    _write_json(os.path.join(path, 'meta.json'), {'columns': columns})
+
+
+def open_shared(path: str) -> pd.DataFrame:
+    """Maps a materialize_shared() directory read-only; no column data is copied."""
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    data = {}
+    for i, spec in enumerate(meta['columns']):
+        arr = np.load(_column_file(path, i), mmap_mode='r')
+        if spec['kind'] == 'category':
+            arr = pd.Categorical.from_codes(arr, categories=spec['categories'])
+        data[spec['name']] = pd.Series(arr, copy=False)
+    return pd.DataFrame(data, copy=False)
+
+
+# Arrays smaller than this stay inside the pickle
+_MIN_MAPPED_BYTES = 64 * 1024
+
+
+class _ArrayPickler(pickle.Pickler):
+    """Writes every large numeric array as its own .npy file; the pickle only refers to it."""
+
+    def __init__(self, file, path: str):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.path = path
+        self.saved = {}  # id(array) -> file number; an array referenced twice is stored once
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, np.ndarray) or obj.dtype.hasobject or obj.nbytes < _MIN_MAPPED_BYTES:
+            return None
+        if id(obj) not in self.saved:
+            self.saved[id(obj)] = len(self.saved)
+            np.save(os.path.join(self.path, f'arr{self.saved[id(obj)]}.npy'), obj)
+        return self.saved[id(obj)]
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+    def __init__(self, file, path: str):
+        super().__init__(file)
+        self.path = path
+        self.loaded = {}
+
+    def persistent_load(self, pid):
+        if pid not in self.loaded:
+            self.loaded[pid] = np.load(os.path.join(self.path, f'arr{pid}.npy'), mmap_mode='r')
+        return self.loaded[pid]
+
+
+def save_mapped(obj, path: str):
+    """Writes obj into the (new) directory path: object.pkl plus one .npy file per large array."""
+    os.makedirs(path)
+    with open(os.path.join(path, 'object.pkl'), 'wb') as f:
+        _ArrayPickler(f, path).dump(obj)
+
+
+def load_mapped(path: str):
+    """Loads a save_mapped() directory; its large arrays come back memory-mapped read-only."""
+    with open(os.path.join(path, 'object.pkl'), 'rb') as f:
+        return _ArrayUnpickler(f, path).load()
+
+
+def _shared_version_dir(details_path: str, orders_path: str, shared_dir: str) -> str:
+    manifest = {'version': CACHE_VERSION, 'sources': _source_signature([details_path, orders_path])}
+    key = hashlib.sha1(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(shared_dir, key)
+
+
+def get_shared_sales_tables(details_path: str = DETAILS_PATH, orders_path: str = ORDERS_PATH,
+                            shared_dir: str = SHARED_DIR):
+    """
+    (merged, unmatched) as in load_sales_tables(). The first process to start builds the
+    shared files for the current CSV version; every other process (and every later restart)
+    only maps them.
+    """
+    target = _shared_version_dir(details_path, orders_path, shared_dir)
+    key = os.path.basename(target)
+
+    if not os.path.exists(os.path.join(target, 'meta.json')):
+        tmp = os.path.join(shared_dir, f'.{key}.{os.getpid()}.tmp')
+        shutil.rmtree(tmp, ignore_errors=True)
+        df, unmatched = load_sales_tables_cached(details_path, orders_path)
+        materialize_shared(df, tmp)
+        unmatched.to_pickle(os.path.join(tmp, 'unmatched.pkl'))
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)  # another worker got there first
+
+        # Older versions: unlinking is safe on POSIX even while other processes still map them
+        for name in os.listdir(shared_dir):
+            if name != key and not name.startswith('.'):
+                shutil.rmtree(os.path.join(shared_dir, name), ignore_errors=True)
+
+    return open_shared(target), pd.read_pickle(os.path.join(target, 'unmatched.pkl'))
+
+
+def get_shared_sales_data(details_path: str = DETAILS_PATH, orders_path: str = ORDERS_PATH,
+                          shared_dir: str = SHARED_DIR) -> pd.DataFrame:
+    return get_shared_sales_tables(details_path, orders_path, shared_dir)[0]
+
+
+def get_shared_derived(name: str, build, details_path: str = DETAILS_PATH, orders_path: str = ORDERS_PATH,
+                       shared_dir: str = SHARED_DIR):
+    """
+    build(merged frame), e.g. a fact_table.FactTable, stored once per CSV version in the
+    subdirectory name of the shared files (see save_mapped): the first process builds it,
+    every process maps its arrays, so their pages are shared too. Returns (obj, unmatched).
+    """
+    version_dir = _shared_version_dir(details_path, orders_path, shared_dir)
+    target = os.path.join(version_dir, name)
+    if not os.path.exists(os.path.join(target, 'object.pkl')):
+        # Only the building process opens the frame (its string categories are not mapped)
+        df, _ = get_shared_sales_tables(details_path, orders_path, shared_dir)
+        tmp = os.path.join(version_dir, f'.{name}.{os.getpid()}.tmp')
+        shutil.rmtree(tmp, ignore_errors=True)
+        save_mapped(build(df), tmp)
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)  # another worker got there first
+    return load_mapped(target), pd.read_pickle(os.path.join(version_dir, 'unmatched.pkl'))
+
+
+def read_sales_tables(details_path: str = DETAILS_PATH, orders_path: str = ORDERS_PATH):
+    """
+    (merged, unmatched) from whichever source this process is configured for (shared
+    directory, binary cache, or the CSVs), in one pass and without the lru_cache.
+    """
+    if SHARED_DIR:
+        return get_shared_sales_tables(details_path, orders_path)
+    if CACHE_ENABLED:
+        return load_sales_tables_cached(details_path, orders_path)
+    return load_sales_tables(details_path, orders_path)
+
+
+def _read_only_measures(df: pd.DataFrame) -> pd.DataFrame:
+    """df with its numeric columns on read-only arrays (other columns are shared, not copied)."""
+    columns = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_numeric_dtype(s.dtype) and not isinstance(s.dtype, pd.CategoricalDtype):
+            values = s.to_numpy(copy=True)
+            values.flags.writeable = False
+            s = pd.Series(values, index=df.index, name=col, copy=False)
+        columns[col] = s
+    return pd.DataFrame(columns, copy=False)
+
+
+@functools.lru_cache(maxsize=None)
+def get_sales_data(details_path: str = DETAILS_PATH, orders_path: str = ORDERS_PATH) -> pd.DataFrame:
+    """
+    Process-wide shared frame: loaded on first call, then the same object for everyone.
+    Treat it as read-only — filter/groupby derive new frames, never assign into it.
+    The measure columns sit on read-only arrays, so writing into them (df.loc[...] = ...)
+    raises ValueError instead of changing the numbers every session sees; with
+    SALES_DATA_SHARED_DIR all columns are read-only memory maps anyway.
+    """
+    df = read_sales_tables(details_path, orders_path)[0]
+    return df if SHARED_DIR else _read_only_measures(df)
@@ -0,0 +1,194 @@
+import json
+import math
+import os
+import time
+from datetime import date
+from typing import Dict, Iterable, Iterator
+from urllib.parse import urlencode
+
+from nicegui import app, background_tasks
+from nicegui import json as nicegui_json
+
+from time_index import TIME_COLUMN
+
+# ==========================================
+# SESSION MANAGER
+# Responsibilities: tracking the live Dashboard instances (one per browser tab),
+# evicting idle ones after a TTL or beyond a session cap, and keeping only their
+# compact filter state (in the tab's URL) so a returning tab is rebuilt cheaply.
+# ==========================================
+
+# Seconds without a user interaction before a dashboard is evicted; 0 disables the TTL
+SESSION_TTL = float(os.environ.get('DASHBOARD_SESSION_TTL', '1800'))
+# Most dashboards kept resident; the least recently used one is evicted first (0 = no cap)
+MAX_SESSIONS = int(os.environ.get('DASHBOARD_MAX_SESSIONS', '0'))
+# Seconds between idle sweeps
+SWEEP_INTERVAL = float(os.environ.get('DASHBOARD_SESSION_SWEEP', '60'))
+
+# Runs in an evicted tab: remember the filters in the URL, and reload (-> a new dashboard
+# restored from that URL) on the next interaction or when the tab becomes visible again
+_EVICT_JS = '''
+history.replaceState(null, '', location.pathname + %s);
+const reload = () => location.reload();
+document.addEventListener('pointerdown', reload, {once: true, capture: true});
+document.addEventListener('keydown', reload, {once: true, capture: true});
+document.addEventListener('visibilitychange', () => { if (!document.hidden) reload(); });
+'''
+
+
+def encode_filters(filters: Dict[str, object]) -> str:
+    """
+    Active filters as a URL query string ('' when nothing is filtered); ranges as lo..hi,
+    multi-select sets as the column repeated once per value (State=Delhi&State=Goa).
+    """
+    params = []
+    for col, value in filters.items():
+        if isinstance(value, tuple):
+            params.append((col, '..'.join('' if v is None else str(v) for v in value)))
+        elif isinstance(value, frozenset):
+            params.extend((col, v) for v in sorted(value, key=str))
+        else:
+            params.append((col, value))
+    return urlencode(params)
+
+
+def _range_bound(text: str, is_date: bool):
+    # Empty = open end; ISO dates for the date column, finite numbers for measure ranges.
+    # Raises ValueError for anything else (a hand-edited or truncated URL)
+    if not text:
+        return None
+    if is_date:
+        return date.fromisoformat(text).isoformat()
+    value = float(text)
+    if not math.isfinite(value):
+        raise ValueError(text)
+    return value
+
+
+def decode_filters(query_params, columns: Iterable[str], range_columns: Iterable[str] = ()) -> Dict[str, object]:
+    """
+    Filters from a request's query parameters; unknown keys are ignored, a repeated column
+    becomes a frozenset (multi-select) and range columns become (lo, hi). A range that does
+    not parse is dropped rather than failing the page.
+    """
+    filters = {}
+    for col in columns:
+        values = [v for v in query_params.getlist(col) if v]
+        if values:
+            filters[col] = values[0] if len(set(values)) == 1 else frozenset(values)
+    for col in range_columns:
+        value = query_params.get(col, '')
+        if '..' in value:
+            try:
+                filters[col] = tuple(_range_bound(v, col == TIME_COLUMN) for v in value.split('..', 1))
+            except ValueError:
+                pass
+    return filters
+
+
+class _Session:
+    __slots__ = ('dashboard', 'client', 'created', 'last_active')
+
+    def __init__(self, dashboard, client):
+        self.dashboard = dashboard
+        self.client = client
+        self.created = self.last_active = time.monotonic()
+
+
+class SessionManager:
+    """
+    Registry of the resident dashboards, keyed by NiceGUI client id.
+    A dashboard must provide active_filters() -> {column: value}; that dict is all that
+    survives an eviction. Closed tabs are dropped when NiceGUI deletes their client;
+    tabs that stay open but idle are evicted here (client deleted, elements freed).
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: Dict[str, _Session] = {}
+        self.evicted = 0
+        self.restored = 0
+
+    def start(self, interval: float = SWEEP_INTERVAL):
+        """Schedules the idle sweep (call once at import time, like other app.timer jobs)."""
+        if self.ttl > 0:
+            app.timer(interval, self.evict_idle)
+
+    # ── Registry ─────────────────────────────────────────────────────────────
+    def register(self, dashboard, client, restored: bool = False):
+        self._sessions[client.id] = _Session(dashboard, client)
+        client.on_delete(lambda: self._sessions.pop(client.id, None))
+        if restored:
+            self.restored += 1
+        if self.max_sessions > 0 and len(self._sessions) > self.max_sessions:
+            oldest = min(self._sessions.values(), key=lambda s: s.last_active)
+            background_tasks.create(self.evict(oldest), name='evict session')
+
+    def touch(self, dashboard):
+        """Marks a user interaction."""
+        session = self._sessions.get(dashboard.client.id) if dashboard.client else None
+        if session is not None:
+            session.last_active = time.monotonic()
+
+    def __iter__(self) -> Iterator:
+        return iter([s.dashboard for s in self._sessions.values()])
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    # ── Eviction ─────────────────────────────────────────────────────────────
+    async def evict_idle(self):
+        deadline = time.monotonic() - self.ttl
+        for session in [s for s in self._sessions.values() if s.last_active < deadline]:
+            await self.evict(session)
+
+    async def evict(self, session: _Session):
+        if self._sessions.pop(session.client.id, None) is None:
+            return
+        self.evicted += 1
+        client = session.client
+        if client.has_socket_connection:
+            query = encode_filters(session.dashboard.active_filters())
+            code = _EVICT_JS % json.dumps(f'?{query}' if query else '')
+            try:
+                await client.run_javascript(code, timeout=5)
+            except TimeoutError:
+                pass  # the tab still reloads on its next reconnect, only without the filters
+        if not client.is_deleted:
+            client.delete()
+
+    # ── Stats ────────────────────────────────────────────────────────────────
+    @staticmethod
+    def session_bytes(client) -> int:
+        """Approximate resident size of one session: its elements serialized as for a full render."""
+        return sum(len(nicegui_json.dumps(element._to_dict()))  # pylint: disable=protected-access
+                   for element in list(client.elements.values()))
+
+    def stats(self, detail: bool = False) -> dict:
+        now = time.monotonic()
+        sessions = list(self._sessions.values())
+        out = {
+            'sessions': len(sessions),
+            'connected': sum(s.client.has_socket_connection for s in sessions),
+            'evicted_total': self.evicted,
+            'restored_total': self.restored,
+            'ttl_seconds': self.ttl,
+            'max_sessions': self.max_sessions,
+        }
+        if detail:
+            out['per_session'] = [{
+                'age_seconds': round(now - s.created, 1),
+                'idle_seconds': round(now - s.last_active, 1),
+                'elements': len(s.client.elements),
+                'approx_bytes': self.session_bytes(s.client),
+                'filters': len(s.dashboard.active_filters()),
+            } for s in sessions]
+            out['approx_bytes_total'] = sum(s['approx_bytes'] for s in out['per_session'])
+        return out
+
+    def add_stats_route(self, path: str = '/sessions'):
+        """GET path -> counts; GET path?detail=1 -> plus per-session size (no client ids are exposed)."""
+        @app.get(path)
+        async def session_stats(detail: int = 0):  # on the event loop, like every change to the sessions
+            return self.stats(detail=bool(detail))
@@ -0,0 +1,58 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+# ==========================================
+# SORTED VALUE INDEX
+# Responsibilities: resolving a [lo, hi] range on one numeric column to row
+# positions with two binary searches, instead of comparing every row.
+# ==========================================
+
+
+class SortedIndex:
+    """
+    Built once per values array (one entry per row or cube cell):
+      - order:         row positions sorted by value (int32 when it fits)
+      - sorted_values: values[order], for np.searchsorted
+    NaN sorts last and never falls inside a range.
+    """
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+        order = np.argsort(values, kind='stable')
+        self.order = order.astype(np.int32) if len(values) < 2 ** 31 else order
+        self.sorted_values = values[self.order]
+
+    def _bounds(self, lo, hi) -> Tuple[float, float]:
+        return (-np.inf if lo is None else float(lo)), (np.inf if hi is None else float(hi))
+
+    def _slice(self, lo, hi) -> Tuple[int, int]:
+        lo, hi = self._bounds(lo, hi)
+        return (int(np.searchsorted(self.sorted_values, lo, side='left')),
+                int(np.searchsorted(self.sorted_values, hi, side='right')))
+
+    def positions(self, lo=None, hi=None) -> np.ndarray:
+        """Row positions with lo <= value <= hi (None = open), ordered by value."""
+        i, j = self._slice(lo, hi)
+        return self.order[i:j]
+
+    def count(self, lo=None, hi=None) -> int:
+        i, j = self._slice(lo, hi)
+        return j - i
+
+    def contains(self, rows: np.ndarray, lo=None, hi=None) -> np.ndarray:
+        """Boolean mask over rows: lo <= value <= hi."""
+        lo, hi = self._bounds(lo, hi)
+        values = self.values[rows]
+        return (values >= lo) & (values <= hi)
+
+    def within(self, rows: np.ndarray, lo=None, hi=None) -> np.ndarray:
+        """The subset of rows with lo <= value <= hi."""
+        return rows[self.contains(rows, lo, hi)]
+
+    def extent(self) -> Optional[Tuple[float, float]]:
+        """Smallest and largest value, or None when there are none."""
+        values = self.sorted_values[~np.isnan(self.sorted_values)] if self.sorted_values.dtype.kind == 'f' else self.sorted_values
+        if not len(values):
+            return None
+        return values[0].item(), values[-1].item()
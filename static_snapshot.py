@@ -0,0 +1,167 @@
+import gzip
+import hashlib
+import html
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import nicegui
+import plotly
+from fastapi import Request, Response
+from nicegui import app
+
+# ==========================================
+# PRE-RENDERED STATIC DASHBOARD SNAPSHOTS
+# Responsibilities: rendering a read-only dashboard once, at data-load time, to a
+# plain HTML page plus a JSON bundle, and serving both from memory with ETag /
+# Cache-Control and a pre-compressed body — no NiceGUI client, elements or websocket.
+# ==========================================
+
+# DASHBOARD_SNAPSHOT=1: the static dashboards serve their pre-rendered snapshot at '/'
+SNAPSHOT_MODE = os.environ.get('DASHBOARD_SNAPSHOT', '0') == '1'
+# Seconds browsers and proxies may reuse the page before revalidating it with its ETag
+SNAPSHOT_MAX_AGE = int(os.environ.get('DASHBOARD_SNAPSHOT_MAX_AGE', '60'))
+# Chart libraries live under versioned URLs, so they never need revalidating
+LIBRARY_MAX_AGE = 365 * 24 * 3600
+
+_PLOTLY_JS = Path(plotly.__file__).parent / 'package_data' / 'plotly.min.js'
+_ECHARTS_ESM = Path(nicegui.__file__).parent / 'elements' / 'echart' / 'dist'  # the bundle ui.echart uses
+
+# Same look as the NiceGUI pages (Tailwind / Quasar classes written out)
+PAGE_STYLE = '''
+body { margin: 0; padding: 16px 0; font-family: Roboto, -apple-system, "Helvetica Neue", Helvetica, Arial, sans-serif; background: #fff; }
+h1 { font-size: 1.5rem; font-weight: bold; text-align: center; margin: 0 0 24px; color: #1f2937; }
+.row { display: flex; justify-content: space-between; gap: 16px; padding: 0 40px; }
+.row.kpis { margin-bottom: 32px; }
+.kpi-card { flex: 1; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; border-radius: 8px; padding: 16px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }
+.kpi-title { font-size: 0.9rem; opacity: 0.9; }
+.kpi-value { font-size: 1.8rem; font-weight: bold; margin-top: 4px; }
+.chart-card { flex: 1; min-width: 0; border-radius: 8px; padding: 4px; background: white; box-shadow: 0 2px 4px rgba(0,0,0,0.05); border: 1px solid #eee; }
+.chart { width: 100%; height: 20rem; }
+'''
+
+
+class CachedBody:
+    """One response body rendered up front: ETag from its content, gzip variant compressed once."""
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str):
+        self.body = body
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha1(body).hexdigest()[:16]  # content hash, also usable in versioned URLs
+        # Weak validator: the gzip and identity encodings share it
+        self.etag = f'W/"{self.digest}"'
+        self.gzipped = gzip.compress(body, compresslevel=9)
+
+    async def response(self, request: Request) -> Response:
+        headers = {'ETag': self.etag, 'Cache-Control': self.cache_control}
+        if self.etag in request.headers.get('if-none-match', ''):
+            return Response(status_code=304, headers=headers)
+        if 'gzip' in request.headers.get('accept-encoding', ''):
+            # Already compressed, so NiceGUI's GZipMiddleware passes it through (it adds Vary otherwise)
+            headers.update({'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+            return Response(self.gzipped, media_type=self.media_type, headers=headers)
+        return Response(self.body, media_type=self.media_type, headers=headers)
+
+
+class Snapshot:
+    """
+    A read-only dashboard rendered once: the HTML page and a JSON bundle with the same
+    content (title, KPIs, chart specs by element id), both served as CachedBody.
+    """
+
+    def __init__(self, title: str, heading: str, kpis: Iterable[Tuple[str, str]], charts: Dict[str, object],
+                 library: str, max_age: int = SNAPSHOT_MAX_AGE):
+        self.bundle = {'title': title, 'heading': heading, 'kpis': list(kpis), 'charts': charts, 'library': library}
+        cache_control = f'public, max-age={max_age}'
+        self.page = CachedBody(render_page(self.bundle).encode(), 'text/html; charset=utf-8', cache_control)
+        self.json = CachedBody(json.dumps(self.bundle).encode(), 'application/json', cache_control)
+
+    def serve(self, path: str = '/', json_path: str = '/snapshot.json'):
+        """Registers plain FastAPI routes for the page and the bundle (no ui.page, no client per request)."""
+        app.get(path, include_in_schema=False)(self.page.response)
+        app.get(json_path, include_in_schema=False)(self.json.response)
+
+
+# ── Chart libraries, served by the app itself ─────────────────────────────────
+_library_urls: Dict[str, str] = {}
+
+
+def _file_version(path: Path) -> str:
+    return hashlib.sha1(path.read_bytes()).hexdigest()[:12]
+
+
+def library_url(name: str) -> Optional[str]:
+    """
+    URL prefix of a chart library served from this process under a versioned path with
+    long-lived caching (registered on first use): 'plotly' -> plotly.min.js from the plotly
+    package, 'echarts' -> the ESM bundle NiceGUI ships for ui.echart (vega: see vega_assets).
+    """
+    if name not in _library_urls:
+        if name == 'plotly':
+            url = f'/snapshot/lib/plotly/{_file_version(_PLOTLY_JS)}'
+            app.add_static_file(local_file=_PLOTLY_JS, url_path=f'{url}/plotly.min.js', max_cache_age=LIBRARY_MAX_AGE)
+        elif name == 'echarts':
+            url = f'/snapshot/lib/echarts/{nicegui.__version__}'
+            app.add_static_files(url, _ECHARTS_ESM, max_cache_age=LIBRARY_MAX_AGE)
+        else:
+            return None
+        _library_urls[name] = url
+    return _library_urls[name]
+
+
+# ── Page template ─────────────────────────────────────────────────────────────
+def _script_json(value) -> str:
+    # JSON inside <script>: '</' must not close the tag
+    return json.dumps(value).replace('</', '<\\/')
+
+
+def _chart_script(library: str, charts: Dict[str, object]) -> str:
+    data = f'const CHARTS = {_script_json(charts)};'
+    if library == 'plotly':
+        return f'''<script src="{library_url('plotly')}/plotly.min.js"></script>
+<script>{data}
+for (const [id, fig] of Object.entries(CHARTS)) {{
+  Plotly.newPlot(id, fig.data, fig.layout, {{responsive: true, displaylogo: false}});
+}}</script>'''
+    if library == 'echarts':
+        return f'''<script type="module">import {{ echarts }} from "{library_url('echarts')}/index.js";
+{data}
+const charts = Object.entries(CHARTS).map(([id, option]) => {{
+  const chart = echarts.init(document.getElementById(id));
+  chart.setOption(option);
+  return chart;
+}});
+window.addEventListener('resize', () => charts.forEach((chart) => chart.resize()));</script>'''
+    if library == 'vega':
+        from vega_assets import vega_script_tags  # vega_assets builds on CachedBody
+        return f'''{vega_script_tags()}<script>{data}
+for (const [id, spec] of Object.entries(CHARTS)) {{
+  vegaEmbed(document.getElementById(id), spec, {{actions: false}});
+}}</script>'''
+    raise ValueError(f'unknown chart library: {library}')
+
+
+def render_page(bundle: dict) -> str:
+    """The dashboard as one self-contained HTML document (KPI cards, one card per chart)."""
+    kpis = ''.join(f'<div class="kpi-card"><div class="kpi-title">{html.escape(title)}</div>'
+                   f'<div class="kpi-value">{html.escape(value)}</div></div>' for title, value in bundle['kpis'])
+    charts = ''.join(f'<div class="chart-card"><div id="{html.escape(chart_id)}" class="chart"></div></div>'
+                     for chart_id in bundle['charts'])
+    return f'''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{html.escape(bundle['title'])}</title>
+<style>{PAGE_STYLE}</style>
+</head>
+<body>
+<h1>{html.escape(bundle['heading'])}</h1>
+<div class="row kpis">{kpis}</div>
+<div class="row charts">{charts}</div>
+{_chart_script(bundle['library'], bundle['charts'])}
+</body>
+</html>
+'''
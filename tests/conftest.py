@@ -0,0 +1,56 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules live flat in the repository root (no package)
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_DIR)
+
+STATES = ['Delhi', 'Goa', 'Kerala', 'Punjab', 'Bihar']
+SUB_CATEGORIES = ['Chairs', 'Saree', 'Phones', 'Tables', 'Shirt', 'Printers']
+CUSTOMERS = [f'Customer {i}' for i in range(12)]
+
+
+def make_sales_frame(seed: int, n_orders: int = 150) -> pd.DataFrame:
+    """
+    A merged frame shaped like sales_data.load_sales_data(): several lines per order,
+    categorical dimensions with a few missing values, some missing dates, and measures
+    that are whole numbers (exact in float32, so every engine sums them exactly).
+    """
+    rng = np.random.default_rng(seed)
+    orders = pd.DataFrame({
+        'Order ID': [f'B-{i:05d}' for i in range(n_orders)],
+        'Order Date': pd.to_datetime('2018-01-01') + pd.to_timedelta(rng.integers(0, 200, n_orders), unit='D'),
+        'CustomerName': rng.choice(CUSTOMERS, n_orders),
+        'State': rng.choice(STATES, n_orders),
+    })
+    orders.loc[rng.random(n_orders) < 0.05, 'Order Date'] = pd.NaT
+    orders.loc[rng.random(n_orders) < 0.05, 'State'] = None
+    lines = orders.loc[rng.integers(0, n_orders, 3 * n_orders)].reset_index(drop=True)
+    n = len(lines)
+    lines['Sub-Category'] = rng.choice(SUB_CATEGORIES + [None], n, p=[0.16] * 6 + [0.04])
+    lines['Amount'] = rng.integers(1, 3000, n).astype(float)
+    lines['Profit'] = rng.integers(-500, 1000, n).astype(float)
+    lines['Quantity'] = rng.integers(1, 10, n)
+    for col in ('CustomerName', 'State', 'Sub-Category'):
+        lines[col] = lines[col].astype('category')
+    return lines
+
+
+@pytest.fixture(params=[0, 1, 2])
+def sales_df(request) -> pd.DataFrame:
+    return make_sales_frame(request.param)
+
+
+@pytest.fixture
+def sales_csvs(tmp_path) -> list:
+    """[Details.csv, Orders.csv]: copies of the repository's CSV files that a test may modify."""
+    paths = []
+    for name in ('Details.csv', 'Orders.csv'):
+        shutil.copy(os.path.join(REPO_DIR, name), tmp_path / name)
+        paths.append(str(tmp_path / name))
+    return paths
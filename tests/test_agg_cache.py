@@ -0,0 +1,53 @@
+"""AggregateCache: hits, LRU eviction order, and keys that change with the data version."""
+from agg_cache import AggregateCache, make_key
+
+
+def compute_once(calls: list, value):
+    def compute():
+        calls.append(value)
+        return value
+    return compute
+
+
+def test_hit_returns_the_cached_value_without_computing():
+    cache, calls = AggregateCache(maxsize=4), []
+    assert cache.get_or_compute('a', compute_once(calls, 1)) == 1
+    assert cache.get_or_compute('a', compute_once(calls, 2)) == 1
+    assert calls == [1]
+    assert cache.stats() == {'size': 1, 'maxsize': 4, 'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache, calls = AggregateCache(maxsize=3), []
+    for key in 'abc':
+        cache.get_or_compute(key, compute_once(calls, key))
+    cache.get_or_compute('a', compute_once(calls, 'a'))  # 'a' is now the most recent, 'b' the oldest
+    cache.get_or_compute('d', compute_once(calls, 'd'))
+    assert cache.stats()['size'] == 3
+    for key in 'acd':
+        cache.get_or_compute(key, compute_once(calls, key))
+    assert calls == ['a', 'b', 'c', 'd']
+    cache.get_or_compute('b', compute_once(calls, 'b'))  # recomputed, evicting 'a'
+    cache.get_or_compute('a', compute_once(calls, 'a'))
+    assert calls == ['a', 'b', 'c', 'd', 'b', 'a']
+
+
+def test_new_data_version_misses_and_old_versions_age_out():
+    """The dashboards key every entry as (data version,) + make_key(...)."""
+    cache, calls = AggregateCache(maxsize=2), []
+    filters = {'State': 'Goa', 'Sub-Category': 'All'}
+    for version in (1, 1, 2, 2):
+        cache.get_or_compute((version,) + make_key(filters), compute_once(calls, version))
+    assert calls == [1, 2]
+    cache.get_or_compute((2,) + make_key({'State': 'Delhi'}), compute_once(calls, 'delhi'))
+    cache.get_or_compute((1,) + make_key(filters), compute_once(calls, 1))  # version 1 was evicted
+    assert calls == [1, 2, 'delhi', 1]
+
+
+def test_clear_drops_every_entry():
+    cache, calls = AggregateCache(), []
+    cache.get_or_compute('a', compute_once(calls, 1))
+    cache.clear()
+    cache.get_or_compute('a', compute_once(calls, 1))
+    assert calls == [1, 1]
+    assert cache.stats()['size'] == 1
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chart_data import top_k_frame, top_k_order
+
+
+@pytest.mark.parametrize('k', [1, 2, 3, 4, 5, 7, None])
+def test_top_k_order_matches_stable_sort_with_ties_at_the_cut(k):
+    sums = np.array([5.0, 3.0, 5.0, 3.0, 3.0, 1.0, 3.0])
+    assert top_k_order(sums, k).tolist() == np.argsort(-sums, kind='stable')[:k].tolist()
+
+
+def test_top_k_order_random_ties():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        sums = rng.integers(0, 6, size=rng.integers(1, 40)).astype(float)
+        k = int(rng.integers(1, len(sums) + 1))
+        assert top_k_order(sums, k).tolist() == np.argsort(-sums, kind='stable')[:k].tolist()
+
+
+def test_top_k_order_nan_sorts_last():
+    sums = np.array([np.nan, 2.0, np.nan, 1.0])
+    assert top_k_order(sums, 3).tolist() == [1, 3, 0]
+
+
+@pytest.mark.parametrize('categorical', [True, False])
+def test_top_k_frame_matches_pandas(categorical):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({'State': rng.choice(['b', 'a', 'd', 'c', 'e', None], 300),
+                       'Amount': rng.integers(0, 4, 300).astype(float)})
+    if categorical:
+        df['State'] = df['State'].astype('category')
+    mask = rng.random(300) < 0.5
+    for k in (1, 2, 3, None):
+        expected = (df[mask].groupby('State', observed=True)['Amount'].sum()
+                    .sort_values(ascending=False, kind='stable').head(k))
+        top = top_k_frame(df, 'State', 'Amount', k, mask=mask)
+        assert top.labels == expected.index.tolist()
+        assert top.values == expected.tolist()
@@ -0,0 +1,227 @@
+"""
+The query engines (FilterIndex over the frame, FactTable, SalesCube) against plain pandas
+on the same merged frame: filters (equality, IN, date and measure ranges), totals,
+distinct orders, per-group sums and top-k, the appended() / from_chunks() builds (also from
+sales_data.iter_sales_chunks) and the leave-one-out marginals.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from agg_cache import make_key
+from conftest import CUSTOMERS, STATES, SUB_CATEGORIES
+from fact_table import FactTable
+from filter_index import FILTER_COLUMNS, MEASURE_COLUMNS, RANGE_COLUMNS, FilterIndex, marginal_masks
+from sales_cube import SalesCube
+from sales_data import iter_sales_chunks, load_sales_tables
+
+VALUES = {'Sub-Category': SUB_CATEGORIES, 'State': STATES, 'CustomerName': CUSTOMERS}
+
+
+def random_filters(rng, measure_ranges: bool) -> dict:
+    filters = {}
+    for col, values in VALUES.items():
+        r = rng.random()
+        if r < 0.3:
+            filters[col] = str(rng.choice(values + ['Nowhere']))
+        elif r < 0.5:
+            filters[col] = frozenset(rng.choice(values, 3, replace=False).tolist())
+    if rng.random() < 0.4:
+        filters['Order Date'] = (str(rng.choice(['2018-02-01', '2018-03-15', None], p=[0.4, 0.4, 0.2]) or '') or None,
+                                 str(rng.choice(['2018-05-31', '2018-06-30', None], p=[0.4, 0.4, 0.2]) or '') or None)
+    if measure_ranges and rng.random() < 0.4:
+        filters['Amount'] = (rng.choice([None, 500.0]), rng.choice([None, 2000.0]))
+    if measure_ranges and rng.random() < 0.2:
+        filters['Profit'] = (0.0, None)
+    return filters
+
+
+def pandas_mask(df: pd.DataFrame, filters: dict) -> np.ndarray:
+    mask = np.ones(len(df), dtype=bool)
+    for col, value in filters.items():
+        s = df[col]
+        if isinstance(value, frozenset):
+            mask &= s.isin(value).to_numpy()
+        elif isinstance(value, tuple):
+            lo, hi = value
+            if col == 'Order Date':
+                lo, hi = (None if v is None else pd.Timestamp(v) for v in (lo, hi))
+            match = s.notna()
+            if lo is not None:
+                match &= s >= lo
+            if hi is not None:
+                match &= s <= hi
+            mask &= match.to_numpy()
+        else:
+            mask &= (s == value).to_numpy()
+    return mask
+
+
+def assert_same_aggregates(engine, rows, selected: pd.DataFrame):
+    for col in MEASURE_COLUMNS:
+        assert engine.total(rows, col) == pytest.approx(selected[col].sum())
+    assert engine.nunique(rows) == selected['Order ID'].nunique()
+    for group_col in FILTER_COLUMNS:
+        expected = selected.groupby(group_col, observed=True)['Amount'].sum()
+        got = engine.group_sum(rows, group_col, 'Amount')
+        pd.testing.assert_series_equal(got.sort_index(), expected.sort_index(), check_names=False,
+                                       check_dtype=False, check_index_type=False, check_categorical=False)
+        for k in (3, None):
+            top = engine.top_k(rows, group_col, 'Amount', k)
+            assert top.values == expected.sort_values(ascending=False).head(k).tolist()
+            assert set(top.labels) <= set(expected.index)
+            assert expected[top.labels].tolist() == top.values
+
+
+def check_engine(engine, df: pd.DataFrame, seed: int, measure_ranges: bool, row_level: bool):
+    rng = np.random.default_rng(seed)
+    for _ in range(60):
+        filters = random_filters(rng, measure_ranges)
+        mask = pandas_mask(df, filters)
+        rows = engine.rows(filters)
+        if row_level:
+            expected = np.arange(len(df)) if rows is None else np.flatnonzero(mask)
+            assert np.array_equal(np.sort(np.arange(len(df)) if rows is None else rows), expected)
+        assert_same_aggregates(engine, rows, df[mask])
+
+
+def test_filter_index_matches_pandas(sales_df):
+    index = FilterIndex(sales_df, range_columns=RANGE_COLUMNS)
+    check_engine(index, sales_df, 0, measure_ranges=True, row_level=True)
+
+
+def test_fact_table_matches_pandas(sales_df):
+    check_engine(FactTable(sales_df), sales_df, 1, measure_ranges=True, row_level=True)
+
+
+def test_sales_cube_matches_pandas(sales_df):
+    cube = SalesCube(sales_df)
+    assert cube.count(None) < len(sales_df)  # lines of one order share a cell
+    check_engine(cube, sales_df, 2, measure_ranges=False, row_level=False)
+
+
+def test_sales_cube_keeps_rows_with_missing_keys(sales_df):
+    """Lines with a missing State / Sub-Category / date count in the KPIs, never in a group."""
+    cube = SalesCube(sales_df)
+    assert cube.total(None, 'Amount') == pytest.approx(sales_df['Amount'].sum())
+    assert cube.nunique(None) == sales_df['Order ID'].nunique()
+    missing_state = sales_df[sales_df['State'].isna()]
+    assert len(missing_state)
+    rows = cube.rows({'Sub-Category': frozenset(SUB_CATEGORIES)})
+    selected = sales_df[sales_df['Sub-Category'].notna()]
+    assert cube.total(rows, 'Amount') == pytest.approx(selected['Amount'].sum())
+    assert cube.nunique(rows) == selected['Order ID'].nunique()
+
+
+def test_measure_range_needs_row_level_engine(sales_df):
+    with pytest.raises(ValueError):
+        SalesCube(sales_df).rows({'Amount': (100.0, None)})
+
+
+def test_range_extent(sales_df):
+    table = FactTable(sales_df)
+    assert table.range_extent('Amount') == (sales_df['Amount'].min(), sales_df['Amount'].max())
+    dates = sales_df['Order Date'].dropna()
+    assert table.date_extent() == (str(dates.min().date()), str(dates.max().date()))
+
+
+def chunks_of(df: pd.DataFrame, size: int):
+    """Pieces as sales_data.iter_sales_chunks yields them: each with its own category sets."""
+    for start in range(0, len(df), size):
+        chunk = df.iloc[start:start + size].reset_index(drop=True)
+        for col in FILTER_COLUMNS:
+            chunk[col] = chunk[col].cat.remove_unused_categories()
+        yield chunk
+
+
+@pytest.mark.parametrize('build', ['from_chunks', 'appended'])
+def test_fact_table_incremental_builds(sales_df, build):
+    if build == 'from_chunks':
+        table = FactTable.from_chunks(chunks_of(sales_df, 70))
+    else:
+        head, *rest = chunks_of(sales_df, 170)
+        table = FactTable(head)
+        for chunk in rest:
+            table = table.appended(chunk)
+    assert table.n_rows == len(sales_df)
+    check_engine(table, sales_df, 3, measure_ranges=True, row_level=True)
+
+
+@pytest.mark.parametrize('build', ['from_chunks', 'appended'])
+def test_sales_cube_incremental_builds(sales_df, build):
+    if build == 'from_chunks':
+        cube = SalesCube.from_chunks(chunks_of(sales_df, 70), fold_every=2)
+    else:
+        head, *rest = chunks_of(sales_df, 170)
+        cube = SalesCube(head)
+        for chunk in rest:
+            cube = cube.appended(chunk)
+    assert cube.n_cells == SalesCube(sales_df).n_cells
+    check_engine(cube, sales_df, 4, measure_ranges=False, row_level=False)
+
+
+def test_cache_key_normalisation():
+    assert make_key({'State': 'Goa', 'Sub-Category': 'All'}) == make_key({'State': 'Goa'})
+    assert make_key({'State': 'Goa', 'CustomerName': None}, ignore_col='State') == make_key({})
+    assert make_key({'State': frozenset({'Goa', 'Delhi'})}) == make_key({'State': frozenset({'Delhi', 'Goa'})})
+
+
+# ── Leave-one-out marginals (one row set per chart) ──────────────────────────
+CHART_COLUMNS = FILTER_COLUMNS + ['Order Date']
+
+
+@pytest.mark.parametrize('engine', ['index', 'fact_table', 'cube'])
+def test_marginal_rows_match_rows_ignoring_each_column(sales_df, engine):
+    query = {'index': lambda df: FilterIndex(df, range_columns=RANGE_COLUMNS),
+             'fact_table': FactTable, 'cube': SalesCube}[engine](sales_df)
+    rng = np.random.default_rng(5)
+    for _ in range(80):
+        filters = random_filters(rng, measure_ranges=engine != 'cube')
+        marginals = query.marginal_rows(filters, CHART_COLUMNS)
+        for col in [None] + CHART_COLUMNS:
+            expected = query.rows(filters, ignore_col=col)
+            got = marginals[col]
+            assert (got is None) == (expected is None)
+            if got is not None:
+                assert np.array_equal(np.sort(got), np.sort(expected))
+
+
+def test_marginal_masks_match_pandas(sales_df):
+    rng = np.random.default_rng(6)
+    for _ in range(80):
+        filters = {col: value for col, value in random_filters(rng, measure_ranges=False).items()
+                   if col in FILTER_COLUMNS}
+        masks = marginal_masks(sales_df, filters, FILTER_COLUMNS)
+        assert np.array_equal(masks[None], pandas_mask(sales_df, filters))
+        for col in FILTER_COLUMNS:
+            others = {c: v for c, v in filters.items() if c != col}
+            assert np.array_equal(masks[col], pandas_mask(sales_df, others))
+
+
+# ── Chunked loading (sales_data.iter_sales_chunks) ───────────────────────────
+UNMATCHED_LINES = 'Z-00001,100,10,1,Furniture,Chairs,COD\nZ-00002,250,-20,2,Clothing,Saree,UPI\n'
+
+
+def test_iter_sales_chunks_splits_orders_and_collects_unmatched_lines(sales_csvs):
+    with open(sales_csvs[0], 'a') as f:
+        f.write(UNMATCHED_LINES)
+    expected, expected_unmatched = load_sales_tables(*sales_csvs)
+    unmatched = []
+    chunks = list(iter_sales_chunks(*sales_csvs, chunk_rows=7, unmatched=unmatched))
+    # Orders have up to a dozen lines, so with 7-line chunks some of them span chunks
+    chunk_of = pd.concat([chunk[['Order ID']].assign(chunk=i) for i, chunk in enumerate(chunks)])
+    assert (chunk_of.groupby('Order ID')['chunk'].nunique() > 1).any()
+    merged = pd.concat(chunks, ignore_index=True)
+    assert merged[['Order ID', 'Amount', 'Profit']].equals(expected[['Order ID', 'Amount', 'Profit']])
+    assert pd.concat(unmatched)['Order ID'].tolist() == expected_unmatched['Order ID'].tolist() == ['Z-00001', 'Z-00002']
+
+
+@pytest.mark.parametrize('engine', [FactTable, SalesCube])
+def test_from_chunks_with_orders_split_across_chunks(sales_csvs, engine):
+    expected = load_sales_tables(*sales_csvs)[0]
+    query = engine.from_chunks(iter_sales_chunks(*sales_csvs, chunk_rows=7))
+    states = expected['State'].value_counts().index[:3].tolist()
+    sub_categories = frozenset(expected['Sub-Category'].value_counts().index[:2])
+    for filters in ({}, {'State': states[0]}, {'State': frozenset(states), 'Sub-Category': sub_categories},
+                    {'Order Date': ('2018-04-01', '2018-09-30')}):
+        assert_same_aggregates(query, query.rows(filters), expected[pandas_mask(expected, filters)])
@@ -0,0 +1,50 @@
+"""figure_builder.bar_figure against the plotly.express figure it replaces."""
+import base64
+
+import numpy as np
+import plotly.express as px
+import pytest
+
+from chart_data import highlight_colors
+from figure_builder import bar_figure
+
+
+def px_figure(df_agg, x_col, y_col, colors, title):
+    """What the dashboards built before figure_builder: px.bar + update_layout + update_traces."""
+    fig = px.bar(df_agg, x=x_col, y=y_col, title=title, template='plotly_white')
+    fig.update_layout(margin=dict(l=20, r=20, t=40, b=20), paper_bgcolor='rgba(0,0,0,0)', clickmode='event+select')
+    fig.update_traces(marker_color=colors)
+    return fig.to_plotly_json()
+
+
+def plain(value):
+    # to_plotly_json() encodes numeric arrays as {'dtype', 'bdata'}; decode for comparison
+    if isinstance(value, dict) and set(value) == {'dtype', 'bdata'}:
+        return np.frombuffer(base64.b64decode(value['bdata']), dtype=value['dtype']).tolist()
+    if isinstance(value, dict):
+        return {k: plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [plain(v) for v in value]
+    return value
+
+
+@pytest.mark.parametrize('x_col, y_col, top_n', [('Sub-Category', 'Profit', None), ('State', 'Amount', 10),
+                                                 ('CustomerName', 'Amount', 10)])
+@pytest.mark.parametrize('highlight', [False, True])
+def test_bar_figure_matches_plotly_express(sales_df, x_col, y_col, top_n, highlight):
+    df_agg = sales_df.groupby(x_col, observed=True)[y_col].sum().reset_index().sort_values(y_col, ascending=False)
+    if top_n:
+        df_agg = df_agg.head(top_n)
+    selected = df_agg[x_col].iloc[1] if highlight else None
+    colors = highlight_colors(df_agg[x_col], selected, '#3b82f6', '#dbeafe')
+    title = f'{y_col} by {x_col}'
+    expected = plain(px_figure(df_agg, x_col, y_col, colors, title))
+    actual = plain(bar_figure(df_agg[x_col], df_agg[y_col], colors, title=title, x_title=x_col, y_title=y_col))
+    assert actual == expected
+
+
+def test_single_colour_string(sales_df):
+    df_agg = sales_df.groupby('State', observed=True)['Amount'].sum().reset_index()
+    expected = plain(px_figure(df_agg, 'State', 'Amount', '#10b981', 'Sales'))
+    assert plain(bar_figure(df_agg['State'], df_agg['Amount'], '#10b981', title='Sales',
+                            x_title='State', y_title='Amount')) == expected
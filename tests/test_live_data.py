@@ -0,0 +1,108 @@
+"""LiveSalesCube.refresh() on appended CSV lines against a SalesCube built from the full files."""
+import os
+
+import pandas as pd
+import pytest
+
+import live_data
+from live_data import LiveSalesCube
+from sales_cube import SalesCube
+from sales_data import load_sales_tables
+
+NEW_ORDER = 'Z-00001,01-10-2018,New Customer,Goa,Panaji\n'
+NEW_ORDER_LINES = 'Z-00001,1200,300,3,Furniture,Chairs,COD\nZ-00001,800,-50,1,Clothing,Saree,UPI\n'
+OLD_ORDER_LINE = 'B-26055,500,100,2,Furniture,Chairs,EMI\n'
+
+
+@pytest.fixture(autouse=True)
+def cache_in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the binary cache of the initial load goes to ./.cache
+
+
+def append(path: str, text: str):
+    with open(path, 'a') as f:
+        f.write(text)
+
+
+def assert_matches_files(live: LiveSalesCube, paths):
+    """The live cube answers like a cube built from scratch from the files as they are now."""
+    expected = SalesCube(load_sales_tables(*paths)[0])
+    cube = live.cube
+    for col in ('Amount', 'Profit', 'Quantity'):
+        assert cube.total(None, col) == pytest.approx(expected.total(None, col))
+    assert cube.nunique(None) == expected.nunique(None)
+    pd.testing.assert_series_equal(cube.group_sum(None, 'State', 'Amount').sort_index(),
+                                   expected.group_sum(None, 'State', 'Amount').sort_index(),
+                                   check_names=False, check_index_type=False)
+
+
+def test_appended_lines_are_folded_in(sales_csvs):
+    live = LiveSalesCube(*sales_csvs)
+    assert not live.refresh()
+    version = live.current[0]
+    append(sales_csvs[1], NEW_ORDER)
+    append(sales_csvs[0], NEW_ORDER_LINES + OLD_ORDER_LINE)
+    assert live.refresh()
+    assert live.current[0] == version + 1
+    assert live._offsets == [os.path.getsize(path) for path in sales_csvs]
+    assert_matches_files(live, sales_csvs)
+
+
+def test_partial_trailing_line_waits_for_its_newline(sales_csvs):
+    live = LiveSalesCube(*sales_csvs)
+    before = live.cube.total(None, 'Amount')
+    append(sales_csvs[0], OLD_ORDER_LINE[:12])
+    assert not live.refresh()
+    assert live.cube.total(None, 'Amount') == before
+    append(sales_csvs[0], OLD_ORDER_LINE[12:])
+    assert live.refresh()
+    assert_matches_files(live, sales_csvs)
+
+
+def test_lines_wait_for_their_order(sales_csvs):
+    live = LiveSalesCube(*sales_csvs)
+    append(sales_csvs[0], NEW_ORDER_LINES)
+    assert not live.refresh()  # no order yet: kept as pending, not counted
+    assert len(live._pending) == 2
+    assert_matches_files(live, sales_csvs)
+    append(sales_csvs[1], NEW_ORDER)
+    assert live.refresh()
+    assert live._pending is None
+    assert_matches_files(live, sales_csvs)
+
+
+def test_unmatched_lines_of_the_initial_load_are_pending(sales_csvs):
+    append(sales_csvs[0], NEW_ORDER_LINES)
+    live = LiveSalesCube(*sales_csvs)
+    assert len(live._pending) == 2
+    append(sales_csvs[1], NEW_ORDER)
+    assert live.refresh()
+    assert_matches_files(live, sales_csvs)
+
+
+def test_replaced_file_triggers_a_rebuild(sales_csvs):
+    live = LiveSalesCube(*sales_csvs)
+    with open(sales_csvs[0]) as f:
+        header, *lines = f.read().splitlines(keepends=True)
+    tmp = sales_csvs[0] + '.new'
+    with open(tmp, 'w') as f:
+        f.write(header + ''.join(lines[:100]))
+    os.replace(tmp, sales_csvs[0])
+    assert live.refresh()
+    assert_matches_files(live, sales_csvs)
+
+
+def test_rebuild_retries_when_a_writer_appends_during_the_load(sales_csvs, monkeypatch):
+    build, builds = live_data.build_sales_cube, []
+
+    def build_while_appending(*args, **kwargs):
+        cube = build(*args, **kwargs)
+        if not builds:
+            append(sales_csvs[0], OLD_ORDER_LINE)  # lands after the load read the file
+        builds.append(cube)
+        return cube
+    monkeypatch.setattr(live_data, 'build_sales_cube', build_while_appending)
+    live = LiveSalesCube(*sales_csvs)
+    assert len(builds) == 2
+    assert live._offsets == [os.path.getsize(path) for path in sales_csvs]
+    assert_matches_files(live, sales_csvs)
@@ -0,0 +1,30 @@
+"""Prometheus text rendering of the /metrics counters and histograms."""
+from metrics import Counter, Histogram
+
+
+def test_counter_escapes_label_values():
+    counter = Counter('clicks_total', 'Clicks.', labels=('chart', 'filter'))
+    counter.inc('State', 'Goa')
+    counter.inc('Sub "Category"', 'C:\\data\nnext', amount=2)
+    assert list(counter.render()) == [
+        '# HELP clicks_total Clicks.',
+        '# TYPE clicks_total counter',
+        'clicks_total{chart="State",filter="Goa"} 1.0',
+        'clicks_total{chart="Sub \\"Category\\"",filter="C:\\\\data\\nnext"} 2.0',
+    ]
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('refresh_seconds', 'Refresh time.', labels=('phase',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, 'say "hi"')
+    label = 'phase="say \\"hi\\""'
+    assert list(histogram.render()) == [
+        '# HELP refresh_seconds Refresh time.',
+        '# TYPE refresh_seconds histogram',
+        f'refresh_seconds_bucket{{{label},le="0.1"}} 1',
+        f'refresh_seconds_bucket{{{label},le="1.0"}} 3',
+        f'refresh_seconds_bucket{{{label},le="+Inf"}} 4',
+        f'refresh_seconds_sum{{{label}}} 4.25',
+        f'refresh_seconds_count{{{label}}} 4',
+    ]
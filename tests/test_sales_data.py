@@ -0,0 +1,138 @@
+"""
+The binary cache of sales_data against a fresh CSV load, and the memory-mapped shared
+directory against the in-memory tables.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sales_data
+from conftest import make_sales_frame
+from fact_table import FactTable
+from filter_index import FILTER_COLUMNS
+from sales_data import (get_sales_data, get_shared_derived, load_mapped, load_sales_tables, load_sales_tables_cached,
+                        materialize_shared, open_shared, save_mapped)
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Counts the CSV loads behind load_sales_tables_cached."""
+    calls = []
+
+    def counting_load(*paths):
+        calls.append(paths)
+        return load_sales_tables(*paths)
+    monkeypatch.setattr(sales_data, 'load_sales_tables', counting_load)
+    return calls
+
+
+def assert_same_tables(got, expected):
+    for got_df, expected_df in zip(got, expected):
+        pd.testing.assert_frame_equal(got_df, expected_df)
+
+
+@pytest.mark.parametrize('feather', [True, False])
+def test_cache_hit_matches_csv_load(sales_csvs, tmp_path, loads, monkeypatch, feather):
+    if not feather:
+        monkeypatch.setattr(sales_data, 'pyarrow', None)  # as if pyarrow were not installed
+    cache_dir = str(tmp_path / 'cache')
+    expected = load_sales_tables(*sales_csvs)
+    assert_same_tables(load_sales_tables_cached(*sales_csvs, cache_dir), expected)
+    assert_same_tables(load_sales_tables_cached(*sales_csvs, cache_dir), expected)
+    assert len(loads) == 1
+    assert sorted(os.listdir(cache_dir)) == sorted(
+        os.path.basename(p) for p in sales_data._cache_paths(cache_dir))
+    assert os.path.exists(os.path.join(cache_dir, 'sales.feather' if feather else 'sales.pkl'))
+
+
+def test_touched_csv_rebuilds_cache(sales_csvs, tmp_path, loads):
+    cache_dir = str(tmp_path / 'cache')
+    load_sales_tables_cached(*sales_csvs, cache_dir)
+    st = os.stat(sales_csvs[1])
+    os.utime(sales_csvs[1], ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    load_sales_tables_cached(*sales_csvs, cache_dir)
+    assert len(loads) == 2
+    load_sales_tables_cached(*sales_csvs, cache_dir)
+    assert len(loads) == 2
+
+
+def test_resized_csv_rebuilds_cache(sales_csvs, tmp_path, loads):
+    cache_dir = str(tmp_path / 'cache')
+    before, _ = load_sales_tables_cached(*sales_csvs, cache_dir)
+    with open(sales_csvs[0]) as f:
+        last_line = f.read().splitlines()[-1]
+    st = os.stat(sales_csvs[0])
+    with open(sales_csvs[0], 'a') as f:
+        f.write(last_line + '\n')
+    os.utime(sales_csvs[0], ns=(st.st_atime_ns, st.st_mtime_ns))  # same mtime: only the size changed
+    after, _ = load_sales_tables_cached(*sales_csvs, cache_dir)
+    assert len(loads) == 2
+    assert len(after) == len(before) + 1
+    assert_same_tables(load_sales_tables_cached(*sales_csvs, cache_dir), load_sales_tables(*sales_csvs))
+
+
+# ── Memory-mapped shared directory ───────────────────────────────────────────
+def is_mapped(arr: np.ndarray) -> bool:
+    """True if arr is a view (at any depth) of a memory-mapped file."""
+    while arr is not None and not isinstance(arr, np.memmap):
+        arr = arr.base
+    return arr is not None
+
+
+def assert_same_answers(table, expected):
+    for filters in ({}, {'State': 'Goa'}, {'Sub-Category': frozenset({'Chairs', 'Saree'}), 'Amount': (500.0, None)}):
+        rows, expected_rows = table.rows(filters), expected.rows(filters)
+        assert table.count(rows) == expected.count(expected_rows)
+        assert table.total(rows, 'Amount') == expected.total(expected_rows, 'Amount')
+        assert table.nunique(rows) == expected.nunique(expected_rows)
+        for col in FILTER_COLUMNS:
+            assert table.top_k(rows, col, 'Amount', 5) == expected.top_k(expected_rows, col, 'Amount', 5)
+
+
+def test_shared_frame_and_fact_table_are_mapped(tmp_path):
+    df = make_sales_frame(0, n_orders=8000)  # large enough for every array to be mapped
+    materialize_shared(df, str(tmp_path / 'frame'))
+    shared = open_shared(str(tmp_path / 'frame'))
+    for col in shared.columns:
+        values = shared[col].array
+        assert is_mapped(values.codes if isinstance(values, pd.Categorical) else np.asarray(values)), col
+    # String columns such as Order ID come back as categoricals in this mode
+    pd.testing.assert_frame_equal(shared.copy(), df.astype({'Order ID': 'category'}), check_categorical=False)
+
+    expected = FactTable(df)
+    save_mapped(FactTable(shared), str(tmp_path / 'fact_table'))
+    table = load_mapped(str(tmp_path / 'fact_table'))
+    for arr in [*table.codes.values(), *table.measures.values(), table.days]:
+        assert isinstance(arr, np.memmap)
+        assert not arr.flags.writeable
+    assert_same_answers(table, expected)
+
+
+def test_get_shared_derived_builds_once(sales_csvs, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the binary cache behind the first build goes to ./.cache
+    shared_dir = str(tmp_path / 'shared')
+    expected_df, expected_unmatched = load_sales_tables(*sales_csvs)
+    builds = []
+
+    def build(df):
+        builds.append(len(df))
+        return FactTable(df)
+    for _ in range(2):
+        table, unmatched = get_shared_derived('fact_table', build, *sales_csvs, shared_dir)
+        assert_same_answers(table, FactTable(expected_df))
+        assert len(unmatched) == len(expected_unmatched)
+    assert builds == [len(expected_df)]
+
+
+# ── Process-wide frame ───────────────────────────────────────────────────────
+def test_shared_frame_rejects_writes_into_measures(sales_csvs, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = get_sales_data(*sales_csvs)
+    assert get_sales_data(*sales_csvs) is df
+    pd.testing.assert_frame_equal(df, load_sales_tables(*sales_csvs)[0])
+    before = df[['Amount', 'Profit', 'Quantity']].sum()
+    for col, value in (('Amount', 1e9), ('Profit', -1.0), ('Quantity', 0)):
+        with pytest.raises(ValueError, match='read-only'):
+            df.loc[0, col] = value
+    pd.testing.assert_series_equal(df[['Amount', 'Profit', 'Quantity']].sum(), before)
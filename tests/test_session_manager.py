@@ -0,0 +1,126 @@
+"""Filter state in the URL (encode / decode round trip) and SessionManager eviction."""
+import asyncio
+import json
+from urllib.parse import urlencode
+
+import pytest
+from nicegui import core
+from starlette.datastructures import QueryParams
+
+from filter_index import FILTER_COLUMNS
+from session_manager import SessionManager, decode_filters, encode_filters
+
+RANGE_COLUMNS = ['Order Date', 'Amount', 'Profit']
+
+
+def round_trip(filters: dict) -> dict:
+    return decode_filters(QueryParams(encode_filters(filters)), FILTER_COLUMNS, range_columns=RANGE_COLUMNS)
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'State': 'Goa'},
+    {'State': frozenset({'Goa', 'Delhi'}), 'Sub-Category': frozenset({'Chairs', 'Saree', 'Phones'})},
+    {'Order Date': ('2018-03-01', '2018-05-31'), 'State': 'Kerala'},
+    {'Order Date': (None, '2018-05-31'), 'Amount': (500.0, None), 'Profit': (-20.5, 100.0)},
+    {'CustomerName': 'Smith, J. & Sons', 'State': 'Tamil Nadu'},
+    {'CustomerName': frozenset({'Zoë', 'Ananya Śarmā', 'a=b&c'}), 'Sub-Category': '100% Cotton?'},
+])
+def test_filters_round_trip_through_the_url(filters):
+    assert round_trip(filters) == filters
+
+
+def test_empty_filters_give_an_empty_query():
+    assert encode_filters({}) == ''
+    assert decode_filters(QueryParams(''), FILTER_COLUMNS, range_columns=RANGE_COLUMNS) == {}
+
+
+@pytest.mark.parametrize('query, expected', [
+    ({'Unknown': 'x', 'State': 'Goa'}, {'State': 'Goa'}),
+    ({'State': ''}, {}),
+    ({'Order Date': '2018-13-45..2018-05-31'}, {}),
+    ({'Order Date': 'yesterday'}, {}),
+    ({'Amount': 'abc..100'}, {}),
+    ({'Amount': 'nan..'}, {}),
+    ({'Profit': '..5', 'Order Date': 'garbage..'}, {'Profit': (None, 5.0)}),
+])
+def test_unknown_columns_and_garbage_are_ignored(query, expected):
+    assert decode_filters(QueryParams(urlencode(query)), FILTER_COLUMNS, range_columns=RANGE_COLUMNS) == expected
+
+
+# ── SessionManager ───────────────────────────────────────────────────────────
+class FakeClient:
+    def __init__(self, client_id: str):
+        self.id = client_id
+        self.has_socket_connection = True
+        self.is_deleted = False
+        self.elements = {}
+        self.scripts = []
+        self._on_delete = []
+
+    def on_delete(self, callback):
+        self._on_delete.append(callback)
+
+    async def run_javascript(self, code: str, timeout: float):
+        self.scripts.append(code)
+
+    def delete(self):
+        self.is_deleted = True
+        for callback in self._on_delete:
+            callback()
+
+
+class FakeDashboard:
+    def __init__(self, client_id: str, filters: dict):
+        self.client = FakeClient(client_id)
+        self.filters = filters
+
+    def active_filters(self) -> dict:
+        return self.filters
+
+
+def run(coroutine_function, monkeypatch):
+    async def main():
+        monkeypatch.setattr(core, 'loop', asyncio.get_running_loop())  # for background_tasks.create
+        await coroutine_function()
+    asyncio.run(main())
+
+
+def test_idle_sessions_are_evicted_with_their_filters_in_the_url(monkeypatch):
+    manager = SessionManager(ttl=60, max_sessions=0)
+    idle, active = FakeDashboard('idle', {'State': 'Goa'}), FakeDashboard('active', {})
+    for dashboard in (idle, active):
+        manager.register(dashboard, dashboard.client)
+    manager._sessions['idle'].last_active -= 120  # pylint: disable=protected-access
+
+    async def sweep():
+        await manager.evict_idle()
+    run(sweep, monkeypatch)
+    assert list(manager) == [active]
+    assert idle.client.is_deleted and not active.client.is_deleted
+    assert json.dumps('?State=Goa') in idle.client.scripts[0]
+    assert manager.stats()['evicted_total'] == 1
+
+
+def test_least_recently_active_session_is_evicted_beyond_the_cap(monkeypatch):
+    manager = SessionManager(ttl=0, max_sessions=2)
+    dashboards = [FakeDashboard(f'tab{i}', {}) for i in range(3)]
+
+    async def open_tabs():
+        for dashboard in dashboards[:2]:
+            manager.register(dashboard, dashboard.client)
+        manager._sessions['tab0'].last_active += 10  # pylint: disable=protected-access
+        manager.register(dashboards[2], dashboards[2].client, restored=True)
+        await asyncio.sleep(0)  # let the eviction task run
+    run(open_tabs, monkeypatch)
+    assert list(manager) == [dashboards[0], dashboards[2]]
+    assert dashboards[1].client.is_deleted
+    assert manager.stats()['restored_total'] == 1
+
+
+def test_closed_tabs_leave_the_registry():
+    manager = SessionManager(ttl=60)
+    dashboard = FakeDashboard('tab', {})
+    manager.register(dashboard, dashboard.client)
+    dashboard.client.delete()
+    assert len(manager) == 0
@@ -0,0 +1,62 @@
+"""Snapshot routes: ETag / 304 revalidation, gzip negotiation and Cache-Control."""
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from nicegui import app
+
+from static_snapshot import Snapshot
+
+CHARTS = {'chart-state': {'data': [{'type': 'bar', 'x': ['Goa', 'Delhi'], 'y': [3, 2]}], 'layout': {}}}
+
+
+@pytest.fixture(scope='module')
+def snapshot():
+    snapshot = Snapshot('Sales', 'Sales Overview', [('Total Amount', '$1,000'), ('Order Count', '12')], CHARTS,
+                        library='plotly', max_age=30)
+    snapshot.serve('/test-snapshot', '/test-snapshot.json')
+    return snapshot
+
+
+@pytest.fixture(scope='module')
+def client(snapshot):
+    return TestClient(app)
+
+
+@pytest.mark.parametrize('path, attr', [('/test-snapshot', 'page'), ('/test-snapshot.json', 'json')])
+def test_get_returns_etag_and_cache_control(client, snapshot, path, attr):
+    body = getattr(snapshot, attr)
+    response = client.get(path, headers={'Accept-Encoding': 'identity'})
+    assert response.status_code == 200
+    assert response.content == body.body
+    assert response.headers['ETag'] == body.etag == f'W/"{body.digest}"'
+    assert response.headers['Cache-Control'] == 'public, max-age=30'
+    assert 'Content-Encoding' not in response.headers
+
+
+@pytest.mark.parametrize('if_none_match', ['{etag}', '"0123456789abcdef", {etag}'])
+def test_matching_if_none_match_returns_304(client, snapshot, if_none_match):
+    etag = snapshot.page.etag
+    response = client.get('/test-snapshot', headers={'If-None-Match': if_none_match.format(etag=etag)})
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['ETag'] == etag
+    assert response.headers['Cache-Control'] == 'public, max-age=30'
+
+
+def test_stale_etag_gets_the_full_body(client, snapshot):
+    response = client.get('/test-snapshot', headers={'If-None-Match': 'W/"0123456789abcdef"'})
+    assert response.status_code == 200
+    assert response.content == snapshot.page.body
+
+
+def test_gzip_body_decodes_to_the_same_bytes(client, snapshot):
+    with client.stream('GET', '/test-snapshot.json', headers={'Accept-Encoding': 'gzip'}) as response:
+        raw = b''.join(response.iter_raw())
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert response.headers['ETag'] == snapshot.json.etag
+    assert raw == snapshot.json.gzipped
+    assert gzip.decompress(raw) == snapshot.json.body
+    assert json.loads(gzip.decompress(raw))['charts'] == CHARTS
@@ -0,0 +1,77 @@
+"""Day / week / month trend rollups and date helpers against pandas."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from fact_table import FactTable
+from filter_index import FilterIndex
+from sales_cube import SalesCube
+from time_index import FREQUENCIES, NO_DATE, TimeIndex, bucket_mask, bucket_range, from_days, to_days
+
+PERIODS = {'day': 'D', 'week': 'W-SUN', 'month': 'M'}
+
+
+def pandas_trend(df: pd.DataFrame, value_col: str, freq: str) -> pd.Series:
+    """Sum per bucket start (ISO label), every bucket from the first to the last date of df."""
+    dated = df.dropna(subset=['Order Date'])
+    periods = dated['Order Date'].dt.to_period(PERIODS[freq])
+    sums = dated.groupby(periods)[value_col].sum()
+    full = pd.period_range(periods.min(), periods.max(), freq=PERIODS[freq])
+    sums = sums.reindex(full, fill_value=0)
+    labels = [str(p.start_time.date()) if freq != 'month' else str(p)[:7] for p in full]
+    return pd.Series(sums.to_numpy(), index=labels)
+
+
+def _pandas_mask(df, filters):
+    mask = pd.Series(True, index=df.index)
+    for col, value in filters.items():
+        if isinstance(value, tuple):
+            mask &= df[col].between(pd.Timestamp(value[0]), pd.Timestamp(value[1]))
+        elif isinstance(value, frozenset):
+            mask &= df[col].isin(value)
+        else:
+            mask &= df[col] == value
+    return mask.to_numpy()
+
+
+@pytest.mark.parametrize('freq', FREQUENCIES)
+@pytest.mark.parametrize('engine', ['index', 'fact_table', 'cube'])
+def test_trend_matches_pandas(sales_df, freq, engine):
+    build = {'index': FilterIndex, 'fact_table': FactTable, 'cube': SalesCube}[engine]
+    query = build(sales_df)
+    full = pandas_trend(sales_df, 'Amount', freq)
+    for filters in ({}, {'State': 'Goa'}, {'Sub-Category': frozenset({'Chairs', 'Saree'})},
+                    {'Order Date': ('2018-03-10', '2018-05-20')}):
+        rows = query.rows(filters)
+        selected = sales_df if rows is None else sales_df[_pandas_mask(sales_df, filters)]
+        series = query.trend(rows, 'Amount', freq)
+        assert series.labels == full.index.tolist()  # buckets span all the data, not the selection
+        expected = pandas_trend(selected, 'Amount', freq).reindex(full.index, fill_value=0)
+        assert series.values == pytest.approx(expected.tolist())
+
+
+def test_days_round_trip():
+    dates = pd.Series(pd.to_datetime(['1969-12-31', '1970-01-01', '2018-03-31', None]))
+    days = to_days(dates)
+    assert days.dtype == np.int32
+    assert days.tolist()[:3] == [-1, 0, 17621] and days[3] == NO_DATE
+    assert from_days(days)[:3].astype(str).tolist() == ['1969-12-31', '1970-01-01', '2018-03-31']
+    assert np.isnat(from_days(days)[3])
+
+
+def test_date_range_positions_skip_missing_dates():
+    days = to_days(pd.Series(pd.to_datetime(['2018-01-05', None, '2018-01-01', '2018-02-01', '2018-01-05'])))
+    index = TimeIndex(days)
+    assert sorted(index.positions('2018-01-01', '2018-01-05').tolist()) == [0, 2, 4]
+    assert sorted(index.positions(None, None).tolist()) == [0, 2, 3, 4]
+    assert index.count('2018-01-06', None) == 1
+    assert index.extent() == ('2018-01-01', '2018-02-01')
+
+
+def test_bucket_range_and_mask():
+    assert bucket_range('2018-03-05', 'day') == ('2018-03-05', '2018-03-05')
+    assert bucket_range('2018-03-05', 'week') == ('2018-03-05', '2018-03-11')  # Monday to Sunday
+    assert bucket_range('2018-02', 'month') == ('2018-02-01', '2018-02-28')
+    labels = ['2018-01', '2018-02', '2018-03', '2018-04']
+    assert bucket_mask(labels, 'month', '2018-02-15', '2018-03-01').tolist() == [False, True, True, False]
+    assert bucket_mask(labels, 'month', None, '2018-01-31').tolist() == [True, False, False, False]
@@ -0,0 +1,141 @@
+from collections import namedtuple
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sorted_index import SortedIndex
+
+# ==========================================
+# TIME DIMENSION: SORTED DATE INDEX + PRE-BUCKETED ROLLUPS
+# Responsibilities: turning Order Date into int32 day numbers once at load,
+# resolving a date range to row positions by binary search, and summing
+# measures per day / week / month bucket for the trend panel.
+# ==========================================
+
+TIME_COLUMN = 'Order Date'
+FREQUENCIES = ('day', 'week', 'month')
+NO_DATE = np.iinfo(np.int32).min  # day number of a missing date
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+# labels: bucket start dates (ISO strings), every bucket between the first and last date
+TimeSeries = namedtuple('TimeSeries', ['labels', 'values'])
+
+
+def to_days(values) -> np.ndarray:
+    """Dates (datetime64 / parseable values) as int32 days since 1970-01-01; NO_DATE where missing."""
+    dates = pd.to_datetime(values).to_numpy().astype('datetime64[D]')
+    days = (dates - _EPOCH).astype(np.int64)
+    days[np.isnat(dates)] = NO_DATE
+    return days.astype(np.int32)
+
+
+def from_days(days: np.ndarray) -> np.ndarray:
+    """Inverse of to_days, as datetime64[D] (NaT for NO_DATE)."""
+    dates = _EPOCH + np.asarray(days, dtype=np.int64).astype('timedelta64[D]')
+    dates[np.asarray(days) == NO_DATE] = np.datetime64('NaT')
+    return dates
+
+
+def day_number(value) -> int:
+    """One date ('2018-03-31', date, datetime64) as a day number."""
+    return int((np.datetime64(value, 'D') - _EPOCH).astype(np.int64))
+
+
+def _bucket_keys(days: np.ndarray, freq: str) -> np.ndarray:
+    """Ordinal of each day's bucket: days, Monday-based weeks, or calendar months."""
+    days = days.astype(np.int64)
+    if freq == 'day':
+        return days
+    if freq == 'week':
+        return (days + 3) // 7  # 1970-01-01 was a Thursday; weeks start on Monday
+    if freq == 'month':
+        return (_EPOCH + days.astype('timedelta64[D]')).astype('datetime64[M]').astype(np.int64)
+    raise ValueError(f'unknown frequency: {freq}')
+
+
+def _bucket_labels(first: int, n: int, freq: str) -> list:
+    keys = np.arange(first, first + n)
+    if freq == 'day':
+        dates = _EPOCH + keys.astype('timedelta64[D]')
+    elif freq == 'week':
+        dates = _EPOCH + (keys * 7 - 3).astype('timedelta64[D]')
+    else:
+        return keys.astype('datetime64[M]').astype(str).tolist()
+    return dates.astype(str).tolist()
+
+
+def bucket_range(label: str, freq: str) -> Tuple[str, str]:
+    """First and last day (inclusive, ISO) of the bucket a trend label stands for."""
+    start = np.datetime64(label, 'D')
+    if freq == 'day':
+        end = start
+    elif freq == 'week':
+        end = start + np.timedelta64(6, 'D')
+    else:
+        end = (np.datetime64(label, 'M') + np.timedelta64(1, 'M')).astype('datetime64[D]') - np.timedelta64(1, 'D')
+    return str(start), str(end)
+
+
+def bucket_mask(labels, freq: str, start=None, end=None) -> np.ndarray:
+    """Which trend buckets overlap [start, end] (inclusive ISO dates, None = open)."""
+    if not len(labels):
+        return np.zeros(0, dtype=bool)
+    starts = np.array(labels, dtype='datetime64[D]')
+    ends = np.append(starts[1:], np.datetime64(bucket_range(labels[-1], freq)[1]) + 1) - 1
+    mask = np.ones(len(starts), dtype=bool)
+    if start is not None:
+        mask &= ends >= np.datetime64(start, 'D')
+    if end is not None:
+        mask &= starts <= np.datetime64(end, 'D')
+    return mask
+
+
+class TimeIndex(SortedIndex):
+    """
+    A SortedIndex over day numbers (one entry per row or cube cell), so a date range is
+    two binary searches and a slice; range bounds are ISO dates. In addition:
+      - buckets: per frequency, each row's bucket number (0 = first bucket with data)
+    """
+
+    def __init__(self, days: np.ndarray):
+        super().__init__(days)
+        self.days = days
+        dated = self.sorted_values[self.sorted_values != NO_DATE]
+        self.first_day = int(dated[0]) if len(dated) else None
+        self.last_day = int(dated[-1]) if len(dated) else None
+
+        self.buckets: Dict[str, np.ndarray] = {}
+        self.labels: Dict[str, list] = {}
+        if self.first_day is None:
+            return
+        for freq in FREQUENCIES:
+            first, last = (int(k) for k in _bucket_keys(np.array([self.first_day, self.last_day]), freq))
+            n = last - first + 1
+            buckets = _bucket_keys(days, freq) - first
+            buckets[days == NO_DATE] = n  # missing dates -> extra bucket, never returned
+            self.buckets[freq] = buckets.astype(np.min_scalar_type(n))
+            self.labels[freq] = _bucket_labels(first, n, freq)
+
+    def extent(self) -> Optional[Tuple[str, str]]:
+        """First and last date with data (ISO), or None when there are no dates."""
+        if self.first_day is None:
+            return None
+        return str(_EPOCH + np.timedelta64(self.first_day, 'D')), str(_EPOCH + np.timedelta64(self.last_day, 'D'))
+
+    def _bounds(self, start, end) -> Tuple[int, int]:
+        # [start, end]: ISO dates, inclusive; None = open (missing dates never match)
+        lo = NO_DATE + 1 if start is None else day_number(start)
+        hi = np.iinfo(np.int32).max if end is None else day_number(end)
+        return lo, hi
+
+    def rollup(self, rows: Optional[np.ndarray], values: np.ndarray, freq: str = 'month') -> Optional[TimeSeries]:
+        """Sum of values per bucket over rows (None = all rows); every bucket from first to last date."""
+        if self.first_day is None:
+            return None
+        labels = self.labels[freq]
+        buckets = self.buckets[freq] if rows is None else self.buckets[freq][rows]
+        values = values if rows is None else values[rows]
+        sums = np.bincount(buckets, weights=values, minlength=len(labels) + 1)[:len(labels)]
+        return TimeSeries(labels, sums.tolist())
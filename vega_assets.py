@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import sys
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+import altair as alt
+from nicegui import app
+
+from static_snapshot import LIBRARY_MAX_AGE, CachedBody
+
+# ==========================================
+# SELF-HOSTED VEGA RUNTIME + SEPARATELY SERVED SPECS
+# Responsibilities: serving vega / vega-lite / vega-embed from a local asset
+# directory under versioned, immutable URLs (no CDN round-trips, works offline),
+# falling back to the pinned CDN builds until they are vendored once
+# (`python vega_assets.py`), and serving chart specs
+# as their own cacheable JSON instead of inlining them into every page.
+# ==========================================
+
+# The versions altair writes its specs for (vega-lite schema in every spec's "$schema")
+VEGA_PACKAGES = {'vega': alt.VEGA_VERSION, 'vega-lite': alt.VEGALITE_VERSION, 'vega-embed': alt.VEGAEMBED_VERSION}
+# Where the vendored builds live: <dir>/<package>.min.js (a deployment can point this elsewhere)
+VEGA_ASSET_DIR = Path(os.environ.get('VEGA_ASSET_DIR', Path(__file__).parent / 'static' / 'vega'))
+_CDN = 'https://cdn.jsdelivr.net/npm'
+IMMUTABLE = f'public, max-age={LIBRARY_MAX_AGE}, immutable'
+
+_script_urls: List[str] = []
+log = logging.getLogger(__name__)
+
+
+def _asset_path(package: str) -> Path:
+    return VEGA_ASSET_DIR / f'{package}.min.js'
+
+
+def vendor(directory: Path = VEGA_ASSET_DIR):
+    """Downloads the pinned builds into directory; run once wherever the network is reachable."""
+    directory.mkdir(parents=True, exist_ok=True)
+    for package, version in VEGA_PACKAGES.items():
+        with urllib.request.urlopen(f'{_CDN}/{package}@{version}') as response:
+            (directory / f'{package}.min.js').write_bytes(response.read())
+        print(f'{package}@{version} -> {directory / package}.min.js')
+
+
+def register_assets():
+    """
+    Registers one route per vendored file; the apps call it once at startup, before ui.run.
+    If any file is missing, logs a warning and loads the pinned versions from the CDN instead.
+    """
+    if _script_urls:
+        return
+    missing = [package for package in VEGA_PACKAGES if not _asset_path(package).is_file()]
+    if missing:
+        log.warning('Vega assets missing in %s (%s), loading them from %s; run `python vega_assets.py` '
+                    'once to serve them locally', VEGA_ASSET_DIR, ', '.join(missing), _CDN)
+        _script_urls.extend(f'{_CDN}/{package}@{version}' for package, version in VEGA_PACKAGES.items())
+        return
+    for package in VEGA_PACKAGES:
+        body = CachedBody(_asset_path(package).read_bytes(), 'text/javascript; charset=utf-8', IMMUTABLE)
+        url = f'/assets/vega/{body.digest}/{package}.min.js'
+        app.get(url, include_in_schema=False)(body.response)
+        _script_urls.append(url)
+
+
+def vega_script_urls() -> List[str]:
+    """
+    URLs of vega, vega-lite and vega-embed, in load order: served by this process from
+    VEGA_ASSET_DIR (content hash in the path, immutable caching, gzip compressed once),
+    or the CDN when they are not vendored. Needs register_assets() first.
+    """
+    if not _script_urls:
+        raise RuntimeError('vega_assets.register_assets() has not been called')
+    return _script_urls
+
+
+def vega_script_tags() -> str:
+    return ''.join(f'<script src="{url}"></script>\n' for url in vega_script_urls())
+
+
+def serve_spec(name: str, spec: Dict[str, object]) -> str:
+    """
+    Serves spec (or any JSON value) at /data/<name>.json and returns its URL with the content
+    hash as query, so the page stays small and browsers keep the spec until it changes.
+    """
+    body = CachedBody(json.dumps(spec).encode(), 'application/json', IMMUTABLE)
+    app.get(f'/data/{name}.json', include_in_schema=False)(body.response)
+    return f'/data/{name}.json?v={body.digest}'
+
+
+if __name__ == '__main__':
+    vendor(Path(sys.argv[1]) if len(sys.argv) > 1 else VEGA_ASSET_DIR)